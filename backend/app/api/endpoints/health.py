@@ -1,5 +1,11 @@
 # app/api/endpoints/health.py
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.admission import capacity_snapshot
+from app.core.ai_models import get_model_loader, warmup_targets
+from app.core.query_cache import cache_snapshot
+from app.core.vector_index import get_vector_index
+from app.services.vector_index_service import local_vector_search_enabled
 from app.core.logging.logger import get_logger
 
 logger = get_logger(__name__)
@@ -11,3 +17,32 @@ router = APIRouter()
 async def health_check():
     logger.info("Health check endpoint called.")
     return {"status": "ok"}
+
+@router.get("/capacity", tags=["Health"])
+async def capacity():
+    """Per-resource limits, in-flight work, queue depth, wait times and cache hit rates, for sizing the deployment."""
+    return {
+        **capacity_snapshot(),
+        "embedding": {
+            "backend": get_model_loader().model_status()["embedding"]["detail"],
+            **get_model_loader().embedding_batcher.snapshot(),
+        },
+        "caches": cache_snapshot(),
+        "vector_index": {
+            kind: get_vector_index(kind).snapshot() for kind in ("media", "passages")
+        } if local_vector_search_enabled() else None,
+    }
+
+@router.get("/ready", tags=["Health"])
+async def readiness():
+    """
+    Ready once every model in MODEL_WARMUP is loaded (or degraded to its fallback);
+    503 while warm-up is still running. Lists the warm state of each model.
+    """
+    models = get_model_loader().model_status()
+    required = warmup_targets()
+    ready = all(models[name]["state"] in ("ready", "degraded") for name in required)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "required": required, "models": models},
+    )
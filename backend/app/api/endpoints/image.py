@@ -1,58 +1,67 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request, HTTPException, Query, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import os
-import tempfile
 from app.services.analysis_service import analyze_image
 from app.services.storage_service import store_analysis_result
 from app.api.response import AnalysisResult
 from app.core.database import get_db
+from app.core.spool import UPLOAD_OPENAPI, InvalidUploadError, UploadTooLargeError, spool_request
+from app.core.admission import admit_analysis, check_analysis_capacity
 from app.core.logging.logger import get_logger
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
-@router.post("/image", response_model=AnalysisResult)
+@router.post("/image", response_model=AnalysisResult, openapi_extra=UPLOAD_OPENAPI)
 async def analyze_image_endpoint(
-    file: UploadFile = File(...),
+    request: Request,
     overwrite: Optional[bool] = Query(True, description="Overwrite existing entry if it exists"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    _capacity: None = Depends(check_analysis_capacity)
 ):
-    logger.info(f"📥 Received image upload: {file.filename} ({file.content_type})")
+    media = None
+    try:
+        # Single pass over the request body: parsed, hashed and size-checked as it streams to disk.
+        media = await spool_request(request)
+        logger.info(f"📥 Received image upload: {media.filename} ({media.content_type})")
 
-    if not file.content_type.startswith("image/"):
-        logger.warning(f"⛔ Rejected non-image file: {file.filename}")
-        raise HTTPException(status_code=400, detail="File must be an image")
+        if not media.content_type.startswith("image/"):
+            logger.warning(f"⛔ Rejected non-image file: {media.filename}")
+            raise HTTPException(status_code=400, detail="File must be an image")
 
-    temp_path = ""
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp:
-            temp.write(await file.read())
-            temp_path = temp.name
-        logger.debug(f"📁 Temp file created at: {temp_path}")
-
-        await file.seek(0)
-        result = await analyze_image(file)
-
-        store_analysis_result(
-            db=db,
-            filename=result["filename"],
-            media_type="image",
-            summary=result["summary"],
-            transcript=result["transcript"],
-            metadata=result["media_metadata"],
-            vector=result.get("vector"),
-            overwrite=overwrite
-        )
+        # The analysis slot is taken only now that the upload is spooled.
+        async with admit_analysis():
+            result = await analyze_image(media)
+
+            await store_analysis_result(
+                db=db,
+                filename=result["filename"],
+                media_type="image",
+                summary=result["summary"],
+                transcript=result["transcript"],
+                metadata=result["media_metadata"],
+                vector=result.get("vector"),
+                overwrite=overwrite
+            )
 
         return result
 
+    except HTTPException:
+        raise
+
+    except UploadTooLargeError as e:
+        logger.warning(f"⛔ Rejected oversized upload: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+
+    except InvalidUploadError as e:
+        logger.warning(f"⛔ Rejected upload: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
-        logger.exception(f"❌ Failed to process image {file.filename}: {e}")
+        logger.exception(f"❌ Failed to process image {media.filename if media else 'upload'}: {e}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
     finally:
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
-            logger.debug(f"🗑 Deleted temp file: {temp_path}")
+        if media is not None:
+            media.cleanup()
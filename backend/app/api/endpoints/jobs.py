@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Request, HTTPException, Query
+from typing import Optional
+
+from app.services.job_service import submit_job, get_job, job_status
+from app.api.response import JobStatus
+from app.core.config import JOB_SPOOL_DIR
+from app.core.spool import UPLOAD_OPENAPI, InvalidUploadError, UploadTooLargeError, spool_request
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+@router.post("", response_model=JobStatus, status_code=202, openapi_extra=UPLOAD_OPENAPI)
+async def create_job(
+    request: Request,
+    overwrite: Optional[bool] = Query(True, description="Overwrite existing entry if it exists")
+):
+    try:
+        # Streamed straight into the job spool in one pass; the worker analyzes it from there.
+        media = await spool_request(request, dest_dir=JOB_SPOOL_DIR)
+    except UploadTooLargeError as e:
+        logger.warning(f"⛔ Rejected oversized upload: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        logger.warning(f"⛔ Rejected upload: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"📥 Received job submission: {media.filename} ({media.content_type})")
+
+    if media.content_type.startswith("image/"):
+        media_type = "image"
+    elif media.content_type.startswith("video/"):
+        media_type = "video"
+    else:
+        logger.warning(f"⛔ Rejected unsupported file type: {media.filename}")
+        media.cleanup()
+        raise HTTPException(status_code=400, detail="File must be an image or video")
+
+    try:
+        job = await submit_job(media, media_type, overwrite=overwrite)
+    except Exception as e:
+        logger.exception(f"❌ Failed to queue {media.filename}: {e}")
+        media.cleanup()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+    return job_status(job)
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def read_job(job_id: str):
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
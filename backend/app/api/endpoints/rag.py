@@ -9,14 +9,21 @@ router = APIRouter()
 logger = get_logger(__name__)
 
 @router.post("/custom", response_model=Dict[str, Any])
-def custom_rag_search(params: RAGQuery) -> Dict[str, Any]:
+async def custom_rag_search(params: RAGQuery) -> Dict[str, Any]:
     try:
-        return run_rag_pipeline(
+        return await run_rag_pipeline(
             query=params.query,
             top_k=params.top_k,
             score_threshold=params.score_threshold,
             fallback_to_keyword=params.fallback_to_keyword,
-            debug=params.debug
+            debug=params.debug,
+            vector_search=params.vector_search,
+            num_candidates=params.num_candidates,
+            retrieval=params.retrieval,
+            vector_weight=params.vector_weight,
+            keyword_weight=params.keyword_weight,
+            rrf_k=params.rrf_k,
+            context_docs=params.context_docs
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
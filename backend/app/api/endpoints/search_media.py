@@ -1,20 +1,75 @@
-from fastapi import Depends, APIRouter, HTTPException
-from app.core.database import get_db 
-from app.core.elasticsearch import es
+import json
+import base64
+from typing import List, Optional
+from fastapi import Depends, APIRouter, HTTPException, Query
+from elasticsearch import NotFoundError
+from app.core.database import get_db
+from app.core.elasticsearch import get_async_es
 from sqlalchemy.orm import Session
 from app.core.logging.logger import get_logger
-from app.core.config import ELASTIC_INDEX
+from app.core.config import (
+    ELASTIC_INDEX,
+    SEARCH_PAGE_SIZE,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_HIGHLIGHT_FRAGMENTS,
+    SEARCH_FRAGMENT_SIZE,
+)
 
 logger = get_logger(__name__)
 
 
 router = APIRouter()
 
+# Fields a client may project; `vector` is never returned.
+SOURCE_FIELDS = {
+    "filename", "media_type", "summary", "transcript", "transcript_segments",
+    "media_metadata", "relative_path", "timestamp", "embedding_model", "embedding_version",
+}
+# Long fields are left out unless asked for; matches come back as highlighted fragments.
+DEFAULT_SOURCE = ["filename", "media_type", "summary", "relative_path", "timestamp"]
+HIGHLIGHT_TAGS = ("**", "**")  # Markdown bold, rendered as-is by the Streamlit client
+
+
+def _encode_cursor(sort_values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid search_after cursor.")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid search_after cursor.")
+    return values
+
+
+def _check_fields(fields: Optional[List[str]]) -> List[str]:
+    unknown = set(fields or []) - SOURCE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s) {sorted(unknown)}; choose from {sorted(SOURCE_FIELDS)}.",
+        )
+    return fields or []
+
+
 @router.get("/media")
-def search_media(query: str, db: Session = Depends(get_db)):
+async def search_media(
+    query: str,
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    search_after: Optional[str] = Query(None, description="`next_search_after` from the previous page"),
+    include: Optional[List[str]] = Query(None, description="Source fields to return instead of the defaults"),
+    exclude: Optional[List[str]] = Query(None, description="Source fields to leave out"),
+    highlight: bool = Query(True, description="Return matching summary/transcript fragments"),
+    db: Session = Depends(get_db)
+):
     logger.info(f"Search query received: '{query}'")
 
+    includes = _check_fields(include) or DEFAULT_SOURCE
+    excludes = ["vector", *_check_fields(exclude)]
     search_body = {
+        "size": page_size,
         "query": {
             "multi_match": {
                 "query": query,
@@ -22,27 +77,73 @@ def search_media(query: str, db: Session = Depends(get_db)):
                 "fuzziness": "AUTO",
                 "operator": "and"
             }
-        }
+        },
+        "_source": {"includes": includes, "excludes": excludes},
+        # filename (the document id) breaks score ties so the cursor is stable across pages.
+        "sort": [{"_score": "desc"}, {"filename": "asc"}],
+        "track_total_hits": True,
     }
+    if search_after:
+        search_body["search_after"] = _decode_cursor(search_after)
+    if highlight:
+        search_body["highlight"] = {
+            "pre_tags": [HIGHLIGHT_TAGS[0]],
+            "post_tags": [HIGHLIGHT_TAGS[1]],
+            "fields": {
+                "summary": {"number_of_fragments": 0},  # whole summary, matches marked
+                "transcript": {
+                    "fragment_size": SEARCH_FRAGMENT_SIZE,
+                    "number_of_fragments": SEARCH_HIGHLIGHT_FRAGMENTS,
+                },
+            },
+        }
 
     try:
-        res = es.search(index=ELASTIC_INDEX, body=search_body)
+        res = await get_async_es().search(index=ELASTIC_INDEX, body=search_body)
         logger.info(f"Search completed: {len(res['hits']['hits'])} results found for '{query}'")
     except Exception as exc:
         logger.error(f"Elasticsearch search failed: {exc}")
         raise HTTPException(status_code=500, detail="Search failed.")
 
+    hits = res["hits"]["hits"]
     results = [
         {
-            "filename": hit["_source"].get("filename", ""),
-            "summary": hit["_source"].get("summary", ""),
-            "media_type": hit["_source"].get("media_type", ""),
-            "transcript": hit["_source"].get("transcript", ""), 
-            "media_metadata": hit["_source"].get("media_metadata", {}) 
+            **hit["_source"],
+            "filename": hit["_source"].get("filename", hit["_id"]),
+            "score": hit["_score"],
+            "highlights": hit.get("highlight", {}),
         }
-        for hit in res["hits"]["hits"]
+        for hit in hits
     ]
 
+    return {
+        "results": results,
+        "total": res["hits"]["total"]["value"],
+        "page_size": page_size,
+        # Absent on the last page
+        "next_search_after": _encode_cursor(hits[-1]["sort"]) if len(hits) == page_size else None,
+    }
+
 
-    return {"results": results}
+@router.get("/media/{filename}/transcript")
+async def get_transcript(filename: str):
+    """Full transcript and timestamped segments of one search result, fetched on demand."""
+    try:
+        doc = await get_async_es().get(
+            index=ELASTIC_INDEX,
+            id=filename,
+            _source_includes=["filename", "media_type", "transcript", "transcript_segments"],
+        )
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail=f"No indexed media named '{filename}'.")
+    except Exception as exc:
+        logger.error(f"Elasticsearch transcript fetch failed for {filename}: {exc}")
+        raise HTTPException(status_code=500, detail="Transcript fetch failed.")
 
+    source = doc["_source"]
+    return {
+        "filename": source.get("filename", filename),
+        "media_type": source.get("media_type", ""),
+        "transcript": source.get("transcript", ""),
+        "transcript_segments": source.get("transcript_segments", []),
+    }
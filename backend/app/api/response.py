@@ -1,8 +1,25 @@
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, Union
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
 
 class AnalysisResult(BaseModel):
     filename: str
     summary: Union[str, Dict[str, Any]]  # Allow summary to be either string or dict
     transcript: Optional[str]
+    transcript_segments: Optional[List[Dict[str, Any]]] = None  # [{"start", "end", "text"}] in seconds
     media_metadata: Optional[Dict[str, Any]] = None  # Make media_metadata optional with default None
+
+class JobStatus(BaseModel):
+    job_id: str
+    filename: str
+    media_type: str
+    status: str  # queued | running | succeeded | failed
+    stage: Optional[str] = None
+    progress: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    retry_at: Optional[datetime] = None  # Set while a failed job waits out its retry backoff
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
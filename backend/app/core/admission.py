@@ -0,0 +1,197 @@
+# app/core/admission.py
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import HTTPException
+from app.core.config import (
+    ADMISSION_MAX_ACTIVE,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    VISION_LIMIT,
+    LLM_LIMIT,
+    WHISPER_LIMIT,
+)
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 300
+HOLD_EWMA_ALPHA = 0.2  # Weight of the newest sample in the average hold time
+
+
+class AdmissionRejected(Exception):
+    """Raised when a limiter's wait queue is full (429) or the wait timed out (503)."""
+
+    def __init__(self, resource: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{resource}: {reason}")
+        self.resource = resource
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class ResourceLimiter:
+    """
+    Concurrency limit with a bounded, observable wait queue.
+
+    At most `limit` holders run at once. When `max_queue` is set, callers arriving while
+    that many are already waiting are rejected immediately; when `queue_timeout` is set,
+    callers that wait longer are rejected. Without either, callers simply queue.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_hold: Optional[float] = None
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queue ahead of the caller times average hold time."""
+        hold = self.avg_hold if self.avg_hold is not None else 5.0
+        estimate = hold * (self.waiting + 1) / self.limit
+        return int(min(RETRY_AFTER_MAX, max(RETRY_AFTER_MIN, math.ceil(estimate))))
+
+    def queue_full(self) -> bool:
+        """True if `enter` would be rejected right now for a full wait queue."""
+        return self._semaphore.locked() and self.max_queue is not None and self.waiting >= self.max_queue
+
+    async def enter(self) -> float:
+        """Wait for a slot (or raise AdmissionRejected); returns the time the slot was taken."""
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # A free slot is taken without yielding, so later arrivals see the limiter as full at once.
+            await self._semaphore.acquire()
+            return self._admitted(start)
+
+        if self.max_queue is not None and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, 429, self.retry_after(), "wait queue is full")
+
+        self.waiting += 1
+        try:
+            if self.queue_timeout is None:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise AdmissionRejected(
+                self.name, 503, self.retry_after(), f"no capacity within {self.queue_timeout:.0f}s"
+            )
+        finally:
+            self.waiting -= 1
+        return self._admitted(start)
+
+    def _admitted(self, start: float) -> float:
+        acquired = time.perf_counter()
+        waited = acquired - start
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.active += 1
+        return acquired
+
+    def exit(self, acquired: float):
+        held = time.perf_counter() - acquired
+        self.avg_hold = held if self.avg_hold is None else (
+            HOLD_EWMA_ALPHA * held + (1 - HOLD_EWMA_ALPHA) * self.avg_hold
+        )
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def acquire(self):
+        acquired = await self.enter()
+        try:
+            yield
+        finally:
+            self.exit(acquired)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_seconds": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+            "avg_hold_seconds": round(self.avg_hold, 3) if self.avg_hold is not None else None,
+        }
+
+
+_limiters: Dict[str, ResourceLimiter] = {}
+
+
+def get_limiter(name: str) -> ResourceLimiter:
+    """
+    Process-wide limiters: "analysis" gates whole requests at the API edge; "vision",
+    "llm" and "whisper" bound concurrent calls into each model. Embeddings are
+    serialized through the micro-batcher instead (see app/core/embedding_batcher.py).
+    """
+    if name not in _limiters:
+        if name == "analysis":
+            _limiters[name] = ResourceLimiter(name, ADMISSION_MAX_ACTIVE, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+        else:
+            limits = {"vision": VISION_LIMIT, "llm": LLM_LIMIT, "whisper": WHISPER_LIMIT}
+            _limiters[name] = ResourceLimiter(name, limits[name])
+    return _limiters[name]
+
+
+def capacity_snapshot() -> dict:
+    return {name: get_limiter(name).snapshot() for name in ("analysis", "vision", "llm", "whisper")}
+
+
+def _busy(e: AdmissionRejected) -> HTTPException:
+    logger.warning(f"🚦 Rejected request ({e.status_code}): {e}; retry after {e.retry_after}s")
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"Server busy: {e.reason}",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def check_analysis_capacity():
+    """
+    FastAPI dependency rejecting an upload with 429 before its body is read when the
+    "analysis" wait queue is already full. It takes no slot; see `admit_analysis`.
+    """
+    limiter = get_limiter("analysis")
+    if limiter.queue_full():
+        limiter.rejected += 1
+        raise _busy(AdmissionRejected(limiter.name, 429, limiter.retry_after(), "wait queue is full"))
+
+
+@asynccontextmanager
+async def admit_analysis():
+    """
+    Hold an "analysis" slot around the work on an upload that has already been spooled.
+
+    Slots are taken only once the body is on disk, so slow uploaders never hold
+    ADMISSION_MAX_ACTIVE slots while their bytes trickle in. Overload is turned into a
+    fast 429 (queue full) or 503 (waited too long) with Retry-After.
+    """
+    limiter = get_limiter("analysis")
+    try:
+        acquired = await limiter.enter()
+    except AdmissionRejected as e:
+        raise _busy(e)
+    try:
+        yield
+    finally:
+        limiter.exit(acquired)
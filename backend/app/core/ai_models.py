@@ -1,16 +1,33 @@
 import os
 import time
-import torch
-import whisper
-from typing import Optional
-from sentence_transformers import SentenceTransformer
-from ollama import Client
+import asyncio
+import threading
+import httpx
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+from ollama import AsyncClient, Client
+from app.core.config import (
+    OLLAMA_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS,
+    WHISPER_MODEL,
+    WHISPER_WORKERS,
+    MODEL_WARMUP,
+)
+from app.core.admission import get_limiter
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embedding_backends import create_embedding_backend
+from app.core.transcription import segments_from_result, shutdown_transcription_pool, transcribe_chunked
 from app.core.logging.logger import get_logger
 
 logger = get_logger(__name__)
 
 _verified_models = set()
 
+# Models tracked for lazy loading and readiness, in warm-up priority order
+MODEL_NAMES = ("embedding", "llm", "vision", "whisper")
+OLLAMA_MODELS = {"llm": "llama3:8b", "vision": "llama3.2-vision:11b"}
+
 def ensure_ollama_model(client: Client, model_name: str, retries: int = 3, delay: int = 5):
     if model_name in _verified_models:
         return
@@ -30,67 +47,256 @@ def ensure_ollama_model(client: Client, model_name: str, retries: int = 3, delay
             time.sleep(delay)
     raise RuntimeError(f"Could not verify or pull model '{model_name}' after {retries} attempts.")
 
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+class _FallbackWhisper:
+    def transcribe(self, audio, **kwargs):
+        return {"text": "N/A", "segments": []}
+
+
 class OllamaModelLoader:
+    """
+    Entry point for every model call. Construction is cheap (clients and executors only);
+    each model is loaded or verified on first use, or ahead of time by `warm_up`.
+    """
+
     def __init__(self):
         env = os.getenv("ENV", "prod")
         default_host = "http://host.docker.internal:11434" if env == "dev" else "http://ollama:11434"
         ollama_host = os.getenv("OLLAMA_HOST", default_host)
         self.client = Client(host=ollama_host)
+        # Shared, pooled HTTP connection for non-blocking inference from async code.
+        self.async_client = AsyncClient(
+            host=ollama_host,
+            timeout=OLLAMA_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            ),
+        )
+        # A dedicated executor keeps CPU-heavy Whisper work off the event loop
+        # without competing with the default threadpool used by FastAPI.
+        self.whisper_executor = ThreadPoolExecutor(max_workers=WHISPER_WORKERS, thread_name_prefix="whisper")
+        # The embedding backend itself loads on the batcher thread at the first request.
+        self.embedding_batcher = EmbeddingBatcher(self._encode)
+
+        self._models: Dict[str, object] = {}
+        self._locks = {name: threading.Lock() for name in MODEL_NAMES}
+        self._status = {
+            name: {"state": "cold", "load_seconds": None, "error": None, "detail": None}
+            for name in MODEL_NAMES
+        }
 
+    # ----------------------------------------
+    # Lazy loading
+    # ----------------------------------------
+    def _get(self, name: str, factory: Callable[[], object]):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            status = self._status[name]
+            status["state"] = "loading"
+            start = time.perf_counter()
+            try:
+                model = factory()
+            except Exception as e:
+                status.update(state="failed", error=str(e))
+                raise
+            status["load_seconds"] = round(time.perf_counter() - start, 2)
+            if status["state"] == "loading":
+                status.update(state="ready", error=None)
+            self._models[name] = model
+            logger.info(f"✅ Model '{name}' {status['state']} in {status['load_seconds']}s")
+            return model
+
+    def _verify_ollama(self, name: str) -> str:
+        model_name = OLLAMA_MODELS[name]
+        self._status[name]["detail"] = model_name
         try:
-            ensure_ollama_model(self.client, "llama3:8b")
-            ensure_ollama_model(self.client, "llama3.2-vision:11b")
+            ensure_ollama_model(self.client, model_name)
         except Exception as e:
+            # Best effort, as before: chat calls still go through and report their own errors.
             logger.error(f"Model verification failed: {e}")
+            self._status[name].update(state="degraded", error=str(e))
+        return model_name
+
+    def _ollama_model(self, name: str) -> str:
+        return self._get(name, lambda: self._verify_ollama(name))
+
+    async def _ollama_model_async(self, name: str) -> str:
+        if name in self._models:
+            return self._models[name]
+        return await asyncio.to_thread(self._ollama_model, name)
+
+    def _load_whisper(self):
+        import torch
+        import whisper
 
         if torch.backends.mps.is_available():
-            self.device = "mps"
+            device = "mps"
         elif torch.cuda.is_available():
-            self.device = "cuda"
+            device = "cuda"
         else:
-            self.device = "cpu"
-        logger.info(f"Using device: {self.device}")
-
+            device = "cpu"
+        logger.info(f"Using device: {device}")
+        self._status["whisper"]["detail"] = f"{WHISPER_MODEL} on {device}"
         try:
-            self.whisper_model = whisper.load_model("base")
-            logger.info("✅ Whisper loaded.")
+            return whisper.load_model(WHISPER_MODEL)
         except Exception as e:
             logger.warning(f"⚠️ Whisper fallback: {e}")
-            self.whisper_model = type("DummyWhisper", (), {"transcribe": lambda _, __: {"text": "N/A"}})()
+            self._status["whisper"].update(state="degraded", error=str(e))
+            return _FallbackWhisper()
+
+    def _load_embedding_backend(self):
+        backend = create_embedding_backend()
+        self._status["embedding"]["detail"] = backend.name
+        return backend
+
+    @property
+    def whisper_model(self):
+        return self._get("whisper", self._load_whisper)
+
+    @property
+    def embedding_backend(self):
+        return self._get("embedding", self._load_embedding_backend)
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding_backend.encode(texts)
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """
+        Load (and for Ollama, pull and page into memory) the given models, in priority order.
+        Failures are recorded in `model_status()` rather than raised.
+        """
+        names = [name for name in MODEL_NAMES if names is None or name in names]
+        for name in names:
+            try:
+                if name in OLLAMA_MODELS:
+                    model_name = self._ollama_model(name)
+                    # An empty prompt makes Ollama load the weights without generating.
+                    self.client.generate(model=model_name, prompt="")
+                elif name == "whisper":
+                    self.whisper_model
+                else:
+                    self.embedding_backend
+            except Exception as e:
+                logger.error(f"❌ Warm-up of '{name}' failed: {e}")
+        logger.info(f"🔥 Model warm-up finished: {', '.join(names) or 'nothing to do'}")
+
+    def model_status(self) -> dict:
+        return {name: dict(status) for name, status in self._status.items()}
 
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+    @staticmethod
+    def _vision_messages(prompt: str, image_bytes: bytes) -> list:
+        return [{"role": "user", "content": prompt, "images": [image_bytes]}]
 
-    def vision_infer(self, image_path: str, prompt: str) -> str:
-        with open(image_path, "rb") as img:
-            image_bytes = img.read()
+    @staticmethod
+    def _summary_messages(text: str, prompt: Optional[str]) -> list:
+        full_input = f"{prompt}\n\n{text}" if prompt else text
+        return [{"role": "user", "content": full_input}]
+
+    def vision_infer(self, image: Union[str, bytes], prompt: str) -> str:
+        # `image` is either a file path or an already-encoded image buffer.
+        image_bytes = _read_bytes(image) if isinstance(image, str) else image
         response = self.client.chat(
-            model="llama3.2-vision:11b",
-            messages=[{
-                "role": "user",
-                "content": prompt,
-                "images": [image_bytes]
-            }]
+            model=self._ollama_model("vision"),
+            messages=self._vision_messages(prompt, image_bytes)
         )
         return response["message"]["content"]
     
     def summarize_text(self, text: str, prompt: Optional[str] = None) -> str:
-        full_input = f"{prompt}\n\n{text}" if prompt else text
         response = self.client.chat(
-            model="llama3:8b",
-            messages=[{
-                "role": "user",
-                "content": full_input
-            }]
+            model=self._ollama_model("llm"),
+            messages=self._summary_messages(text, prompt)
         )
         return response["message"]["content"]
 
 
-    def transcribe_audio(self, audio_path: str) -> str:
-        result = self.whisper_model.transcribe(audio_path)
+    def transcribe_audio(self, audio: Union[str, np.ndarray]) -> str:
+        # Whisper accepts a file path or 16 kHz mono float32 samples.
+        result = self.whisper_model.transcribe(audio)
         return result.get("text", "").strip()
 
-    def embed_query(self, text: str):
-        return self.embedding_model.encode(text, normalize_embeddings=True).tolist()
+    def transcribe_audio_segments(self, audio: Union[str, np.ndarray]) -> list:
+        return segments_from_result(self.whisper_model.transcribe(audio))
+
+    def embed_query(self, text: str) -> List[float]:
+        # Coalesced with concurrent callers into one batched encode.
+        return self.embedding_batcher.embed(text)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding_batcher.embed_many(texts)
+
+    # ----------------------------------------
+    # Async API: safe to await from request handlers without blocking the event loop.
+    # Each model sits behind a process-wide limiter so concurrent requests queue per resource.
+    # ----------------------------------------
+    async def vision_infer_async(self, image: Union[str, bytes], prompt: str) -> str:
+        image_bytes = await asyncio.to_thread(_read_bytes, image) if isinstance(image, str) else image
+        model_name = await self._ollama_model_async("vision")
+        async with get_limiter("vision").acquire():
+            response = await self.async_client.chat(
+                model=model_name,
+                messages=self._vision_messages(prompt, image_bytes)
+            )
+        return response["message"]["content"]
+
+    async def summarize_text_async(self, text: str, prompt: Optional[str] = None) -> str:
+        model_name = await self._ollama_model_async("llm")
+        async with get_limiter("llm").acquire():
+            response = await self.async_client.chat(
+                model=model_name,
+                messages=self._summary_messages(text, prompt)
+            )
+        return response["message"]["content"]
+
+    async def transcribe_audio_async(self, audio: Union[str, np.ndarray]) -> str:
+        loop = asyncio.get_running_loop()
+        async with get_limiter("whisper").acquire():
+            return await loop.run_in_executor(self.whisper_executor, self.transcribe_audio, audio)
+
+    async def transcribe_segments_async(self, audio: Union[str, np.ndarray], regions: Optional[list] = None) -> dict:
+        """
+        Timestamped transcription. In-memory PCM is split at silences and long tracks are
+        transcribed in parallel worker processes; `regions` limits work to those spans.
+
+        Returns:
+            dict: {"text": flat transcript, "segments": [{"start", "end", "text"}]}
+        """
+        loop = asyncio.get_running_loop()
+
+        async def _local(samples):
+            return await loop.run_in_executor(self.whisper_executor, self.transcribe_audio_segments, samples)
+
+        async with get_limiter("whisper").acquire():
+            if isinstance(audio, str):
+                segments = await _local(audio)
+                return {"text": " ".join(seg["text"] for seg in segments).strip(), "segments": segments}
+            return await transcribe_chunked(audio, regions, _local)
+
+    async def embed_query_async(self, text: str) -> List[float]:
+        return await self.embedding_batcher.embed_async(text)
+
+    async def embed_many_async(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding_batcher.embed_many_async(texts)
+
+    def close(self):
+        self.whisper_executor.shutdown(wait=False, cancel_futures=True)
+        self.embedding_batcher.close()
+        shutdown_transcription_pool()
+
+def warmup_targets(setting: str = MODEL_WARMUP) -> List[str]:
+    setting = setting.strip().lower()
+    if setting == "all":
+        return list(MODEL_NAMES)
+    if setting in ("", "none"):
+        return []
+    return [name.strip() for name in setting.split(",") if name.strip() in MODEL_NAMES]
 
 _model_loader_instance = None
 
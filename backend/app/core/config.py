@@ -33,10 +33,113 @@ API_VERSION = "1.0.0"
 # ----------------------------------------
 # AI Model Configurations
 # ----------------------------------------
-MAX_FRAME_COUNT = 3
+MAX_FRAME_COUNT = 3  # Fixed frame count for the legacy "uniform" keyframe mode
+KEYFRAME_MODE = os.getenv("KEYFRAME_MODE", "scene")  # "scene" (single-pass scene detection) or "uniform"
+KEYFRAMES_PER_MINUTE = float(os.getenv("KEYFRAMES_PER_MINUTE", 2))
+MIN_KEYFRAMES = int(os.getenv("MIN_KEYFRAMES", 3))  # Short or static clips still get several views
+MAX_KEYFRAMES = int(os.getenv("MAX_KEYFRAMES", 12))
+SCENE_SAMPLE_FPS = float(os.getenv("SCENE_SAMPLE_FPS", 2))  # Frames scored per second of video
+SCENE_MIN_SCORE = float(os.getenv("SCENE_MIN_SCORE", 0.08))  # 0..1; lower keeps subtler cuts
+SCENE_MIN_GAP_SECONDS = float(os.getenv("SCENE_MIN_GAP_SECONDS", 2))
+FRAME_DEDUP_MAX_DISTANCE = int(os.getenv("FRAME_DEDUP_MAX_DISTANCE", 6))  # dHash Hamming bits; -1 disables
+# llama3.2-vision tiles inputs at 560px (up to 2x2), so larger frames only cost upload/preprocessing time.
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", 1120))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", 85))
+AUDIO_EXTRACT_MODE = os.getenv("AUDIO_EXTRACT_MODE", "pcm")  # "pcm" (ffmpeg -> NumPy) or "moviepy" (temp WAV)
+AUDIO_SAMPLE_RATE = 16000  # Whisper's native input rate
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", 12))  # Speech must exceed the noise floor by this
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", 250))
+VAD_MERGE_GAP_MS = int(os.getenv("VAD_MERGE_GAP_MS", 500))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", 200))
+VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", 2))  # Concurrent frame captions per video
+
+# ----------------------------------------
+# Model Inference Config
+# ----------------------------------------
+# Models loaded in the background at startup: "all", "none", or a comma list of
+# embedding,llm,vision,whisper (e.g. "embedding,llm" for search-only replicas).
+# Anything not warmed loads on first use.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "all")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 600))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 8))
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", 1))
+# Long audio is split at silences into chunks transcribed in parallel worker processes.
+TRANSCRIBE_PROCESSES = int(os.getenv("TRANSCRIBE_PROCESSES", max(1, min(4, (os.cpu_count() or 2) // 2))))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", 120))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Stamped on every indexed vector next to EMBEDDING_MODEL. Bump it whenever stored vectors
+# stop being comparable with new ones (model, VECTOR_DIMS, backend or input text changes),
+# then run scripts/backfill_embeddings.py.
+EMBEDDING_VERSION = os.getenv("EMBEDDING_VERSION", "1")
+# "torch" (fp32), "torch-int8" (dynamic int8 quantization) or "onnx" (onnxruntime, no torch)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# File within the model repo for the onnx backend; e.g. "onnx/model_quint8_avx2.onnx" for int8
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", 256))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", 0))  # 0 = library default
+# Concurrent embedding requests are coalesced into one encode call of up to
+# EMBEDDING_BATCH_SIZE texts, waiting at most EMBEDDING_BATCH_WAIT_MS for company.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
 MIN_SUMMARY_LENGTH = 50
 MAX_SUMMARY_LENGTH = 125
 
+# ----------------------------------------
+# Batch Ingestion Config
+# ----------------------------------------
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))
+INGEST_PROCESS_WORKERS = int(os.getenv("INGEST_PROCESS_WORKERS", os.cpu_count() or 2))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 ** 3))
+# Local record of (path, size, mtime, hash, status) so repeat runs only touch new or changed files.
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(BASE_DIR, "cache", "ingest_manifest.sqlite3"))
+INGEST_WATCH_INTERVAL = float(os.getenv("INGEST_WATCH_INTERVAL", 10))
+# Files modified more recently than this may still be copying in; they are picked up on a later pass.
+INGEST_SETTLE_SECONDS = float(os.getenv("INGEST_SETTLE_SECONDS", 5))
+
+# ----------------------------------------
+# Job Queue Config
+# ----------------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # Concurrent jobs per API process; 0 disables workers
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", 15))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 120))  # Running jobs silent this long are requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 30))  # Delay before the first retry; doubles per attempt
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", 600))
+# Uploads for queued jobs must survive restarts, so they are not kept under the OS temp dir.
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(BASE_DIR, "spool", "jobs"))
+
+# ----------------------------------------
+# Admission Control Config
+# ----------------------------------------
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", 2))  # Analysis requests served at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 8))  # Requests allowed to wait; beyond this -> 429
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 30))  # Longest wait before 503
+# Concurrent calls into each model, shared by uploads, jobs and batch ingestion in this process
+VISION_LIMIT = int(os.getenv("VISION_LIMIT", 2))
+LLM_LIMIT = int(os.getenv("LLM_LIMIT", 1))
+WHISPER_LIMIT = int(os.getenv("WHISPER_LIMIT", 1))  # Each transcription may still fan out over TRANSCRIBE_PROCESSES
+
+# ----------------------------------------
+# Analysis Cache Config
+# ----------------------------------------
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", os.path.join(BASE_DIR, "cache", "analysis"))
+# Bump to invalidate cached results after changing models or prompts.
+ANALYSIS_CACHE_VERSION = os.getenv("ANALYSIS_CACHE_VERSION", "2")
+
+# ----------------------------------------
+# Query Cache Config
+# ----------------------------------------
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 24 * 3600))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 512))  # 0 disables result caching
+# Writes from this process invalidate immediately; the TTL bounds staleness from other writers.
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300))
+
 # ----------------------------------------
 # PostgreSQL Config
 # ----------------------------------------
@@ -54,7 +157,56 @@ DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTG
 # ----------------------------------------
 ELASTIC_HOST = os.getenv("ELASTIC_HOST", "http://localhost:9200")
 ELASTIC_INDEX = os.getenv("ELASTIC_INDEX", "media_index")
+# Client connection pool and retry policy, shared by the async client and the sync one used by scripts
+ELASTIC_MAX_CONNECTIONS = int(os.getenv("ELASTIC_MAX_CONNECTIONS", 50))  # pooled connections per ES node
+ELASTIC_REQUEST_TIMEOUT = float(os.getenv("ELASTIC_REQUEST_TIMEOUT", 30))  # seconds per request
+ELASTIC_MAX_RETRIES = int(os.getenv("ELASTIC_MAX_RETRIES", 3))
+ELASTIC_RETRY_ON_TIMEOUT = os.getenv("ELASTIC_RETRY_ON_TIMEOUT", "true").lower() in ("1", "true", "yes")
 VECTOR_DIMS = int(os.getenv("VECTOR_DIMS", 384))
+# Transcript passages, one document per chunk, linked to their media file by `filename`
+ELASTIC_PASSAGE_INDEX = os.getenv("ELASTIC_PASSAGE_INDEX", f"{ELASTIC_INDEX}_passages")
+# "knn" = approximate HNSW search over indexed vectors (Elasticsearch 8.x),
+# "exact" = brute-force script_score against every document; the recall baseline.
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "knn")
+# Nearest-neighbor candidates gathered per shard before the top k are returned; raise for recall.
+KNN_NUM_CANDIDATES = int(os.getenv("KNN_NUM_CANDIDATES", 100))
+# HNSW graph parameters, fixed when an index is created
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 100))
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", 800))
+RAG_PASSAGES_PER_DOC = int(os.getenv("RAG_PASSAGES_PER_DOC", 3))  # Best passages sent to the LLM per media file
+# "hybrid" = BM25 and vector search in one _msearch, merged by reciprocal rank fusion;
+# "vector" = vector search, with a keyword query only when nothing beats score_threshold.
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+RAG_VECTOR_WEIGHT = float(os.getenv("RAG_VECTOR_WEIGHT", 1.0))
+RAG_KEYWORD_WEIGHT = float(os.getenv("RAG_KEYWORD_WEIGHT", 1.0))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", 60))  # Rank constant: larger flattens the gap between top ranks
+RAG_CONTEXT_DOCS = int(os.getenv("RAG_CONTEXT_DOCS", 2))  # Media files sent to the LLM
+# Re-embedding backfill: texts per search page / encode call / bulk request, and its resume checkpoint
+EMBEDDING_BACKFILL_BATCH_SIZE = int(os.getenv("EMBEDDING_BACKFILL_BATCH_SIZE", 256))
+EMBEDDING_BACKFILL_STATE_PATH = os.getenv(
+    "EMBEDDING_BACKFILL_STATE_PATH", os.path.join(BASE_DIR, "cache", "embedding_backfill.json")
+)
+
+# Keyword search API (/search/media)
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 10))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", 100))
+SEARCH_HIGHLIGHT_FRAGMENTS = int(os.getenv("SEARCH_HIGHLIGHT_FRAGMENTS", 3))  # Transcript fragments per hit
+SEARCH_FRAGMENT_SIZE = int(os.getenv("SEARCH_FRAGMENT_SIZE", 150))  # Characters per fragment
+
+# ----------------------------------------
+# Local Vector Index Config
+# ----------------------------------------
+# Where RAG runs vector search: "elasticsearch", or "local" for an in-process memory-mapped
+# index (no network hop per query) kept in sync from this process's writes and from ES.
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "elasticsearch")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(BASE_DIR, "cache", "vector_index"))
+# "float32", or "int8" for a 4x smaller matrix with per-row scales
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+# Seconds between catch-up syncs of documents other processes wrote to ES; 0 disables
+VECTOR_INDEX_SYNC_INTERVAL = float(os.getenv("VECTOR_INDEX_SYNC_INTERVAL", 60))
+# Seconds between sweeps for documents deleted from ES (a scan of every media id); 0 = startup only
+VECTOR_INDEX_PRUNE_INTERVAL = float(os.getenv("VECTOR_INDEX_PRUNE_INTERVAL", 3600))
 
 # ----------------------------------------
 #  External Storage Config
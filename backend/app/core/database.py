@@ -1,4 +1,5 @@
 # app/core/database.py
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.core.config import DATABASE_URL
@@ -28,4 +29,6 @@ def get_sync_db():
 async def init_db():
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all never alters existing tables; add columns introduced since.
+        await conn.execute(text("ALTER TABLE analysis_jobs ADD COLUMN IF NOT EXISTS available_at TIMESTAMP WITH TIME ZONE"))
         logger.info("✅ Database tables created")
@@ -1,37 +1,225 @@
 # app/core/elasticsearch.py
-from elasticsearch import Elasticsearch
-from app.core.config import ELASTIC_HOST, ELASTIC_INDEX, VECTOR_DIMS
+import re
+import copy
+from typing import Dict, List, Optional
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from app.core.config import (
+    ELASTIC_HOST,
+    ELASTIC_MAX_CONNECTIONS,
+    ELASTIC_REQUEST_TIMEOUT,
+    ELASTIC_MAX_RETRIES,
+    ELASTIC_RETRY_ON_TIMEOUT,
+    ELASTIC_INDEX,
+    ELASTIC_PASSAGE_INDEX,
+    VECTOR_DIMS,
+    EMBEDDING_MODEL,
+    EMBEDDING_VERSION,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+)
 from app.core.logging.logger import get_logger
 
 logger = get_logger(__name__)
 
-es = Elasticsearch(ELASTIC_HOST)
+CLIENT_OPTIONS = {
+    "connections_per_node": ELASTIC_MAX_CONNECTIONS,
+    "request_timeout": ELASTIC_REQUEST_TIMEOUT,
+    "max_retries": ELASTIC_MAX_RETRIES,
+    "retry_on_timeout": ELASTIC_RETRY_ON_TIMEOUT,
+    # Overloaded or restarting nodes; other errors are returned to the caller at once.
+    "retry_on_status": (429, 502, 503, 504),
+}
 
-async def init_elasticsearch():
-    try:
-        if es.indices.exists(index=ELASTIC_INDEX):
-            # es.indices.delete(index=ELASTIC_INDEX)
-            # logger.warning(f"Deleted old Elasticsearch index: {ELASTIC_INDEX}")
-            pass
-
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "filename": {"type": "keyword"},
-                    "media_type": {"type": "keyword"},
-                    "summary": {"type": "text"},
-                    "transcript": {"type": "text"},
-                    "relative_path": {"type": "keyword"},
-                    "timestamp": {"type": "date"},
-                    "vector": {
-                        "type": "dense_vector",
-                        "dims": VECTOR_DIMS
-                    }
-                }
-            }
+# Blocking client for CLI scripts and worker threads (e.g. the local vector index sync).
+es = Elasticsearch(ELASTIC_HOST, **CLIENT_OPTIONS)
+
+_async_es: Optional[AsyncElasticsearch] = None
+
+
+def get_async_es() -> AsyncElasticsearch:
+    """
+    Process-wide async client used by request handlers and storage. Its connection pool
+    is shared by all concurrent requests, so ES calls never hold a thread. Created on
+    first use inside the running event loop; `close_elasticsearch` releases it.
+    """
+    global _async_es
+    if _async_es is None:
+        _async_es = AsyncElasticsearch(ELASTIC_HOST, **CLIENT_OPTIONS)
+    return _async_es
+
+
+async def close_elasticsearch():
+    global _async_es
+    if _async_es is not None:
+        await _async_es.close()
+        _async_es = None
+
+
+# Bump when a mapping change needs a new index; scripts/backfill_embeddings.py --reuse-vectors
+# migrates existing data. 2: vectors indexed in an HNSW graph for kNN search.
+INDEX_MAPPING_REVISION = 2
+
+# Cosine similarity matches normalize_embeddings=True, and also tolerates unnormalized vectors.
+VECTOR_PROPERTY = {
+    "type": "dense_vector",
+    "dims": VECTOR_DIMS,
+    "index": True,
+    "similarity": "cosine",
+    "index_options": {"type": "hnsw", "m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+}
+
+# Which model produced a document's `vector`, so it can be re-embedded without re-analysis.
+EMBEDDING_STAMP_PROPERTIES = {
+    "embedding_model": {"type": "keyword"},
+    "embedding_version": {"type": "keyword"},
+}
+
+MEDIA_MAPPING = {
+    "mappings": {
+        "properties": {
+            "filename": {"type": "keyword"},
+            "media_type": {"type": "keyword"},
+            "summary": {"type": "text"},
+            "transcript": {"type": "text"},
+            # Timestamped Whisper segments; stored for retrieval, not searched.
+            "transcript_segments": {"type": "object", "enabled": False},
+            "relative_path": {"type": "keyword"},
+            "timestamp": {"type": "date"},
+            "vector": VECTOR_PROPERTY,
+            **EMBEDDING_STAMP_PROPERTIES,
         }
+    }
+}
+
+# One document per transcript chunk; `filename` links it to its media document.
+# The file's summary rides along on each passage (stored, not searched), so RAG gets it
+# from the passage hit instead of a second round trip for files matched only by passages.
+PASSAGE_CONTEXT_PROPERTIES = {
+    "summary": {"type": "text", "index": False},
+}
+
+PASSAGE_MAPPING = {
+    "mappings": {
+        "properties": {
+            "filename": {"type": "keyword"},
+            "media_type": {"type": "keyword"},
+            "chunk_index": {"type": "integer"},
+            "text": {"type": "text"},
+            "start": {"type": "float"},
+            "end": {"type": "float"},
+            "vector": VECTOR_PROPERTY,
+            **PASSAGE_CONTEXT_PROPERTIES,
+            **EMBEDDING_STAMP_PROPERTIES,
+        }
+    }
+}
+
+
+def versioned_index_name(alias: str, model: str = EMBEDDING_MODEL, version: str = EMBEDDING_VERSION,
+                         revision: int = INDEX_MAPPING_REVISION) -> str:
+    """
+    Physical index behind `alias` for one embedding model/version and mapping revision,
+    e.g. media_index-all-minilm-l6-v2-v1-m2.
+    """
+    slug = re.sub(r"[^a-z0-9_.]+", "-", f"{model}-v{version}-m{revision}".lower()).strip("-")
+    return f"{alias}-{slug}"
+
 
-        es.indices.create(index=ELASTIC_INDEX, body=mapping)
-        logger.info(f"✅ Created Elasticsearch index '{ELASTIC_INDEX}'")
+def mapping_with_dims(mapping: dict, dims: int) -> dict:
+    mapping = copy.deepcopy(mapping)
+    mapping["mappings"]["properties"]["vector"]["dims"] = dims
+    return mapping
+
+
+def _vectors_indexed(mappings) -> bool:
+    return all(
+        mappings[index]["mappings"].get("properties", {}).get("vector", {}).get("index", False)
+        for index in mappings
+    )
+
+
+def knn_ready(alias: str) -> bool:
+    """Whether every index behind `alias` has its vectors in an HNSW graph (required by kNN search)."""
+    return _vectors_indexed(es.indices.get_mapping(index=alias))
+
+
+def alias_targets(alias: str) -> List[str]:
+    """
+    Concrete indices that `alias` resolves to: its alias targets, `[alias]` for an
+    index created under that name before aliases were used, or `[]` if it doesn't exist.
+    """
+    if es.indices.exists_alias(name=alias):
+        return sorted(es.indices.get_alias(name=alias))
+    if es.indices.exists(index=alias):
+        return [alias]
+    return []
+
+
+def swap_aliases(targets: Dict[str, str]):
+    """
+    Atomically point each alias at its new index, in one `_aliases` request, so readers
+    switch every index at once. A legacy concrete index holding the alias name is deleted
+    in the same request; indices that were behind a real alias are kept for rollback.
+    """
+    actions = []
+    for alias, index in targets.items():
+        for current in alias_targets(alias):
+            if current == index:
+                continue
+            if current == alias:
+                actions.append({"remove_index": {"index": current}})
+            else:
+                actions.append({"remove": {"index": current, "alias": alias}})
+        actions.append({"add": {"index": index, "alias": alias}})
+    es.indices.update_aliases(body={"actions": actions})
+    logger.info(f"🔀 Swapped aliases: {', '.join(f'{a} -> {i}' for a, i in targets.items())}")
+
+
+def scan_pages(index: str, sort: List[str], page_size: int, after: Optional[list] = None,
+               query: Optional[dict] = None, source_excludes: Optional[List[str]] = None,
+               source_includes: Optional[List[str]] = None):
+    """
+    Yield pages of hits in `sort` order using search_after. Each hit's "sort" value can be
+    persisted and passed back as `after` to resume a scan.
+    """
+    while True:
+        body = {
+            "size": page_size,
+            "query": query or {"match_all": {}},
+            "sort": [{field: "asc"} for field in sort],
+        }
+        if after:
+            body["search_after"] = after
+        hits = es.search(index=index, body=body, _source_excludes=source_excludes or [],
+                         _source_includes=source_includes or [])["hits"]["hits"]
+        if not hits:
+            return
+        yield hits
+        after = hits[-1]["sort"]
+
+
+async def _ensure_index(client: AsyncElasticsearch, alias: str, mapping: dict, added_properties: dict = None):
+    if await client.indices.exists(index=alias):
+        # Older indices predate the stamp fields; adding new fields is a compatible mapping change.
+        await client.indices.put_mapping(
+            index=alias, body={"properties": {**EMBEDDING_STAMP_PROPERTIES, **(added_properties or {})}}
+        )
+        if not _vectors_indexed(await client.indices.get_mapping(index=alias)):
+            logger.warning(
+                f"⚠️ '{alias}' predates HNSW-indexed vectors; kNN queries fall back to exact search. "
+                "Migrate with `python -m scripts.backfill_embeddings --reuse-vectors`."
+            )
+        return
+    # Readers and writers only use the alias, so a re-embedding backfill can swap the index behind it.
+    index = versioned_index_name(alias)
+    await client.indices.create(index=index, body={**mapping, "aliases": {alias: {}}})
+    logger.info(f"✅ Created Elasticsearch index '{index}' (alias '{alias}')")
+
+
+async def init_elasticsearch():
+    client = get_async_es()
+    try:
+        await _ensure_index(client, ELASTIC_INDEX, MEDIA_MAPPING)
+        await _ensure_index(client, ELASTIC_PASSAGE_INDEX, PASSAGE_MAPPING, PASSAGE_CONTEXT_PROPERTIES)
     except Exception as e:
         logger.error(f"❌ Failed to initialize Elasticsearch: {e}")
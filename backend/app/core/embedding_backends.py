@@ -0,0 +1,143 @@
+# app/core/embedding_backends.py
+import os
+from typing import List
+import numpy as np
+from app.core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_VERSION,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBEDDING_MAX_SEQ_LENGTH,
+    EMBEDDING_THREADS,
+)
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+class TorchEmbeddingBackend:
+    """
+    SentenceTransformer in PyTorch; fp32, or with every Linear layer dynamically
+    quantized to int8 (`quantize=True`), which is several times cheaper on CPU.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, quantize: bool = False):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if EMBEDDING_THREADS > 0:
+            torch.set_num_threads(EMBEDDING_THREADS)
+        self.name = "torch-int8" if quantize else "torch"
+        model = SentenceTransformer(model_name, device="cpu" if quantize else None)
+        if quantize:
+            # Quantized kernels are CPU-only; weights are int8, activations quantized on the fly.
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.dim = model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True).tolist()
+
+
+class OnnxEmbeddingBackend:
+    """
+    The same model exported to ONNX, run with onnxruntime and a Rust tokenizer; no torch import.
+
+    `onnx_file` picks a file from the model repo: "onnx/model.onnx" is the fp32 export,
+    "onnx/model_qint8_avx512.onnx", "onnx/model_quint8_avx2.onnx" etc. are int8-quantized.
+    Pooling (attention-masked mean) and L2 normalization match the SentenceTransformer pipeline.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, onnx_file: str = EMBEDDING_ONNX_FILE,
+                 max_seq_length: int = EMBEDDING_MAX_SEQ_LENGTH):
+        try:
+            import onnxruntime as ort
+            from huggingface_hub import hf_hub_download
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "The onnx embedding backend needs `onnxruntime`, `tokenizers` and `huggingface_hub`"
+            ) from e
+
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.name = f"onnx:{os.path.basename(onnx_file)}"
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if EMBEDDING_THREADS > 0:
+            options.intra_op_num_threads = EMBEDDING_THREADS
+        self.session = ort.InferenceSession(
+            hf_hub_download(repo, onnx_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+
+def build_embedding_backend(name: str):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {BACKENDS}")
+    if name == "onnx":
+        return OnnxEmbeddingBackend()
+    return TorchEmbeddingBackend(quantize=name == "torch-int8")
+
+
+def create_embedding_backend(name: str = EMBEDDING_BACKEND):
+    """
+    Build the configured embedding backend ("torch", "torch-int8" or "onnx").
+
+    An unavailable optional backend falls back to fp32 torch rather than leaving the
+    service without embeddings.
+    """
+    try:
+        backend = build_embedding_backend(name)
+    except Exception as e:
+        if name == "torch":
+            raise
+        logger.error(f"❌ Embedding backend '{name}' unavailable, falling back to torch: {e}")
+        backend = TorchEmbeddingBackend()
+    logger.info(f"✅ Embedding backend loaded: {backend.name} ({backend.dim} dims)")
+    return backend
+
+
+def embedding_stamp() -> dict:
+    """Fields stored next to every indexed `vector` to record which model produced it."""
+    return {"embedding_model": EMBEDDING_MODEL, "embedding_version": EMBEDDING_VERSION}
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """
+    Row-wise cosine similarity between two sets of embeddings of the same texts.
+
+    Returns:
+        dict: mean_cosine, min_cosine, p01_cosine (1st percentile)
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    cos = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12
+    )
+    return {
+        "mean_cosine": round(float(cos.mean()), 5),
+        "min_cosine": round(float(cos.min()), 5),
+        "p01_cosine": round(float(np.percentile(cos, 1)), 5),
+    }
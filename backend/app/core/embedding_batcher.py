@@ -0,0 +1,121 @@
+# app/core/embedding_batcher.py
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+from app.core.config import EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches embedding requests onto a single encoder thread.
+
+    Requests arriving within `max_wait_ms` of the first one (or until `max_batch_size`
+    texts are waiting) are encoded in one call, and each caller receives its own vector.
+    Works from both threads (`embed`, `embed_many`) and the event loop (`embed_async`,
+    `embed_many_async`), so RAG queries, uploads and batch ingestion all share batches.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = EMBEDDING_BATCH_SIZE, max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS):
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.encode_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------
+    # Submission
+    # ----------------------------------------
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        # Enqueued together, so they fill whole batches without waiting out the window.
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    async def embed_async(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    async def embed_many_async(self, texts: List[str]) -> List[List[float]]:
+        return list(await asyncio.gather(*(asyncio.wrap_future(self.submit(text)) for text in texts)))
+
+    # ----------------------------------------
+    # Encoder thread
+    # ----------------------------------------
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [(text, future) for text, future in self._collect(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                vectors = self._encode([text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"❌ Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.encode_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "avg_encode_seconds": round(self.encode_seconds / self.batches, 4) if self.batches else 0.0,
+        }
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Embedding service is shut down"))
@@ -0,0 +1,103 @@
+# app/core/query_cache.py
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.core.config import (
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive cache key for a query string."""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    `invalidate()` drops everything and bumps `generation`; a value computed under an
+    older generation is discarded by `put`, so results fetched before a write can't be
+    cached after it.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Query embeddings depend only on the text and the model, so they are never invalidated;
+# search results change whenever documents are written.
+_embedding_cache = TTLCache("query_embeddings", QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+_search_cache = TTLCache("search_results", SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+
+def get_embedding_cache() -> TTLCache:
+    return _embedding_cache
+
+
+def get_search_cache() -> TTLCache:
+    return _search_cache
+
+
+def cache_snapshot() -> dict:
+    return {cache.name: cache.snapshot() for cache in (_embedding_cache, _search_cache)}
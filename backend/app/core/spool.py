@@ -0,0 +1,237 @@
+# app/core/spool.py
+import os
+import asyncio
+import hashlib
+import uuid
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import TEMP_DIR, CLEANUP_TEMP_FILES, STREAM_CHUNK_SIZE, MAX_UPLOAD_BYTES
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when a streamed upload exceeds the configured size limit."""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when a request body is not a multipart upload carrying the expected file."""
+
+
+@dataclass
+class SpooledMedia:
+    """
+    A media file on local disk, hashed while it was streamed in.
+
+    `owned` files were spooled by us and are removed by `cleanup()`; files ingested
+    in place (e.g. from MEDIA_ROOT) are never deleted.
+    """
+    path: str
+    filename: str
+    content_hash: str
+    size: int
+    content_type: Optional[str] = None
+    owned: bool = True
+
+    def cleanup(self):
+        if self.owned and CLEANUP_TEMP_FILES and os.path.exists(self.path):
+            os.remove(self.path)
+            logger.debug(f"🗑 Deleted spooled upload: {self.path}")
+
+
+# Multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD = 64 * 1024
+
+# `spool_request` reads the body itself, so endpoints document the form field here.
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+class _MultipartSpool:
+    """python-multipart callbacks that write one file field straight to disk, hashing it."""
+
+    def __init__(self, boundary: bytes, field: str, dest_dir: str, max_bytes: Optional[int]):
+        self.field = field
+        self.dest_dir = dest_dir
+        self.max_bytes = max_bytes
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._out = None
+        self._headers: dict = {}
+        self._header_field = b""
+        self._header_value = b""
+        # A cancelled upload discards the file while a worker thread may still be writing it.
+        self._lock = threading.Lock()
+        self.parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        # Only the first file in `field`; other form fields and parts are skipped.
+        if self.path is not None or options.get(b"name") != self.field.encode() or not filename:
+            return
+        self.filename = os.path.basename(filename.decode("utf-8", "replace"))
+        self.content_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+        self.path = os.path.join(self.dest_dir, f"{uuid.uuid4().hex}_{self.filename}")
+        self._out = open(self.path, "wb")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._out is None:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds limit of {self.max_bytes} bytes")
+        self._digest.update(chunk)
+        self._out.write(chunk)
+
+    def _on_part_end(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def write(self, data: bytes):
+        with self._lock:
+            self.parser.write(data)
+
+    def finish(self, data: bytes):
+        with self._lock:
+            self.parser.write(data)
+            self.parser.finalize()
+
+    @property
+    def content_hash(self) -> str:
+        return self._digest.hexdigest()
+
+    def discard(self):
+        with self._lock:
+            self._discard()
+
+    def _discard(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def spool_request(
+    request: Request,
+    field: str = "file",
+    max_bytes: Optional[int] = MAX_UPLOAD_BYTES,
+    dest_dir: str = TEMP_DIR,
+) -> SpooledMedia:
+    """
+    Stream the file in multipart form field `field` from the request body straight to
+    `dest_dir`, hashing and size-checking it as it is written: one pass over the bytes,
+    and at most STREAM_CHUNK_SIZE of them in memory. The body must not have been read
+    yet, so endpoints take the `Request` instead of an `UploadFile`.
+
+    A declared Content-Length over the limit is rejected before any of the body is read;
+    otherwise the limit is enforced as the body arrives.
+
+    Raises:
+        UploadTooLargeError: the file is larger than `max_bytes`
+        InvalidUploadError: the body is not multipart or has no file in `field`
+    """
+    body_limit = None if max_bytes is None else max_bytes + MULTIPART_OVERHEAD
+    declared = request.headers.get("content-length", "")
+    if body_limit is not None and declared.isdigit() and int(declared) > body_limit:
+        raise UploadTooLargeError(f"Upload exceeds limit of {max_bytes} bytes")
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    spool = _MultipartSpool(options[b"boundary"], field, dest_dir, max_bytes)
+    buffer = bytearray()
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if body_limit is not None and received > body_limit:
+                raise UploadTooLargeError(f"Upload exceeds limit of {max_bytes} bytes")
+            buffer += chunk
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                await asyncio.to_thread(spool.write, bytes(buffer))
+                buffer.clear()
+        await asyncio.to_thread(spool.finish, bytes(buffer))
+    except MultipartParseError as e:
+        spool.discard()
+        raise InvalidUploadError(f"Malformed multipart upload: {e}")
+    except BaseException:
+        spool.discard()
+        raise
+    if spool.path is None:
+        raise InvalidUploadError(f"No file in form field '{field}'")
+
+    logger.debug(f"📁 Spooled {spool.filename} ({spool.size} bytes) to {spool.path}")
+    return SpooledMedia(
+        path=spool.path,
+        filename=spool.filename,
+        content_hash=spool.content_hash,
+        size=spool.size,
+        content_type=spool.content_type,
+    )
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def spool_from_path(path: str, content_type: Optional[str] = None) -> SpooledMedia:
+    """Wrap a file already on local disk without copying it; only hashes the content."""
+    return SpooledMedia(
+        path=path,
+        filename=os.path.basename(path),
+        content_hash=hash_file(path),
+        size=os.path.getsize(path),
+        content_type=content_type,
+        owned=False,
+    )
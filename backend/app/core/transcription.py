@@ -0,0 +1,171 @@
+# app/core/transcription.py
+import os
+import asyncio
+import multiprocessing
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, List, Optional
+import numpy as np
+from app.core.config import (
+    AUDIO_SAMPLE_RATE,
+    WHISPER_MODEL,
+    TRANSCRIBE_PROCESSES,
+    TRANSCRIBE_CHUNK_SECONDS,
+)
+from app.core.vad import speech_only_audio
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+SPLIT_SEARCH_SECONDS = 10  # How far back from a chunk limit to look for the quietest cut point
+SPLIT_FRAME_MS = 30
+
+# ----------------------------------------
+# Worker-process side
+# ----------------------------------------
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: int):
+    global _worker_model
+    import torch
+    import whisper
+    torch.set_num_threads(torch_threads)
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_in_worker(samples: np.ndarray) -> list:
+    return segments_from_result(_worker_model.transcribe(samples))
+
+
+# ----------------------------------------
+# Chunk planning and timestamp stitching
+# ----------------------------------------
+def segments_from_result(result: dict) -> list:
+    return [
+        {"start": float(seg["start"]), "end": float(seg["end"]), "text": seg["text"].strip()}
+        for seg in result.get("segments", [])
+        if seg.get("text", "").strip()
+    ]
+
+
+def _quietest_point(samples: np.ndarray, sample_rate: int, lo: float, hi: float) -> float:
+    frame_len = int(sample_rate * SPLIT_FRAME_MS / 1000)
+    window = samples[int(lo * sample_rate):int(hi * sample_rate)]
+    n_frames = len(window) // frame_len
+    if n_frames == 0:
+        return hi
+    energy = np.square(window[: n_frames * frame_len].reshape(n_frames, frame_len)).mean(axis=1)
+    return lo + (int(np.argmin(energy)) + 0.5) * frame_len / sample_rate
+
+
+def plan_chunks(samples: np.ndarray, regions: Optional[list], sample_rate: int = AUDIO_SAMPLE_RATE,
+                max_chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS) -> List[list]:
+    """
+    Group audio regions into chunks of at most `max_chunk_seconds` of audio each.
+
+    Regions longer than the limit are cut at the quietest point shortly before it,
+    so chunk boundaries fall in pauses rather than mid-word.
+
+    Returns:
+        list: Chunks, each a list of (start_s, end_s) source regions
+    """
+    if regions is None:
+        regions = [(0.0, len(samples) / sample_rate)]
+
+    pieces = []
+    for start, end in regions:
+        while end - start > max_chunk_seconds:
+            limit = start + max_chunk_seconds
+            # At least half a chunk past `start`, which itself may sit in the pause just cut at.
+            lo = max(start + max_chunk_seconds / 2, limit - SPLIT_SEARCH_SECONDS)
+            cut = _quietest_point(samples, sample_rate, lo, limit)
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    chunks, current, span = [], [], 0.0
+    for start, end in pieces:
+        if current and span + (end - start) > max_chunk_seconds:
+            chunks.append(current)
+            current, span = [], 0.0
+        current.append((start, end))
+        span += end - start
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def remap_segments(segments: list, segment_map: list) -> list:
+    """Translate segment times in trimmed/concatenated audio back to source-audio times."""
+    if not segment_map:
+        return segments
+    offsets = [entry[0] for entry in segment_map]
+
+    def _to_source(t: float) -> float:
+        offset, source_start, duration = segment_map[max(0, bisect_right(offsets, t) - 1)]
+        return round(source_start + min(max(t - offset, 0.0), duration), 2)
+
+    return [{**seg, "start": _to_source(seg["start"]), "end": _to_source(seg["end"])} for seg in segments]
+
+
+# ----------------------------------------
+# Parallel transcription
+# ----------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_transcription_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        torch_threads = max(1, (os.cpu_count() or 1) // TRANSCRIBE_PROCESSES)
+        # spawn, not fork: forking a process that already initialized torch/OpenMP can deadlock.
+        _pool = ProcessPoolExecutor(
+            max_workers=TRANSCRIBE_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(WHISPER_MODEL, torch_threads),
+        )
+        logger.info(f"🧵 Started {TRANSCRIBE_PROCESSES} Whisper worker process(es), {torch_threads} thread(s) each")
+    return _pool
+
+
+def shutdown_transcription_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def transcribe_chunked(
+    samples: np.ndarray,
+    regions: Optional[list],
+    transcribe_local: Callable[[np.ndarray], Awaitable[list]],
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+) -> dict:
+    """
+    Transcribe `regions` of `samples` (the whole track when None) with segment timestamps.
+
+    A single chunk runs on the already-loaded in-process model via `transcribe_local`;
+    multiple chunks fan out across the Whisper worker process pool.
+
+    Returns:
+        dict: {"text": flat transcript, "segments": [{"start", "end", "text"}] in source time}
+    """
+    chunks = plan_chunks(samples, regions, sample_rate)
+    prepared = [speech_only_audio(samples, chunk, sample_rate) for chunk in chunks]
+
+    if len(prepared) <= 1 or TRANSCRIBE_PROCESSES <= 1:
+        results = [await transcribe_local(audio) for audio, _ in prepared]
+    else:
+        logger.info(f"🧩 Transcribing {len(prepared)} chunk(s) in parallel")
+        loop = asyncio.get_running_loop()
+        pool = get_transcription_pool()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _transcribe_in_worker, audio) for audio, _ in prepared
+        ))
+
+    segments = []
+    for chunk_segments, (_, segment_map) in zip(results, prepared):
+        segments.extend(remap_segments(chunk_segments, segment_map))
+    return {"text": " ".join(seg["text"] for seg in segments).strip(), "segments": segments}
@@ -1,9 +1,21 @@
 import os
+import math
+import subprocess
 import cv2
 from PIL import Image
 import numpy as np
-from app.core.config import TEMP_DIR
-from moviepy.editor import VideoFileClip
+from typing import NamedTuple, Optional
+from app.core.config import (
+    AUDIO_SAMPLE_RATE,
+    VISION_MAX_SIDE,
+    VISION_JPEG_QUALITY,
+    KEYFRAMES_PER_MINUTE,
+    MIN_KEYFRAMES,
+    MAX_KEYFRAMES,
+    SCENE_SAMPLE_FPS,
+    SCENE_MIN_SCORE,
+    SCENE_MIN_GAP_SECONDS,
+)
 from app.core.logging.logger import get_logger
 from pathlib import Path
 from PIL.ExifTags import TAGS
@@ -35,6 +47,8 @@ def prepare_image(image_path):
 
 
 def extract_audio(video_path: str, audio_output_path: str) -> str:
+    # Legacy WAV path only (AUDIO_EXTRACT_MODE=moviepy); moviepy.editor is slow to import.
+    from moviepy.editor import VideoFileClip
     try:
         clip = VideoFileClip(video_path)
         clip.audio.write_audiofile(audio_output_path, logger=None)
@@ -44,6 +58,74 @@ def extract_audio(video_path: str, audio_output_path: str) -> str:
         return ""
 
 
+class Keyframe(NamedTuple):
+    """A video frame kept in memory as a model-ready encoded image."""
+    index: int
+    timestamp: float
+    image: bytes
+
+
+def downscale_frame(frame, max_side: int = VISION_MAX_SIDE):
+    """Shrink a frame so its longest side is at most `max_side`; smaller frames are returned as-is."""
+    height, width = frame.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def encode_frame(frame, max_side: int = VISION_MAX_SIDE, quality: int = VISION_JPEG_QUALITY) -> bytes:
+    """
+    Downscale a BGR frame so its longest side is at most `max_side`, then JPEG-encode it.
+    """
+    frame = downscale_frame(frame, max_side)
+    success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def load_image_for_vision(image_path: str) -> bytes:
+    """Read an image file as model-ready bytes, falling back to the raw file if OpenCV can't decode it."""
+    frame = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if frame is not None:
+        return encode_frame(frame)
+    with open(image_path, "rb") as f:
+        return f.read()
+
+
+def has_audio_stream(video_path: str) -> bool:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=index",
+         "-of", "csv=p=0", video_path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+    return bool(result.stdout.strip())
+
+
+def load_audio_pcm(video_path: str, sample_rate: int = AUDIO_SAMPLE_RATE) -> Optional[np.ndarray]:
+    """
+    Decode a video's audio track straight into memory as mono float32 PCM.
+
+    ffmpeg streams s16le samples over a pipe, so no WAV is ever written to disk.
+
+    Returns:
+        np.ndarray: Samples in [-1, 1] at `sample_rate`, or None if there is no audio track
+    """
+    if not has_audio_stream(video_path):
+        return None
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-threads", "0", "-i", video_path,
+         "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg audio decode failed: {result.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
 def extract_keyframes(video_path, max_frames=5):
     """
     Extract key frames from a video.
@@ -53,7 +135,7 @@ def extract_keyframes(video_path, max_frames=5):
         max_frames (int): Maximum number of frames to extract
         
     Returns:
-        list: List of paths to extracted frames
+        list: Keyframes with in-memory, downscaled JPEG images
     """
     try:
         # Open the video file
@@ -73,25 +155,230 @@ def extract_keyframes(video_path, max_frames=5):
             interval = total_frames / max_frames
             frame_indices = [int(i * interval) for i in range(max_frames)]
         
-        frame_paths = []
+        keyframes = []
         for idx in frame_indices:
             # Set the video position
             video.set(cv2.CAP_PROP_POS_FRAMES, idx)
             success, frame = video.read()
             
             if success:
-                # Save the frame
-                frame_path = os.path.join(TEMP_DIR, f"frame_{idx}.jpg")
-                cv2.imwrite(frame_path, frame)
-                frame_paths.append(frame_path)
+                timestamp = idx / fps if fps > 0 else 0.0
+                keyframes.append(Keyframe(idx, round(timestamp, 2), encode_frame(frame)))
         
         video.release()
-        return frame_paths
+        return keyframes
     
     except Exception as e:
         print(f"Error extracting keyframes: {e}")
         return []
 
+# Downscaled size used for scene scoring; tiny frames keep per-sample cost negligible.
+SCENE_THUMB_SIZE = (64, 36)
+HIST_BINS = 32
+BLACK_FRAME_LUMA = 16
+
+
+def keyframe_budget(duration_seconds: float) -> int:
+    """Number of keyframes to extract for a video of the given length."""
+    budget = math.ceil(max(duration_seconds, 0) / 60 * KEYFRAMES_PER_MINUTE)
+    return max(MIN_KEYFRAMES, min(MAX_KEYFRAMES, budget))
+
+
+def _frame_signature(frame):
+    thumb = cv2.resize(frame, SCENE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    hist = np.bincount((gray >> 3).ravel(), minlength=HIST_BINS).astype(np.float32)
+    hist /= hist.sum()
+    return gray.astype(np.float32), hist
+
+
+def _scene_change_score(prev, curr) -> float:
+    """Blend of luma-histogram distance and mean pixel difference, both in [0, 1]."""
+    hist_distance = 0.5 * float(np.abs(curr[1] - prev[1]).sum())
+    pixel_distance = float(np.abs(curr[0] - prev[0]).mean()) / 255.0
+    return 0.5 * hist_distance + 0.5 * pixel_distance
+
+
+def _offer_candidate(candidates: list, budget: int, min_gap: int, score: float, idx: int, frame):
+    # Keep the `budget` best-scoring frames, at most one per `min_gap` window.
+    for i, (other_score, other_idx, _) in enumerate(candidates):
+        if abs(other_idx - idx) < min_gap:
+            if score > other_score:
+                candidates[i] = (score, idx, frame)
+            return
+    if len(candidates) < budget:
+        candidates.append((score, idx, frame))
+        return
+    weakest = min(range(len(candidates)), key=lambda i: candidates[i][0])
+    if score > candidates[weakest][0]:
+        candidates[weakest] = (score, idx, frame)
+
+
+def _fill_uniform(candidates: list, fillers: list, budget: int) -> list:
+    """
+    Top up scene candidates with evenly spread frames when scene detection found fewer
+    than `budget` (short or static videos): each pick is the sampled frame farthest
+    from every frame already chosen.
+    """
+    chosen = list(candidates)
+    fillers = list(fillers)
+    while len(chosen) < budget and fillers:
+        distances = [min((abs(idx - c[1]) for c in chosen), default=idx + 1) for idx, _ in fillers]
+        best = max(range(len(fillers)), key=distances.__getitem__)
+        if distances[best] == 0:
+            break
+        idx, frame = fillers.pop(best)
+        chosen.append((0.0, idx, frame))
+    return chosen
+
+
+def extract_scene_keyframes(video_path, max_frames=None):
+    """
+    Extract keyframes at the strongest scene changes in a single forward decode pass.
+
+    Frames between samples are skipped with `grab()` (no colour conversion), and each
+    sampled frame is scored against the previous one on a downscaled thumbnail. Only
+    the current top candidates, already downscaled to VISION_MAX_SIDE, are held in
+    memory, so no seeking is ever needed. Alongside them, at most 2 x budget evenly
+    spaced samples are kept; they fill the budget when there are fewer scene changes
+    than frames to extract. Near-black frames are skipped, unless the whole video is
+    that dark (e.g. night footage): then evenly spaced dark frames are used instead.
+
+    Args:
+        video_path (str): Path to the video file
+        max_frames (int): Frame budget; derived from the duration when omitted
+
+    Returns:
+        list: Keyframes with in-memory, downscaled JPEG images, in presentation order
+    """
+    try:
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
+            logger.warning(f"Could not open video for keyframes: {video_path}")
+            return []
+
+        fps = video.get(cv2.CAP_PROP_FPS) or 0
+        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = total_frames / fps if fps > 0 else 0
+        budget = max_frames or keyframe_budget(duration)
+        fps = fps if fps > 0 else 25.0
+        stride = max(1, round(fps / SCENE_SAMPLE_FPS))
+        min_gap = max(1, int(SCENE_MIN_GAP_SECONDS * fps))
+
+        candidates = []
+        # Every `filler_step`-th sample; halved whenever it outgrows 2 x budget, so the kept
+        # samples stay evenly spread without knowing the (often unreliable) frame count.
+        fillers = []
+        filler_step = 1
+        samples = 0
+        # Same spread of near-black samples, kept only until a brighter frame shows up.
+        dark_fillers = []
+        dark_step = 1
+        dark_samples = 0
+        previous = None
+        idx = -1
+        while video.grab():
+            idx += 1
+            if idx % stride:
+                continue
+            success, frame = video.retrieve()
+            if not success:
+                continue
+            signature = _frame_signature(frame)
+            if signature[0].mean() < BLACK_FRAME_LUMA:
+                if not fillers and dark_samples % dark_step == 0:
+                    dark_fillers.append((idx, downscale_frame(frame)))
+                    if len(dark_fillers) > 2 * budget:
+                        dark_fillers = dark_fillers[::2]
+                        dark_step *= 2
+                dark_samples += 1
+                continue
+            if previous is None:
+                # The opening shot always counts as a scene.
+                score = 1.0
+            else:
+                score = _scene_change_score(previous, signature)
+            small = None
+            if score >= SCENE_MIN_SCORE:
+                small = downscale_frame(frame)
+                _offer_candidate(candidates, budget, min_gap, score, idx, small)
+            if samples % filler_step == 0:
+                fillers.append((idx, small if small is not None else downscale_frame(frame)))
+                if len(fillers) > 2 * budget:
+                    fillers = fillers[::2]
+                    filler_step *= 2
+            samples += 1
+            previous = signature
+        video.release()
+
+        scene_count = len(candidates)
+        if not fillers and dark_fillers:
+            logger.info(f"🌑 No frame in {video_path} is above the black threshold; using dark frames")
+        candidates = _fill_uniform(candidates, fillers or dark_fillers, budget)
+        keyframes = [
+            Keyframe(idx, round(idx / fps, 2), encode_frame(frame))
+            for _, idx, frame in sorted(candidates, key=lambda c: c[1])
+        ]
+        logger.debug(
+            f"Scene keyframes for {video_path}: {len(keyframes)}/{budget} "
+            f"({scene_count} scene changes) from {idx + 1} frames"
+        )
+        return keyframes
+
+    except Exception as e:
+        logger.warning(f"Error extracting scene keyframes: {e}")
+        return []
+
+def dhash(image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image array: one bit per horizontally adjacent pixel pair
+    of a (hash_size + 1) x hash_size grayscale thumbnail.
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def group_near_duplicates(hashes: list, max_distance: int) -> list:
+    """
+    Greedily assign each hash to the first earlier representative within
+    `max_distance` Hamming bits. A `None` hash (an image that could not be hashed) is
+    never grouped with anything.
+
+    Returns:
+        list: For each input, the index of its representative (itself if unique)
+    """
+    representatives = []
+    rep_hashes = np.empty(0, dtype=np.uint64)
+    assignment = []
+    for i, h in enumerate(hashes):
+        if h is None:
+            assignment.append(i)
+            continue
+        if max_distance >= 0 and rep_hashes.size:
+            xor = np.bitwise_xor(rep_hashes, np.uint64(h))
+            distances = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= max_distance:
+                assignment.append(representatives[nearest])
+                continue
+        representatives.append(i)
+        rep_hashes = np.append(rep_hashes, np.uint64(h))
+        assignment.append(i)
+    return assignment
+
+
+def dedupe_keyframes(keyframes: list, max_distance: int) -> list:
+    """Perceptual-hash the keyframes and group near-duplicates (see `group_near_duplicates`)."""
+    hashes = []
+    for keyframe in keyframes:
+        buffer = np.frombuffer(keyframe.image, dtype=np.uint8)
+        image = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        # Undecodable frames stay unhashed rather than sharing a sentinel hash.
+        hashes.append(dhash(image) if image is not None else None)
+    return group_near_duplicates(hashes, max_distance)
+
 def extract_video_media_metadata(video_path):
     media_metadata = {
         "filename": os.path.basename(video_path),
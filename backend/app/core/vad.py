@@ -0,0 +1,124 @@
+# app/core/vad.py
+import numpy as np
+from app.core.config import (
+    AUDIO_SAMPLE_RATE,
+    VAD_ENERGY_MARGIN_DB,
+    VAD_MIN_SPEECH_MS,
+    VAD_MERGE_GAP_MS,
+    VAD_PAD_MS,
+)
+
+FRAME_MS = 30
+BLOCK_FRAMES = 4096  # Frames per vectorized block; bounds the FFT working set on long audio
+ABSOLUTE_FLOOR_DB = -45.0
+# A noise floor louder than this means the track never goes quiet (continuous speech, or
+# a constant music bed), so there is no floor to measure speech against.
+LOUD_FLOOR_DB = -30.0
+SPEECH_BAND_HZ = (300, 3400)
+SPEECH_BAND_MIN_RATIO = 0.45
+# Above this speech ratio trimming saves little, so the full track is transcribed instead.
+FULL_TRACK_SPEECH_RATIO = 0.9
+
+
+def _frame_features(samples: np.ndarray, sample_rate: int, frame_len: int):
+    """Per-frame energy (dBFS) and fraction of spectral energy inside the speech band."""
+    n_frames = len(samples) // frame_len
+    frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+    window = np.hanning(frame_len).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        rms = np.sqrt(np.mean(np.square(block), axis=1))
+        energy_db[start:start + len(block)] = 20 * np.log10(rms + 1e-10)
+        power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2
+        band_ratio[start:start + len(block)] = power[:, band].sum(axis=1) / (power.sum(axis=1) + 1e-12)
+    return energy_db, band_ratio
+
+
+def _runs(active: np.ndarray):
+    """Start (inclusive) and end (exclusive) indices of each run of True values."""
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE) -> dict:
+    """
+    Energy/spectral voice-activity detection over mono PCM.
+
+    A frame counts as speech when it is `VAD_ENERGY_MARGIN_DB` above the estimated
+    noise floor and most of its energy falls in the speech band. Runs separated by
+    short pauses are merged, blips are dropped and regions are padded.
+
+    Returns:
+        dict: regions [(start_s, end_s)], speech_seconds, audio_seconds, speech_ratio
+    """
+    frame_len = int(sample_rate * FRAME_MS / 1000)
+    audio_seconds = len(samples) / sample_rate
+    empty = {"regions": [], "speech_seconds": 0.0, "audio_seconds": round(audio_seconds, 2), "speech_ratio": 0.0}
+    if len(samples) < frame_len:
+        return empty
+
+    energy_db, band_ratio = _frame_features(samples, sample_rate, frame_len)
+    noise_floor = float(np.percentile(energy_db, 10))
+    threshold = max(noise_floor + VAD_ENERGY_MARGIN_DB, ABSOLUTE_FLOOR_DB)
+    if noise_floor > LOUD_FLOOR_DB:
+        # Rely on the speech-band test alone rather than mistake the whole track for silence.
+        threshold = ABSOLUTE_FLOOR_DB
+    active = (energy_db > threshold) & (band_ratio > SPEECH_BAND_MIN_RATIO)
+
+    starts, ends = _runs(active)
+    if starts.size == 0:
+        return empty
+
+    # Merge runs separated by short pauses, then drop blips.
+    merge_frames = VAD_MERGE_GAP_MS // FRAME_MS
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] >= merge_frames))
+    starts, ends = starts[keep], np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]))
+    long_enough = (ends - starts) >= VAD_MIN_SPEECH_MS // FRAME_MS
+    starts, ends = starts[long_enough], ends[long_enough]
+    if starts.size == 0:
+        return empty
+
+    frame_seconds = FRAME_MS / 1000
+    pad = VAD_PAD_MS / 1000
+    regions = []
+    for start, end in zip(starts * frame_seconds - pad, ends * frame_seconds + pad):
+        start, end = max(0.0, float(start)), min(audio_seconds, float(end))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    speech_seconds = sum(end - start for start, end in regions)
+    return {
+        "regions": [(round(s, 2), round(e, 2)) for s, e in regions],
+        "speech_seconds": round(speech_seconds, 2),
+        "audio_seconds": round(audio_seconds, 2),
+        "speech_ratio": round(speech_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+    }
+
+
+def speech_only_audio(samples: np.ndarray, regions: list, sample_rate: int = AUDIO_SAMPLE_RATE,
+                      gap_seconds: float = 0.3):
+    """
+    Concatenate the speech regions, separated by short silences.
+
+    Returns:
+        tuple: (samples, segment map of (offset_in_output_s, source_start_s, duration_s))
+            for mapping timestamps in the trimmed audio back to the source
+    """
+    gap = np.zeros(int(gap_seconds * sample_rate), dtype=samples.dtype)
+    pieces, segment_map = [], []
+    offset = 0.0
+    for start, end in regions:
+        piece = samples[int(start * sample_rate):int(end * sample_rate)]
+        pieces.extend((piece, gap))
+        segment_map.append((round(offset, 3), start, round(len(piece) / sample_rate, 3)))
+        offset += (len(piece) + len(gap)) / sample_rate
+    if not pieces:
+        return np.zeros(0, dtype=samples.dtype), []
+    return np.concatenate(pieces[:-1]), segment_map
@@ -0,0 +1,374 @@
+# app/core/vector_index.py
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.config import VECTOR_DIMS, VECTOR_INDEX_DIR, VECTOR_INDEX_DTYPE
+from app.core.logging.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so keep to one writer per directory
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Source fields kept next to each vector: what RAG needs to build its context without ES.
+KIND_FIELDS = {
+    "media": ("filename", "media_type", "relative_path", "summary"),
+    "passages": ("filename", "media_type", "chunk_index", "text", "start", "end"),
+}
+
+MIN_CAPACITY = 1024
+SCORE_BLOCK_ROWS = 8192  # int8 rows upcast per step; keeps the float32 temporary cache-sized
+
+
+class LocalVectorIndex:
+    """
+    In-process brute-force vector index: an L2-normalized float32 matrix, or int8 with a
+    per-row scale, memory-mapped from disk, plus a SQLite id table that maps each row to
+    its document id and the source fields RAG needs. Top-k is one matrix-vector product
+    and an `argpartition`.
+
+    Deleted rows are tombstoned and reused. Writers in several processes (the API and its
+    background sync, batch ingestion) may share a directory: each write holds an exclusive
+    file lock and first reloads the id table if another process changed it since, which a
+    `revision` counter in the meta table tells. Readers reload the same way before searching.
+    """
+
+    def __init__(self, path: str, dims: int = VECTOR_DIMS, dtype: str = VECTOR_INDEX_DTYPE):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector index dtype '{dtype}', expected float32 or int8")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dims = dims
+        self.dtype = np.dtype(dtype)
+        self.quantized = dtype == "int8"
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(os.path.join(path, "ids.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA busy_timeout = 30000")
+        with self._file_lock():
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS rows (
+                    row INTEGER PRIMARY KEY,
+                    doc_id TEXT UNIQUE NOT NULL,
+                    filename TEXT NOT NULL,
+                    source TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS rows_filename ON rows (filename);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+            layout = f"{dims}:{dtype}"
+            if self.get_meta("layout") not in (None, layout):
+                logger.warning(f"⚠️ Vector index {path} was built as {self.get_meta('layout')}; resetting for {layout}")
+                self._drop_files()
+                self._db.executescript("DELETE FROM rows; DELETE FROM meta;")
+                self._bump_revision()
+            self.set_meta("layout", layout)
+            self._load()
+
+    # ----------------------------------------
+    # Storage
+    # ----------------------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _drop_files(self):
+        for name in ("vectors.float32", "vectors.int8", "scales.float32"):
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+
+    def _map(self, name: str, dtype, shape: tuple) -> np.memmap:
+        path = self._file(name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open_maps(self, capacity: int):
+        self._capacity = capacity
+        self._vectors = self._map(f"vectors.{self.dtype.name}", self.dtype, (capacity, self.dims))
+        self._scales = self._map("scales.float32", np.float32, (capacity,)) if self.quantized else None
+        alive = np.zeros(capacity, dtype=bool)
+        if hasattr(self, "_alive"):
+            alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._file("write.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _writing(self):
+        """Hold the thread and file locks for one write, starting from the state on disk."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            try:
+                yield
+                self._bump_revision()
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                self._revision = None  # memory may be ahead of the rolled-back table
+                raise
+
+    def _bump_revision(self):
+        self._revision = str(int(self.get_meta("revision") or 0) + 1)
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('revision', ?)", (self._revision,))
+
+    def _refresh(self):
+        """Reload the id table if a write (here or in another process) changed it since."""
+        with self._lock:
+            if self.get_meta("revision") != self._revision:
+                self._load()
+
+    def _load(self):
+        self._revision = self.get_meta("revision")
+        rows = self._db.execute("SELECT row, doc_id, filename, source FROM rows").fetchall()
+        self._rows = max((row for row, *_ in rows), default=-1) + 1
+        self._ids: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = [None] * self._rows
+        self._sources: List[Optional[dict]] = [None] * self._rows
+        self._filename_rows: Dict[str, set] = {}
+        for row, doc_id, filename, source in rows:
+            self._ids[doc_id] = row
+            self._row_ids[row] = doc_id
+            self._sources[row] = json.loads(source)
+            self._filename_rows.setdefault(filename, set()).add(row)
+        self._free = [row for row, doc_id in enumerate(self._row_ids) if doc_id is None]
+
+        capacity = MIN_CAPACITY
+        while capacity < self._rows:
+            capacity *= 2
+        if hasattr(self, "_alive"):
+            del self._alive  # rebuilt from the table below, not carried over
+        self._open_maps(capacity)
+        for row in self._ids.values():
+            self._alive[row] = True
+
+    def _grow(self):
+        self._vectors.flush()
+        if self._scales is not None:
+            self._scales.flush()
+        self._open_maps(self._capacity * 2)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        found = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return found[0] if found else None
+
+    def set_meta(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self._db.commit()
+
+    # ----------------------------------------
+    # Writes
+    # ----------------------------------------
+    def _write_vector(self, row: int, vector) -> bool:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if vector.shape != (self.dims,) or norm == 0.0:
+            return False
+        vector = vector / norm
+        if self.quantized:
+            # Symmetric per-row quantization: row * scale recovers the unit vector.
+            scale = float(np.abs(vector).max()) / 127.0
+            self._vectors[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._vectors[row] = vector
+        return True
+
+    def _remove_rows(self, rows: Iterable[int]):
+        for row in list(rows):
+            doc_id = self._row_ids[row]
+            self._db.execute("DELETE FROM rows WHERE row = ?", (row,))
+            del self._ids[doc_id]
+            filename = self._sources[row]["filename"]
+            self._filename_rows[filename].discard(row)
+            if not self._filename_rows[filename]:
+                del self._filename_rows[filename]
+            self._row_ids[row] = None
+            self._sources[row] = None
+            self._alive[row] = False
+            self._free.append(row)
+
+    def upsert(self, docs: Iterable[Tuple[str, list, dict]]) -> int:
+        """
+        Insert or replace documents given as (doc_id, vector, source). Source must hold
+        `filename`. Documents with a missing or wrongly sized vector are dropped.
+
+        Returns:
+            int: number of documents stored
+        """
+        with self._writing():
+            return self._upsert(docs)
+
+    def _upsert(self, docs: Iterable[Tuple[str, list, dict]]) -> int:
+        stored = 0
+        for doc_id, vector, source in docs:
+            if doc_id in self._ids:
+                self._remove_rows([self._ids[doc_id]])
+            if vector is None:
+                continue
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = self._rows
+                self._rows += 1
+                self._row_ids.append(None)
+                self._sources.append(None)
+                if row >= self._capacity:
+                    self._grow()
+            if not self._write_vector(row, vector):
+                self._free.append(row)
+                continue
+            self._db.execute(
+                "INSERT INTO rows (row, doc_id, filename, source) VALUES (?, ?, ?, ?)",
+                (row, doc_id, source["filename"], json.dumps(source)),
+            )
+            self._ids[doc_id] = row
+            self._row_ids[row] = doc_id
+            self._sources[row] = source
+            self._filename_rows.setdefault(source["filename"], set()).add(row)
+            self._alive[row] = True
+            stored += 1
+        return stored
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        """Remove documents by id; unknown ids are ignored. Returns the number removed."""
+        with self._writing():
+            rows = [self._ids[doc_id] for doc_id in set(doc_ids) if doc_id in self._ids]
+            self._remove_rows(rows)
+            return len(rows)
+
+    def delete_filename(self, filename: str):
+        with self._writing():
+            self._remove_rows(self._filename_rows.get(filename, ()))
+
+    def replace_filename(self, filename: str, docs: Iterable[Tuple[str, list, dict]]) -> int:
+        """Swap all of a file's documents for `docs`, e.g. a re-analyzed video's passages."""
+        with self._writing():
+            self._remove_rows(self._filename_rows.get(filename, ()))
+            return self._upsert(docs)
+
+    def reset(self):
+        with self._writing():
+            self._db.execute("DELETE FROM rows")
+            self._db.execute("DELETE FROM meta WHERE key NOT IN ('layout', 'revision')")
+            self._drop_files()
+            self._load()
+
+    def flush(self):
+        with self._lock:
+            self._vectors.flush()
+            if self._scales is not None:
+                self._scales.flush()
+
+    # ----------------------------------------
+    # Search
+    # ----------------------------------------
+    def search(self, query_vector: list, k: int) -> List[dict]:
+        """
+        Exact top-k by cosine similarity.
+
+        Returns:
+            list: ES-style hits {"_id", "_score", "_source"}, with `_score` = cosine + 1
+            like the brute-force script_score query
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            self._refresh()
+            n = self._rows
+            vectors, scales = self._vectors, self._scales
+            alive = self._alive[:n].copy()
+        if n == 0 or k <= 0 or not alive.any():
+            return []
+
+        if self.quantized:
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, SCORE_BLOCK_ROWS):
+                end = min(start + SCORE_BLOCK_ROWS, n)
+                scores[start:end] = (vectors[start:end].astype(np.float32) @ query) * scales[start:end]
+        else:
+            scores = np.asarray(vectors[:n] @ query, dtype=np.float32)
+        scores[~alive] = -np.inf
+
+        k = min(k, int(alive.sum()))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        with self._lock:
+            return [
+                {"_id": self._row_ids[row], "_score": float(scores[row]) + 1.0, "_source": dict(self._sources[row])}
+                for row in top
+                if self._row_ids[row] is not None
+            ]
+
+    def get_source(self, doc_id: str) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            row = self._ids.get(doc_id)
+            return dict(self._sources[row]) if row is not None else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def doc_ids(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._ids)
+
+    def filenames(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._filename_rows)
+
+    def snapshot(self) -> dict:
+        return {
+            "documents": len(self._ids),
+            "capacity": self._capacity,
+            "dtype": self.dtype.name,
+            "matrix_mb": round(self._capacity * self.dims * self.dtype.itemsize / 1024 ** 2, 1),
+        }
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+
+_vector_indices: Dict[str, LocalVectorIndex] = {}
+_vector_indices_lock = threading.Lock()
+
+def get_vector_index(kind: str) -> LocalVectorIndex:
+    """Process-wide local index for "media" or "passages" under VECTOR_INDEX_DIR."""
+    if kind not in KIND_FIELDS:
+        raise ValueError(f"Unknown vector index kind '{kind}'")
+    with _vector_indices_lock:
+        if kind not in _vector_indices:
+            _vector_indices[kind] = LocalVectorIndex(os.path.join(VECTOR_INDEX_DIR, kind))
+        return _vector_indices[kind]
+
+def close_vector_indices():
+    with _vector_indices_lock:
+        for index in _vector_indices.values():
+            index.close()
+        _vector_indices.clear()
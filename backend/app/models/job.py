@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Float, Boolean, BigInteger
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(32), primary_key=True)
+    filename = Column(String, index=True)
+    media_type = Column(String)  # 'image' or 'video'
+    content_type = Column(String)
+    content_hash = Column(String(64), index=True)
+    file_path = Column(Text)  # Spooled upload, kept until the job reaches a final state
+    file_size = Column(BigInteger)
+    overwrite = Column(Boolean, default=True)
+    status = Column(String, index=True, default=JOB_QUEUED)
+    stage = Column(String, nullable=True)
+    progress = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    available_at = Column(DateTime(timezone=True), nullable=True)  # Failed jobs are not retried before this
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
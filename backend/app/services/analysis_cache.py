@@ -0,0 +1,148 @@
+# app/services/analysis_cache.py
+import os
+import re
+import copy
+import json
+import asyncio
+import tempfile
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import (
+    ANALYSIS_CACHE_DIR,
+    ANALYSIS_CACHE_ENABLED,
+    ANALYSIS_CACHE_VERSION,
+    EMBEDDING_MODEL,
+    EMBEDDING_VERSION,
+)
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _consume_exception(future: asyncio.Future):
+    # Avoid "exception was never retrieved" warnings when no follower was waiting.
+    if not future.cancelled():
+        future.exception()
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of full analysis results, keyed by media type and SHA-256.
+    Results hold embedding vectors, so the key also names the embedding model and version:
+    switching EMBEDDING_MODEL / EMBEDDING_VERSION never serves old-model vectors.
+
+    Results persist as JSON files under `cache_dir`; concurrent requests for the
+    same key share a single in-flight computation (single-flight).
+    """
+
+    def __init__(self, cache_dir: str = ANALYSIS_CACHE_DIR, version: str = ANALYSIS_CACHE_VERSION,
+                 enabled: bool = ANALYSIS_CACHE_ENABLED,
+                 embedding: str = f"{EMBEDDING_MODEL}-e{EMBEDDING_VERSION}"):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.enabled = enabled
+        # Model names may contain "/" (e.g. "sentence-transformers/..."); keys are file names.
+        self.embedding = re.sub(r"[^A-Za-z0-9._-]+", "-", embedding)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, media_type: str, content_hash: str) -> str:
+        # Hash last: `_path` shards entries by the key's final two characters.
+        return f"{media_type}-v{self.version}-{self.embedding}-{content_hash}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[-2:], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never observe a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[dict]],
+    ) -> Tuple[dict, bool]:
+        """
+        Return the cached result for `key`, joining or starting its computation.
+
+        Results with a truthy "degraded" flag (a model call failed and was papered over) are
+        returned but not stored, so a transient failure doesn't stick to the content hash.
+
+        If the caller running the computation is cancelled (e.g. its client disconnected),
+        the callers waiting on it are not: the first of them to resume starts it again with
+        its own `compute`, and the rest join that run.
+
+        Returns:
+            tuple: (result copy, True if served from cache or a shared in-flight run)
+        """
+        if not self.enabled:
+            return await compute(), False
+
+        while (inflight := self._inflight.get(key)) is not None:
+            logger.info(f"🔗 Joining in-flight analysis for {key}")
+            try:
+                return copy.deepcopy(await asyncio.shield(inflight)), True
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise  # this caller was cancelled, not (only) the shared run
+                logger.info(f"🔁 In-flight analysis for {key} was cancelled; retrying")
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._inflight[key] = future
+        try:
+            cached = await asyncio.to_thread(self.get, key)
+            if cached is not None:
+                logger.info(f"♻️ Analysis cache hit for {key}")
+                future.set_result(cached)
+                return copy.deepcopy(cached), True
+
+            result = await compute()
+            if result.get("degraded"):
+                logger.warning(f"⚠️ Not caching degraded analysis for {key}")
+            else:
+                try:
+                    await asyncio.to_thread(self.put, key, result)
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to persist analysis cache entry {key}: {e}")
+            future.set_result(result)
+            return copy.deepcopy(result), False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+_analysis_cache_instance = None
+
+def get_analysis_cache():
+    global _analysis_cache_instance
+    if _analysis_cache_instance is None:
+        _analysis_cache_instance = AnalysisCache()
+    return _analysis_cache_instance
@@ -1,149 +1,368 @@
 # app/services/analysis_service.py
 import os
+import asyncio
 import shutil
-from typing import Optional
-from fastapi import UploadFile
+import tempfile
+import numpy as np
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Optional
 from app.core.utils import (
     extract_image_media_metadata,
     extract_video_media_metadata,
     extract_audio,
+    load_audio_pcm,
     extract_keyframes,
+    extract_scene_keyframes,
+    dedupe_keyframes,
+    load_image_for_vision,
 )
-from app.core.config import TEMP_DIR, CLEANUP_TEMP_FILES, MAX_FRAME_COUNT
+from app.core.config import (
+    TEMP_DIR,
+    CLEANUP_TEMP_FILES,
+    MAX_FRAME_COUNT,
+    VISION_CONCURRENCY,
+    KEYFRAME_MODE,
+    FRAME_DEDUP_MAX_DISTANCE,
+    AUDIO_EXTRACT_MODE,
+    AUDIO_SAMPLE_RATE,
+    VAD_ENABLED,
+)
+from app.core.vad import FULL_TRACK_SPEECH_RATIO, detect_speech
+from app.core.spool import SpooledMedia
 from app.core.logging.logger import get_logger
 from app.core.ai_models import get_model_loader
 from app.core.prompt_templates import image_prompt, video_prompt
-import time
+from app.services.analysis_cache import get_analysis_cache
+from app.services.passage_service import build_passages, embed_passages
+from app.services.pipeline import Stage, run_pipeline
 
 logger = get_logger(__name__)
-model_loader = get_model_loader()
 
-async def analyze_image(file: UploadFile, include_debug: bool = False):
-    logger.info(f"🖼️ Starting image analysis for: {file.filename}")
-    image_path = os.path.join(TEMP_DIR, file.filename)
+ProgressCallback = Callable[[str, float], Awaitable[None]]
+
+# Stand-in caption for a frame the vision model failed on; a result holding one is degraded.
+FAILED_CAPTION = "[Failed to analyze frame]"
+
+IMAGE_DEBUG_FIELDS = ("ollama_raw",)
+VIDEO_DEBUG_FIELDS = ("combined_visual", "ollama_video_prompt", "stage_timeline")
+
+
+async def _run_cpu(executor: Optional[Executor], func, *args):
+    # CPU-bound decode/metadata work; runs in `executor` (e.g. a process pool) when given.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+def _remove_work_dir(work_dir: str):
+    if CLEANUP_TEMP_FILES and os.path.isdir(work_dir):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.debug(f"🧹 Deleted temp work dir: {work_dir}")
+
+
+def _finalize(result: dict, filename: str, content_hash: str, cache_hit: bool,
+              include_debug: bool, debug_fields: tuple) -> dict:
+    # Cached payloads may come from a different upload name; rebind per request.
+    result["filename"] = filename
+    result["media_metadata"]["filename"] = filename
+    result["content_hash"] = content_hash
+    result["cache_hit"] = cache_hit
+    if not include_debug:
+        for key in debug_fields:
+            result.pop(key, None)
+    return result
+
+
+async def _report(on_progress: Optional[ProgressCallback], stage: str, progress: float):
+    if on_progress is not None:
+        try:
+            await on_progress(stage, progress)
+        except Exception as e:
+            logger.warning(f"⚠️ Progress callback failed at stage '{stage}': {e}")
 
-    
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
+async def _analyze_image_path(image_path: str, filename: str, on_progress: Optional[ProgressCallback] = None) -> dict:
     media_metadata = extract_image_media_metadata(image_path)
+    media_metadata["filename"] = filename
+    await _report(on_progress, "vision", 0.1)
 
-    # Ollama Vision Model inference
-    vision_description = model_loader.vision_infer(
-        image_path=image_path,
+    # Ollama Vision Model inference on a copy downscaled to the model's input resolution
+    image_bytes = await asyncio.to_thread(load_image_for_vision, image_path)
+    vision_description = await get_model_loader().vision_infer_async(
+        image=image_bytes,
         prompt=image_prompt("Describe this image and extract key details.")
     )
 
-    summary = model_loader.summarize_text(
+    summary = await get_model_loader().summarize_text_async(
         text=vision_description,
         prompt="Summarize the content of this image in a clear and concise paragraph."
     )
+    await _report(on_progress, "embedding", 0.9)
 
-    vector = model_loader.embed_query(summary)
-
-    if CLEANUP_TEMP_FILES and os.path.exists(image_path):
-        os.remove(image_path)
-        logger.debug(f"🧹 Deleted temp image file: {image_path}")
+    vector = await get_model_loader().embed_query_async(summary)
 
-    result = {
-        "filename": file.filename,
+    return {
+        "filename": filename,
         "media_type": "image",
         "summary": summary,
         "transcript": "",
         "media_metadata": media_metadata,
         "vector": vector,
+        "ollama_raw": vision_description,
     }
 
-    if include_debug:
-        result.update({
-            "ollama_raw": vision_description
-        })
 
-    return result
+async def analyze_image(
+    media: SpooledMedia,
+    include_debug: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+):
+    logger.info(f"🖼️ Starting image analysis for: {media.filename}")
+    cache = get_analysis_cache()
+    result, cache_hit = await cache.get_or_compute(
+        cache.key("image", media.content_hash),
+        lambda: _analyze_image_path(media.path, media.filename, on_progress),
+    )
+    return _finalize(result, media.filename, media.content_hash, cache_hit, include_debug, IMAGE_DEBUG_FIELDS)
 
-async def analyze_video(file: UploadFile, include_debug: bool = True):
-    logger.info(f"🎥 Starting video analysis for: {file.filename}")
-    video_path = os.path.join(TEMP_DIR, file.filename)
 
-    with open(video_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+async def _caption_frames(keyframes: list, representatives: list) -> list:
+    """
+    Caption each distinct frame once; near-duplicates reuse their representative's caption.
+    A frame the vision model fails on gets FAILED_CAPTION, which marks the result degraded.
+    """
+    unique = sorted(set(representatives))
+    if len(unique) < len(keyframes):
+        logger.info(f"♻️ Skipping {len(keyframes) - len(unique)} near-duplicate frame(s)")
 
-    media_metadata = extract_video_media_metadata(video_path)
+    # Bounded fan-out: Ollama serializes heavily, so only a few frames are in flight at once.
+    semaphore = asyncio.Semaphore(max(1, VISION_CONCURRENCY))
 
-    # Step 1: Extract keyframes
-    logger.info("🎞️ Extracting keyframes...")
-    frame_paths = extract_keyframes(video_path, max_frames=MAX_FRAME_COUNT)
-    logger.info(f"🖼️ {len(frame_paths)} frame(s) extracted.")
+    async def _caption(i: int, keyframe) -> str:
+        async with semaphore:
+            logger.info(f"🔍 Analyzing frame {i + 1}/{len(keyframes)} (t={keyframe.timestamp}s)")
+            try:
+                return await get_model_loader().vision_infer_async(
+                    image=keyframe.image,
+                    prompt=image_prompt("Describe this video frame.")
+                )
+            except Exception as e:
+                logger.error(f"❌ Ollama vision failed on frame {keyframe.index}: {e}")
+                return FAILED_CAPTION
+
+    captions = await asyncio.gather(*(_caption(i, keyframes[i]) for i in unique))
+    by_frame = dict(zip(unique, captions))
+    return [by_frame[rep] for rep in representatives]
 
-    # Step 2: Run Ollama Vision on frames
-    captions = []
-    for i, frame_path in enumerate(frame_paths):
-        logger.info(f"🔍 Analyzing frame {i + 1}/{len(frame_paths)}: {os.path.basename(frame_path)}")
-        try:
-            vision_description = model_loader.vision_infer(
-                image_path=frame_path,
-                prompt=image_prompt("Describe this video frame.")
-            )
-            captions.append(vision_description)
-        except Exception as e:
-            logger.error(f"❌ Ollama vision failed on frame {frame_path}: {e}")
-            captions.append("[Failed to analyze frame]")
 
-    combined_visual = " ".join(captions)
-    frame_info = [{"frame_number": i+1, "caption": cap} for i, cap in enumerate(captions)]
+def _no_transcript(degraded: bool = False) -> dict:
+    # `degraded`: Whisper failed, so the empty transcript says nothing about the audio.
+    return {"text": "", "segments": [], "degraded": degraded}
 
-    # Start timer for video analysis
-    start = time.perf_counter()
-    logger.debug(f"⏱️ Total video analysis time: {time.perf_counter() - start:.2f} seconds")
-    
-    # Step 3: Extract and transcribe audio
+
+def _distinct_captions(captions: list, representatives: list) -> str:
+    return " ".join(captions[i] for i in sorted(set(representatives)))
+
+
+async def _load_audio(video_path: str, work_dir: Optional[str], executor: Optional[Executor]):
+    """
+    Returns:
+        PCM samples (pcm mode) or a WAV path (moviepy mode); None when the video has no audio.
+    """
     logger.info("🔊 Extracting audio...")
-    audio_path = video_path.rsplit(".", 1)[0] + ".wav"
-    extract_audio(video_path, audio_path)
+    if work_dir is None:
+        # ffmpeg pipes PCM straight into memory; it waits on a subprocess, so a thread suffices.
+        return await asyncio.to_thread(load_audio_pcm, video_path)
+    audio_path = await _run_cpu(executor, extract_audio, video_path, os.path.join(work_dir, "audio.wav"))
+    return audio_path or None
 
-    transcript = ""
+
+async def _transcribe(audio, regions: Optional[list], filename: str) -> dict:
     try:
         logger.info("🗣️ Transcribing audio with Whisper...")
-        result = model_loader.transcribe_audio(audio_path)
-        transcript = result.strip()
-        logger.info("📝 Transcription complete.")
+        result = await get_model_loader().transcribe_segments_async(audio, regions)
+        logger.info(f"📝 Transcription complete ({len(result['segments'])} segment(s)).")
+        return result
     except Exception as e:
-        logger.warning(f"🔇 Whisper transcription failed for {file.filename}: {e}")
+        logger.warning(f"🔇 Whisper transcription failed for {filename}: {e}")
+        return _no_transcript(degraded=True)
+
+
+async def _analyze_video_path(
+    video_path: str,
+    filename: str,
+    executor: Optional[Executor],
+    timeline: dict,
+    on_progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """
+    Run video analysis as a DAG of stages so independent branches overlap:
 
-    # Step 4: Summarization and embedding
-    logger.info("🧠 Running final summarization...")
-    prompt = video_prompt(combined_visual, transcript)
-    summary = model_loader.summarize_text(text=prompt, prompt="Summarize the video content clearly.")
-    logger.info("📄 Summary generated.")
+        keyframes -> dedupe -> vision --+
+                                        +-> summary -> embedding
+        audio -> vad -> transcription --+
+                 vad -> metadata (has_audio, speech stats)
+    """
+    # Frames and PCM audio stay in memory; only the legacy moviepy mode needs a WAV work dir.
+    work_dir = tempfile.mkdtemp(dir=TEMP_DIR) if AUDIO_EXTRACT_MODE == "moviepy" else None
 
-    logger.info("📌 Creating vector embedding...")
-    vector = model_loader.embed_query(summary)
+    async def metadata(audio, vad):
+        media_metadata = await _run_cpu(executor, extract_video_media_metadata, video_path)
+        media_metadata["filename"] = filename
+        media_metadata["has_audio"] = audio is not None
+        if vad is not None:
+            media_metadata["speech_ratio"] = vad["speech_ratio"]
+            media_metadata["speech_seconds"] = vad["speech_seconds"]
+            media_metadata["speech_regions"] = len(vad["regions"])
+        return media_metadata
 
-    # Step 5: Build payload
-    result_payload = {
-        "filename": file.filename,
+    async def keyframes():
+        logger.info("🎞️ Extracting keyframes...")
+        if KEYFRAME_MODE == "uniform":
+            frames = await _run_cpu(executor, extract_keyframes, video_path, MAX_FRAME_COUNT)
+        else:
+            frames = await _run_cpu(executor, extract_scene_keyframes, video_path)
+        logger.info(f"🖼️ {len(frames)} frame(s) extracted.")
+        return frames
+
+    async def dedupe(keyframes):
+        return await _run_cpu(executor, dedupe_keyframes, keyframes, FRAME_DEDUP_MAX_DISTANCE)
+
+    async def vision(keyframes, dedupe):
+        return await _caption_frames(keyframes, dedupe)
+
+    async def audio():
+        try:
+            return await _load_audio(video_path, work_dir, executor)
+        except Exception as e:
+            logger.warning(f"🔇 Audio extraction failed for {filename}: {e}")
+            return None
+
+    async def vad(audio):
+        # Only in-memory PCM can be screened; the moviepy path transcribes the whole WAV.
+        if not VAD_ENABLED or not isinstance(audio, np.ndarray):
+            return None
+        return await asyncio.to_thread(detect_speech, audio, AUDIO_SAMPLE_RATE)
+
+    async def transcription(audio, vad):
+        if audio is None:
+            logger.info(f"🔇 No audio track in {filename}; skipping transcription.")
+            return _no_transcript()
+        regions = None
+        if vad is not None:
+            if not vad["regions"]:
+                logger.info(f"🔇 No speech detected in {filename}; skipping transcription.")
+                return _no_transcript()
+            if vad["speech_ratio"] < FULL_TRACK_SPEECH_RATIO:
+                logger.info(
+                    f"✂️ Transcribing {vad['speech_seconds']}s of speech "
+                    f"out of {vad['audio_seconds']}s of audio"
+                )
+                regions = vad["regions"]
+        return await _transcribe(audio, regions, filename)
+
+    async def summary(vision, dedupe, transcription):
+        logger.info("🧠 Running final summarization...")
+        # Duplicates share a caption; only distinct scenes feed the summary prompt.
+        prompt = video_prompt(_distinct_captions(vision, dedupe), transcription["text"])
+        text = await get_model_loader().summarize_text_async(
+            text=prompt, prompt="Summarize the video content clearly."
+        )
+        logger.info("📄 Summary generated.")
+        return {"prompt": prompt, "text": text}
+
+    async def embedding(summary):
+        logger.info("📌 Creating vector embedding...")
+        return await get_model_loader().embed_query_async(summary["text"])
+
+    async def passages(transcription):
+        return await embed_passages(build_passages(transcription["text"], transcription["segments"]))
+
+    try:
+        results, stage_timeline = await run_pipeline([
+            Stage("metadata", metadata, ["audio", "vad"]),
+            Stage("keyframes", keyframes),
+            Stage("dedupe", dedupe, ["keyframes"]),
+            Stage("vision", vision, ["keyframes", "dedupe"]),
+            Stage("audio", audio),
+            Stage("vad", vad, ["audio"]),
+            Stage("transcription", transcription, ["audio", "vad"]),
+            Stage("summary", summary, ["vision", "dedupe", "transcription"]),
+            Stage("embedding", embedding, ["summary"]),
+            Stage("passages", passages, ["transcription"]),
+        ], on_progress=on_progress)
+    finally:
+        if work_dir is not None:
+            _remove_work_dir(work_dir)
+
+    timeline.update(stage_timeline)
+    captions = results["vision"]
+    representatives = results["dedupe"]
+    combined_visual = _distinct_captions(captions, representatives)
+    logger.debug(f"Combined Visual Captions: {combined_visual}")
+    degraded = FAILED_CAPTION in captions or results["transcription"].get("degraded", False)
+
+    return {
+        "filename": filename,
         "media_type": "video",
-        "summary": summary,
-        "transcript": transcript,
-        "media_metadata": media_metadata,
-        "vector": vector,
-        "frames": frame_info,
-        "frame_count": len(frame_paths)
+        "summary": results["summary"]["text"],
+        "transcript": results["transcription"]["text"],
+        "transcript_segments": results["transcription"]["segments"],
+        "media_metadata": results["metadata"],
+        "vector": results["embedding"],
+        "passages": results["passages"],
+        "frames": [
+            {
+                "frame_number": i+1,
+                "timestamp": keyframe.timestamp,
+                "caption": cap,
+                "duplicate_of": rep+1 if rep != i else None,
+            }
+            for i, (keyframe, cap, rep) in enumerate(zip(results["keyframes"], captions, representatives))
+        ],
+        "frame_count": len(results["keyframes"]),
+        "vision_calls_skipped": len(representatives) - len(set(representatives)),
+        "combined_visual": combined_visual,
+        "ollama_video_prompt": results["summary"]["prompt"],
+        # A transient model failure shaped this result; the analysis cache won't keep it.
+        "degraded": degraded,
     }
 
-    if include_debug:
-        logger.debug(f"Combined Visual Captions: {combined_visual}")
-        result_payload.update({
-            "combined_visual": combined_visual,
-            "ollama_video_prompt": prompt
-        })
-
-    # Step 6: Cleanup temporary files
-    if CLEANUP_TEMP_FILES:
-        logger.info("🧹 Cleaning up temp files...")
-        for path in [video_path, audio_path, *frame_paths]:
-            if os.path.exists(path):
-                os.remove(path)
-
-    logger.info("✅ Video analysis complete.")
+
+async def analyze_video(
+    media: SpooledMedia,
+    include_debug: bool = True,
+    executor: Optional[Executor] = None,
+    on_progress: Optional[ProgressCallback] = None,
+):
+    """
+    Analyze a video: keyframe captions, audio transcript, summary and embedding.
+
+    Results are cached by content hash; byte-identical uploads reuse the stored
+    analysis and concurrent ones share a single in-flight run.
+
+    Args:
+        media (SpooledMedia): Video already on local disk, hashed while spooled
+        include_debug (bool): Attach intermediate prompts/captions to the payload
+        executor (Executor): Optional pool for CPU-bound decode and metadata work
+        on_progress (callable): Optional `async (stage, fraction)` hook called as stages finish
+
+    Returns:
+        dict: Analysis payload, including per-stage wall times under "timings"
+            (and start/end offsets under "stage_timeline" when debugging)
+    """
+    logger.info(f"🎥 Starting video analysis for: {media.filename}")
+    timeline = {}
+
+    cache = get_analysis_cache()
+    result_payload, cache_hit = await cache.get_or_compute(
+        cache.key("video", media.content_hash),
+        lambda: _analyze_video_path(media.path, media.filename, executor, timeline, on_progress),
+    )
+
+    # Timings describe this request only; a cache hit or joined run reports none.
+    result_payload["timings"] = {stage: entry["duration"] for stage, entry in timeline.items()}
+    result_payload["stage_timeline"] = timeline
+    _finalize(result_payload, media.filename, media.content_hash, cache_hit, include_debug, VIDEO_DEBUG_FIELDS)
+
+    logger.info(f"✅ Video analysis complete (cache hit: {cache_hit}).")
     return result_payload
@@ -0,0 +1,173 @@
+# app/services/ingest_manifest.py
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from app.core.config import INGEST_MANIFEST_PATH
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_DONE = "done"
+MANIFEST_FAILED = "failed"
+
+
+class FileStat(NamedTuple):
+    size: int
+    mtime_ns: int
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    content_hash: Optional[str]
+    status: str
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+def scan_dir(directory: str) -> Tuple[Dict[str, FileStat], Dict[str, int]]:
+    """
+    List one directory with `os.scandir`, without recursing.
+
+    Returns:
+        tuple: ({file_path: FileStat}, {subdir_path: mtime_ns})
+    """
+    files, subdirs = {}, {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if _is_hidden(entry.name):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs[entry.path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files[entry.path] = FileStat(st.st_size, st.st_mtime_ns)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not stat {entry.path}: {e}")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not list {directory}: {e}")
+    return files, subdirs
+
+
+def scan_tree(root_dir: str) -> Tuple[Dict[str, FileStat], Dict[str, int]]:
+    """
+    Recursively scan `root_dir`, collecting file stats and directory mtimes.
+
+    Directory mtimes let watch mode re-list only the directories that gained or lost entries.
+    """
+    files: Dict[str, FileStat] = {}
+    dirs: Dict[str, int] = {}
+    try:
+        dirs[root_dir] = os.stat(root_dir).st_mtime_ns
+    except OSError as e:
+        logger.error(f"❌ Cannot scan {root_dir}: {e}")
+        return files, dirs
+
+    stack = [root_dir]
+    while stack:
+        dir_files, subdirs = scan_dir(stack.pop())
+        files.update(dir_files)
+        dirs.update(subdirs)
+        stack.extend(subdirs)
+    return files, dirs
+
+
+class IngestManifest:
+    """
+    SQLite record of every file batch ingestion has seen: path, size, mtime, content hash and status.
+
+    A file whose size and mtime match a `done` entry is unchanged and skipped without
+    being opened; only new or changed files are hashed and analyzed.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_filename ON files (filename);
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def load(self) -> Dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns, content_hash, status FROM files").fetchall()
+        return {path: ManifestEntry(size, mtime_ns, content_hash, status) for path, size, mtime_ns, content_hash, status in rows}
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash, status FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def is_ingested(self, filename: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM files WHERE filename = ? AND status = ? LIMIT 1", (filename, MANIFEST_DONE)
+            ).fetchone()
+        return row is not None
+
+    def record(self, path: str, stat: FileStat, content_hash: Optional[str], status: str,
+               error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, filename, size, mtime_ns, content_hash, status, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, os.path.basename(path), stat.size, stat.mtime_ns, content_hash, status, error, time.time()),
+            )
+            self._conn.commit()
+
+    def dir_mtimes(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, mtime_ns FROM dirs").fetchall())
+
+    def save_dirs(self, dirs: Dict[str, int], removed: Iterable[str] = ()):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", dirs.items())
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", ((d,) for d in removed))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def needs_ingest(stat: FileStat, entry: Optional[ManifestEntry], retry_failed: bool = False) -> bool:
+    """New files, files whose size or mtime changed, and (optionally) earlier failures need work."""
+    if entry is None or (entry.size, entry.mtime_ns) != (stat.size, stat.mtime_ns):
+        return True
+    return entry.status == MANIFEST_FAILED and retry_failed
+
+
+_manifest: Optional[IngestManifest] = None
+
+
+def get_ingest_manifest() -> IngestManifest:
+    global _manifest
+    if _manifest is None:
+        _manifest = IngestManifest()
+    return _manifest
@@ -1,5 +1,6 @@
 import os
 import traceback
+from io import BytesIO
 from pathlib import Path
 from datetime import datetime
 from app.core.logging.logger import get_logger
@@ -9,6 +10,7 @@ from app.services.analysis_service import extract_image_media_metadata, extract_
 from app.models.media import MediaAnalysis
 from app.core.rag_utils import clean_transcript
 from app.core.database import es, ELASTIC_INDEX
+from app.services.ingest_manifest import get_ingest_manifest
 
 logger = get_logger(__name__)
 
@@ -16,9 +18,11 @@ IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
 VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv"}
 
 def is_duplicate(filename, db):
-    in_pg = db.query(MediaAnalysis).filter_by(filename=filename).first()
-    in_es = es.exists(index=ELASTIC_INDEX, id=filename)
-    return in_pg or in_es
+    # The local manifest answers for anything batch ingestion has already stored.
+    if get_ingest_manifest().is_ingested(filename):
+        return True
+    # Every ingest writes ES (PG only when WRITE_TO_PG), so one lookup is enough.
+    return es.exists(index=ELASTIC_INDEX, id=filename)
 
 def process_image(path, db, processor, blip_model, summarizer, embed_text):
     try:
@@ -93,10 +97,10 @@ def process_video(path, db, processor, blip_model, whisper_model, summarizer, em
         video_path = str(path)
         metadata = extract_video_media_metadata(video_path)
 
-        frame_paths = extract_keyframes(video_path, max_frames=15)
+        keyframes = extract_keyframes(video_path, max_frames=15)
         captions = []
-        for frame_path in frame_paths:
-            image = prepare_image(frame_path)
+        for keyframe in keyframes:
+            image = prepare_image(BytesIO(keyframe.image))
             inputs = processor(image, return_tensors="pt").to(blip_model.device)
             outputs = blip_model.generate(**inputs, max_new_tokens=30)
             captions.append(processor.decode(outputs[0], skip_special_tokens=True))
@@ -155,8 +159,6 @@ def process_video(path, db, processor, blip_model, whisper_model, summarizer, em
 
         logger.info(f"✅ Ingested video: {filename}")
 
-        for frame_path in frame_paths:
-            os.remove(frame_path)
         if os.path.exists(audio_path):
             os.remove(audio_path)
 
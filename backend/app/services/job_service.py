@@ -0,0 +1,293 @@
+# app/services/job_service.py
+import os
+import socket
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import or_, select, update
+from app.core.config import (
+    JOB_POLL_SECONDS,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_RETRY_BACKOFF_MAX_SECONDS,
+)
+from app.core.database import AsyncSessionLocal
+from app.core.spool import SpooledMedia
+from app.core.logging.logger import get_logger
+from app.models.job import AnalysisJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+from app.services.analysis_service import analyze_image, analyze_video
+from app.services.storage_service import store_analysis_result
+
+logger = get_logger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that failed on attempt number `attempts`."""
+    return min(JOB_RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), JOB_RETRY_BACKOFF_MAX_SECONDS)
+
+
+def job_status(job: AnalysisJob) -> dict:
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "media_type": job.media_type,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": round(job.progress or 0.0, 3),
+        "attempts": job.attempts or 0,
+        "error": job.error,
+        "retry_at": job.available_at if job.status == JOB_QUEUED else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+    }
+
+
+async def _update_job(job_id: str, **fields):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(AnalysisJob).where(AnalysisJob.id == job_id).values(**fields))
+        await db.commit()
+
+
+async def submit_job(media: SpooledMedia, media_type: str, overwrite: bool = True) -> AnalysisJob:
+    """
+    Enqueue an upload already spooled to JOB_SPOOL_DIR.
+
+    A retried submission of the same content and filename returns the job that is
+    already queued or running instead of starting duplicate work.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(AnalysisJob).where(
+                AnalysisJob.content_hash == media.content_hash,
+                AnalysisJob.filename == media.filename,
+                AnalysisJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+            ).limit(1)
+        )
+        existing = result.scalar_one_or_none()
+        if existing:
+            logger.info(f"🔁 Reusing in-progress job {existing.id} for {media.filename}")
+            media.cleanup()
+            return existing
+
+        job = AnalysisJob(
+            id=uuid.uuid4().hex,
+            filename=media.filename,
+            media_type=media_type,
+            content_type=media.content_type,
+            content_hash=media.content_hash,
+            file_path=media.path,
+            file_size=media.size,
+            overwrite=overwrite,
+            status=JOB_QUEUED,
+            progress=0.0,
+            attempts=0,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+    logger.info(f"📨 Queued {media_type} job {job.id} for {media.filename}")
+    return job
+
+
+async def get_job(job_id: str) -> Optional[AnalysisJob]:
+    async with AsyncSessionLocal() as db:
+        return await db.get(AnalysisJob, job_id)
+
+
+async def claim_next_job() -> Optional[AnalysisJob]:
+    # SKIP LOCKED lets any number of workers/replicas poll the same table safely.
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(AnalysisJob)
+            .where(
+                AnalysisJob.status == JOB_QUEUED,
+                or_(AnalysisJob.available_at.is_(None), AnalysisJob.available_at <= _now()),
+            )
+            .order_by(AnalysisJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            return None
+        now = _now()
+        job.status = JOB_RUNNING
+        job.attempts = (job.attempts or 0) + 1
+        job.worker_id = WORKER_ID
+        job.stage = "starting"
+        job.progress = 0.0
+        job.started_at = now
+        job.heartbeat_at = now
+        await db.commit()
+        return job
+
+
+async def recover_stale_jobs() -> int:
+    """
+    Requeue running jobs whose worker stopped heartbeating (crash, OOM, redeploy).
+
+    Jobs that already used JOB_MAX_ATTEMPTS are failed instead.
+    """
+    cutoff = _now() - timedelta(seconds=JOB_LEASE_SECONDS)
+    stale = (AnalysisJob.status == JOB_RUNNING) & (AnalysisJob.heartbeat_at < cutoff)
+    async with AsyncSessionLocal() as db:
+        failed = await db.execute(
+            update(AnalysisJob)
+            .where(stale, AnalysisJob.attempts >= JOB_MAX_ATTEMPTS)
+            .values(status=JOB_FAILED, error="Worker lost too many times", finished_at=_now())
+        )
+        requeued = await db.execute(
+            update(AnalysisJob)
+            .where(stale)
+            .values(status=JOB_QUEUED, worker_id=None, stage=None)
+        )
+        await db.commit()
+    if failed.rowcount or requeued.rowcount:
+        logger.warning(f"♻️ Recovered stale jobs: {requeued.rowcount} requeued, {failed.rowcount} failed")
+    return requeued.rowcount
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            await _update_job(job_id, heartbeat_at=_now())
+        except Exception as e:
+            logger.warning(f"⚠️ Heartbeat failed for job {job_id}: {e}")
+
+
+async def run_job(job: AnalysisJob):
+    media = SpooledMedia(
+        path=job.file_path,
+        filename=job.filename,
+        content_hash=job.content_hash,
+        size=job.file_size,
+        content_type=job.content_type,
+    )
+
+    async def on_progress(stage: str, progress: float):
+        await _update_job(job.id, stage=stage, progress=progress, heartbeat_at=_now())
+
+    logger.info(f"⚙️ Running job {job.id} ({job.filename}), attempt {job.attempts}")
+    heartbeat = asyncio.create_task(_heartbeat(job.id))
+    try:
+        if not os.path.exists(media.path):
+            raise FileNotFoundError(f"Spooled upload missing: {media.path}")
+
+        if job.media_type == "image":
+            result = await analyze_image(media, on_progress=on_progress)
+        else:
+            result = await analyze_video(media, include_debug=False, on_progress=on_progress)
+
+        await _update_job(job.id, stage="storing", progress=0.99, heartbeat_at=_now())
+        async with AsyncSessionLocal() as db:
+            await store_analysis_result(
+                db=db,
+                filename=result["filename"],
+                media_type=result["media_type"],
+                summary=result["summary"],
+                transcript=result["transcript"],
+                metadata=result["media_metadata"],
+                vector=result.get("vector"),
+                overwrite=job.overwrite,
+                transcript_segments=result.get("transcript_segments"),
+                passages=result.get("passages")
+            )
+
+        await _update_job(
+            job.id,
+            status=JOB_SUCCEEDED,
+            stage="done",
+            progress=1.0,
+            error=None,
+            finished_at=_now(),
+            result={k: v for k, v in result.items() if k not in ("vector", "passages")},
+        )
+        media.cleanup()
+        logger.info(f"✅ Job {job.id} succeeded")
+
+    except asyncio.CancelledError:
+        # Graceful shutdown: hand the job straight back to the queue.
+        await asyncio.shield(_update_job(
+            job.id, status=JOB_QUEUED, worker_id=None, stage=None, attempts=max(0, job.attempts - 1)
+        ))
+        raise
+
+    except Exception as e:
+        final = job.attempts >= JOB_MAX_ATTEMPTS or isinstance(e, FileNotFoundError)
+        delay = 0.0 if final else retry_delay(job.attempts)
+        logger.error(f"❌ Job {job.id} failed (attempt {job.attempts}, final={final}): {e}"
+                     + ("" if final else f"; retrying in {delay:.0f}s"))
+        # Back off so a failing dependency (LLM, ES) isn't hammered by instant retries.
+        try:
+            await _update_job(
+                job.id,
+                status=JOB_FAILED if final else JOB_QUEUED,
+                error=str(e),
+                worker_id=None,
+                available_at=None if final else _now() + timedelta(seconds=delay),
+                finished_at=_now() if final else None,
+            )
+        except Exception as update_error:
+            # Often the same outage; the job stays running until recovery requeues it.
+            logger.error(f"❌ Could not record failure of job {job.id}: {update_error}")
+            return
+        if final:
+            media.cleanup()
+
+    finally:
+        heartbeat.cancel()
+
+
+async def job_worker(index: int):
+    logger.info(f"👷 Job worker {index} started ({WORKER_ID})")
+    while True:
+        try:
+            job = await claim_next_job()
+        except Exception as e:
+            logger.error(f"❌ Job worker {index} could not poll the queue: {e}")
+            job = None
+        if job is None:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            continue
+        try:
+            await run_job(job)
+        except Exception as e:
+            # Keep the worker alive; stale job recovery requeues the job once its lease lapses.
+            logger.error(f"❌ Job worker {index} failed running job {job.id}: {e}")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+async def _recovery_loop():
+    while True:
+        try:
+            await recover_stale_jobs()
+        except Exception as e:
+            logger.error(f"❌ Stale job recovery failed: {e}")
+        await asyncio.sleep(JOB_LEASE_SECONDS / 2)
+
+
+def start_job_workers(concurrency: int) -> List[asyncio.Task]:
+    if concurrency <= 0:
+        logger.info("⏸️ Job workers disabled (JOB_WORKERS=0)")
+        return []
+    tasks = [asyncio.create_task(_recovery_loop())]
+    tasks.extend(asyncio.create_task(job_worker(i)) for i in range(concurrency))
+    return tasks
+
+
+async def stop_job_workers(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,52 @@
+# app/services/passage_service.py
+from typing import List, Optional
+from app.core.config import PASSAGE_MAX_CHARS
+from app.core.ai_models import get_model_loader
+from app.core.logging.logger import get_logger
+from app.services.rag_search import chunk_text
+
+logger = get_logger(__name__)
+
+
+def _passage(index: int, text: str, start: Optional[float] = None, end: Optional[float] = None) -> dict:
+    return {"chunk_index": index, "text": text, "start": start, "end": end}
+
+
+def build_passages(transcript: str, segments: Optional[list] = None, max_chars: int = PASSAGE_MAX_CHARS) -> List[dict]:
+    """
+    Split a transcript into retrieval passages of at most ~`max_chars` characters.
+
+    With Whisper segments, passages are runs of whole segments and keep their start/end
+    times; otherwise the flat transcript is split at sentence boundaries.
+
+    Returns:
+        list: [{"chunk_index", "text", "start", "end"}]
+    """
+    if segments:
+        passages, texts, start, end = [], [], None, None
+        length = 0
+        for seg in segments:
+            if texts and length + len(seg["text"]) + 1 > max_chars:
+                passages.append(_passage(len(passages), " ".join(texts), start, end))
+                texts, length = [], 0
+            if not texts:
+                start = seg["start"]
+            texts.append(seg["text"])
+            length += len(seg["text"]) + 1
+            end = seg["end"]
+        if texts:
+            passages.append(_passage(len(passages), " ".join(texts), start, end))
+        return passages
+
+    if not transcript or not transcript.strip():
+        return []
+    return [_passage(i, text) for i, text in enumerate(chunk_text(transcript, max_chars))]
+
+
+async def embed_passages(passages: List[dict]) -> List[dict]:
+    """Attach a "vector" to every passage, encoded as micro-batches in one submission."""
+    if not passages:
+        return passages
+    vectors = await get_model_loader().embed_many_async([p["text"] for p in passages])
+    logger.info(f"📌 Embedded {len(passages)} transcript passage(s)")
+    return [{**p, "vector": vector} for p, vector in zip(passages, vectors)]
@@ -0,0 +1,93 @@
+# app/services/pipeline.py
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Stage:
+    """
+    One node of an analysis DAG.
+
+    `func` receives the results of its `deps` as keyword arguments (by stage name)
+    and returns this stage's result.
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+
+
+def _check_acyclic(by_name: Dict[str, Stage]):
+    pending = {name: set(stage.deps) for name, stage in by_name.items()}
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"Pipeline has a dependency cycle among: {sorted(pending)}")
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+
+
+async def run_pipeline(
+    stages: List[Stage],
+    on_progress: Optional[Callable[[str, float], Awaitable[None]]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, dict]]:
+    """
+    Run `stages` concurrently, starting each as soon as its dependencies finish.
+
+    `on_progress(stage_name, fraction_complete)` is awaited after each stage succeeds;
+    failures in the callback are logged and never abort the pipeline.
+
+    Returns:
+        tuple: (results by stage name, timeline by stage name with start/end offsets
+            and duration in seconds relative to pipeline start)
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {missing}")
+    _check_acyclic(by_name)
+
+    origin = time.perf_counter()
+    results: Dict[str, Any] = {}
+    timeline: Dict[str, dict] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def _run(stage: Stage):
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        started = time.perf_counter()
+        try:
+            results[stage.name] = await stage.func(**{dep: results[dep] for dep in stage.deps})
+        finally:
+            ended = time.perf_counter()
+            timeline[stage.name] = {
+                "start": round(started - origin, 3),
+                "end": round(ended - origin, 3),
+                "duration": round(ended - started, 3),
+            }
+            logger.debug(f"⏱️ Stage '{stage.name}' finished in {ended - started:.2f}s")
+        if on_progress is not None:
+            try:
+                await on_progress(stage.name, len(results) / len(stages))
+            except Exception as e:
+                logger.warning(f"⚠️ Progress callback failed after stage '{stage.name}': {e}")
+
+    # Tasks are created in one pass so every dependency handle exists before any stage awaits it.
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(_run(stage))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return results, timeline
@@ -1,6 +1,8 @@
 # app/services/rag_search.py
+import asyncio
+import time
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -14,6 +16,15 @@ class RAGQuery(BaseModel):
     score_threshold: float = 1.25
     fallback_to_keyword: bool = True
     debug: bool = True
+    # None = VECTOR_SEARCH_MODE / KNN_NUM_CANDIDATES from config; "exact" is the brute-force baseline.
+    vector_search: Optional[Literal["knn", "exact"]] = None
+    num_candidates: Optional[int] = Field(default=None, ge=1, le=10000)
+    # Fusion settings; None = RAG_RETRIEVAL_MODE, RAG_VECTOR_WEIGHT, ... from config.
+    retrieval: Optional[Literal["hybrid", "vector"]] = None
+    vector_weight: Optional[float] = Field(default=None, ge=0)
+    keyword_weight: Optional[float] = Field(default=None, ge=0)
+    rrf_k: Optional[int] = Field(default=None, ge=1)
+    context_docs: Optional[int] = Field(default=None, ge=1, le=20)
 
 def build_context_from_docs(docs: List[dict]) -> str:
     if not docs:
@@ -35,81 +46,386 @@ def chunk_text(text: str, max_chars: int = 1000) -> List[str]:
         chunks.append(text)
     return chunks
 
-def run_rag_pipeline(
+async def _embed_query_cached(model_loader, query: str) -> list:
+    from app.core.query_cache import get_embedding_cache, normalize_query
+
+    cache = get_embedding_cache()
+    key = normalize_query(query)
+    vector = cache.get(key)
+    if vector is None:
+        vector = await model_loader.embed_query_async(query)
+        cache.put(key, vector)
+    return vector
+
+async def _search_hits_cached(kind: str, index: str, query: str, top_k: int, body: dict) -> list:
+    """ES hits for `body`, cached per (kind, normalized query, top_k) until the index is written."""
+    from app.core.elasticsearch import get_async_es
+    from app.core.query_cache import get_search_cache, normalize_query
+
+    cache = get_search_cache()
+    key = (kind, normalize_query(query), top_k)
+    hits = cache.get(key)
+    if hits is None:
+        generation = cache.generation
+        hits = (await get_async_es().search(index=index, body=body))["hits"]["hits"]
+        cache.put(key, hits, generation=generation)
+    return hits
+
+async def _msearch_cached(kind: str, query: str, top_k: int, searches: List[tuple]) -> List[Optional[list]]:
+    """
+    Hits for several (index, body) searches in one `_msearch` round trip, cached together
+    like `_search_hits_cached`. A search that failed yields None, and nothing is cached.
+    """
+    from app.core.elasticsearch import get_async_es
+    from app.core.query_cache import get_search_cache, normalize_query
+
+    cache = get_search_cache()
+    key = (kind, normalize_query(query), top_k)
+    results = cache.get(key)
+    if results is None:
+        generation = cache.generation
+        lines = []
+        for index, body in searches:
+            lines.extend([{"index": index}, body])
+        responses = (await get_async_es().msearch(body=lines))["responses"]
+        results = [None if "error" in r else r["hits"]["hits"] for r in responses]
+        for (index, _), response in zip(searches, responses):
+            if "error" in response:
+                logger.warning(f"⚠️ Search on '{index}' failed: {response['error']}")
+        if None not in results:
+            cache.put(key, results, generation=generation)
+    return results
+
+# Full transcripts never leave ES; retrieval returns passages instead.
+MEDIA_SOURCE_EXCLUDES = ["vector", "transcript", "transcript_segments"]
+
+def _vector_body(query_vector: list, size: int, mode: str = "knn", num_candidates: int = 100) -> dict:
+    if mode == "knn":
+        return {
+            "size": size,
+            "_source": {"excludes": MEDIA_SOURCE_EXCLUDES},
+            "knn": {
+                "field": "vector",
+                "query_vector": query_vector,
+                "k": size,
+                "num_candidates": max(num_candidates, size),
+            },
+        }
+    return {
+        "size": size,
+        "_source": {"excludes": MEDIA_SOURCE_EXCLUDES},
+        "query": {
+            "script_score": {
+                "query": {"match_all": {}},
+                "script": {
+                    "source": "cosineSimilarity(params.query_vector, 'vector') + 1.0",
+                    "params": {"query_vector": query_vector}
+                }
+            }
+        }
+    }
+
+# Indices whose kNN search failed (e.g. vectors not HNSW-indexed yet) -> when it failed.
+# They get exact search directly until KNN_RETRY_SECONDS pass, rather than a failing kNN
+# search plus an exact re-query on every request.
+KNN_RETRY_SECONDS = 600
+_knn_failed_at: dict = {}
+
+def _index_mode(index: str, mode: str) -> str:
+    failed_at = _knn_failed_at.get(index)
+    if mode == "knn" and failed_at is not None and time.monotonic() - failed_at < KNN_RETRY_SECONDS:
+        return "exact"
+    return mode
+
+async def _vector_hits(kind: str, index: str, query: str, top_k: int, query_vector: list, size: int,
+                 mode: str, num_candidates: int) -> list:
+    """
+    Vector hits on the brute-force scale (cosine + 1, in [0, 2]), whichever mode ran, so
+    `score_threshold` means the same for both. kNN falls back to exact search on indices
+    whose vectors aren't HNSW-indexed yet.
+    """
+    if _index_mode(index, mode) == "knn":
+        try:
+            hits = await _search_hits_cached(
+                f"{kind}:knn:{num_candidates}", index, query, top_k,
+                _vector_body(query_vector, size, "knn", num_candidates),
+            )
+            # kNN reports cosine similarity as (1 + cosine) / 2.
+            return [{**hit, "_score": hit["_score"] * 2} for hit in hits]
+        except Exception as e:
+            logger.warning(f"⚠️ kNN search on '{index}' failed, using exact search: {e}")
+            _knn_failed_at[index] = time.monotonic()
+    return await _search_hits_cached(
+        f"{kind}:exact", index, query, top_k, _vector_body(query_vector, size, "exact")
+    )
+
+def _keyword_body(query: str, fields: List[str], size: int) -> dict:
+    return {
+        "size": size,
+        "_source": {"excludes": MEDIA_SOURCE_EXCLUDES},
+        "query": {"multi_match": {"query": query, "fields": fields}}
+    }
+
+def _merge_hits(media_hits: list, passage_hits: list, score_threshold: Optional[float] = None) -> List[dict]:
+    """
+    Group media-level and passage-level hits by media file, best-scoring file first.
+
+    Each document carries its summary and up to RAG_PASSAGES_PER_DOC best passages;
+    "transcript" holds just those passages, not the whole transcript.
+    """
+    from app.core.config import RAG_PASSAGES_PER_DOC
+
+    docs = {}
+    for hit in media_hits:
+        if score_threshold is not None and hit["_score"] <= score_threshold:
+            continue
+        src = hit["_source"]
+        docs[src["filename"]] = {
+            "filename": src["filename"],
+            "media_type": src.get("media_type", "unknown"),
+            "relative_path": src.get("relative_path", ""),
+            "summary": src.get("summary", ""),
+            "score": hit["_score"],
+            "passages": [],
+        }
+    for hit in passage_hits:
+        if score_threshold is not None and hit["_score"] <= score_threshold:
+            continue
+        src = hit["_source"]
+        # Passages carry their file's summary; ones indexed before that carry none (None).
+        doc = docs.setdefault(src["filename"], {
+            "filename": src["filename"],
+            "media_type": src.get("media_type", "unknown"),
+            "relative_path": "",
+            "summary": src.get("summary"),
+            "score": hit["_score"],
+            "passages": [],
+        })
+        doc["score"] = max(doc["score"], hit["_score"])
+        if len(doc["passages"]) < RAG_PASSAGES_PER_DOC:
+            doc["passages"].append({
+                "text": src["text"],
+                "start": src.get("start"),
+                "end": src.get("end"),
+                "score": hit["_score"],
+            })
+
+    ranked = sorted(docs.values(), key=lambda d: d["score"], reverse=True)
+    for doc in ranked:
+        doc["passages"].sort(key=lambda p: p["start"] if p["start"] is not None else 0.0)
+        doc["transcript"] = "\n".join(p["text"] for p in doc["passages"])
+    return ranked
+
+def _fuse_hits(retrievers: List[tuple], rrf_k: int) -> List[dict]:
+    """
+    Reciprocal rank fusion of several retrievers into one ranking of media files.
+
+    `retrievers` holds (media_hits, passage_hits, weight, score_threshold) per retriever.
+    Each ranks files as `_merge_hits` does, and a file scores weight / (rrf_k + rank)
+    from every list it appears in; passages are fused the same way, so a file keeps its
+    RAG_PASSAGES_PER_DOC best passages from either retriever. Only ranks are used, so
+    BM25 and cosine scores never need to be comparable.
+    """
+    from app.core.config import RAG_PASSAGES_PER_DOC
+
+    docs, passages = {}, {}
+    for media_hits, passage_hits, weight, score_threshold in retrievers:
+        if weight <= 0:
+            continue
+        for rank, doc in enumerate(_merge_hits(media_hits, passage_hits, score_threshold), start=1):
+            fused = docs.setdefault(doc["filename"], {**doc, "score": 0.0, "passages": []})
+            fused["score"] += weight / (rrf_k + rank)
+            if fused["summary"] is None and doc["summary"] is not None:
+                fused.update(summary=doc["summary"], relative_path=doc["relative_path"])
+        kept = [hit for hit in passage_hits if score_threshold is None or hit["_score"] > score_threshold]
+        for rank, hit in enumerate(kept, start=1):
+            src = hit["_source"]
+            passage = passages.setdefault(hit["_id"], {
+                "filename": src["filename"],
+                "text": src["text"],
+                "start": src.get("start"),
+                "end": src.get("end"),
+                "score": 0.0,
+            })
+            passage["score"] += weight / (rrf_k + rank)
+
+    for passage in sorted(passages.values(), key=lambda p: p["score"], reverse=True):
+        doc = docs.get(passage.pop("filename"))
+        if doc is not None and len(doc["passages"]) < RAG_PASSAGES_PER_DOC:
+            doc["passages"].append(passage)
+
+    ranked = sorted(docs.values(), key=lambda d: d["score"], reverse=True)
+    for doc in ranked:
+        doc["passages"].sort(key=lambda p: p["start"] if p["start"] is not None else 0.0)
+        doc["transcript"] = "\n".join(p["text"] for p in doc["passages"])
+    return ranked
+
+def _keyword_searches(query: str, top_k: int, passage_size: int) -> List[tuple]:
+    from app.core.config import ELASTIC_INDEX, ELASTIC_PASSAGE_INDEX
+
+    return [
+        (ELASTIC_INDEX, _keyword_body(query, ["summary", "transcript"], top_k)),
+        (ELASTIC_PASSAGE_INDEX, _keyword_body(query, ["text"], passage_size)),
+    ]
+
+async def _hybrid_hits(query: str, query_vector: list, top_k: int, passage_size: int,
+                 mode: str, num_candidates: int) -> tuple:
+    """
+    Vector and keyword hits for summaries and passages, all from a single round trip:
+    one `_msearch`, or with the local vector index just the keyword pair.
+
+    The one exception is the first kNN search that fails on an index (e.g. vectors not
+    HNSW-indexed yet): that index is re-queried with exact search, then gets exact search
+    inside the `_msearch` until KNN_RETRY_SECONDS pass.
+
+    Returns:
+        tuple: (media_vector, passage_vector, media_keyword, passage_keyword) hit lists
+    """
+    from app.core.config import ELASTIC_INDEX, ELASTIC_PASSAGE_INDEX
+
+    keyword = _keyword_searches(query, top_k, passage_size)
+    if mode == "local":
+        from app.core.vector_index import get_vector_index
+
+        # Keyword msearch in flight while the local vector searches run in worker threads.
+        (media_keyword, passage_keyword), media_vector, passage_vector = await asyncio.gather(
+            _msearch_cached("hybrid:keyword", query, top_k, keyword),
+            asyncio.to_thread(get_vector_index("media").search, query_vector, top_k),
+            asyncio.to_thread(get_vector_index("passages").search, query_vector, passage_size),
+        )
+        return media_vector, passage_vector, media_keyword or [], passage_keyword or []
+
+    targets = [("vector", ELASTIC_INDEX, top_k), ("passage_vector", ELASTIC_PASSAGE_INDEX, passage_size)]
+    modes = [_index_mode(index, mode) for _, index, _ in targets]
+    vector = [
+        (index, _vector_body(query_vector, size, index_mode, num_candidates))
+        for (_, index, size), index_mode in zip(targets, modes)
+    ]
+    results = await _msearch_cached(f"hybrid:{':'.join(modes)}:{num_candidates}", query, top_k, vector + keyword)
+    for i, ((kind, index, size), index_mode) in enumerate(zip(targets, modes)):
+        if results[i] is None:
+            # e.g. kNN against an index without HNSW-indexed vectors
+            if index_mode == "knn":
+                _knn_failed_at[index] = time.monotonic()
+            results[i] = await _vector_hits(kind, index, query, top_k, query_vector, size, "exact", num_candidates)
+        elif index_mode == "knn":
+            # kNN reports cosine similarity as (1 + cosine) / 2.
+            results[i] = [{**hit, "_score": hit["_score"] * 2} for hit in results[i]]
+    return tuple(hits or [] for hits in results)
+
+async def _fill_summaries(docs: List[dict]):
+    """
+    Fill in summaries for files found only through passages that don't carry one.
+
+    Passages stored since the summary was added to them do, so this is a no-op for them;
+    passages indexed before that still cost one extra `mget` round trip until the file is
+    re-analyzed or the passages are backfilled.
+    """
+    from app.core.elasticsearch import get_async_es
+    from app.core.config import ELASTIC_INDEX, VECTOR_SEARCH_BACKEND
+
+    if VECTOR_SEARCH_BACKEND == "local":
+        from app.core.vector_index import get_vector_index
+
+        for doc in docs:
+            if doc["summary"] is None and (src := get_vector_index("media").get_source(doc["filename"])):
+                doc["summary"] = src.get("summary") or ""
+                doc["relative_path"] = src.get("relative_path") or ""
+    missing = [d for d in docs if d["summary"] is None]
+    if not missing:
+        return
+    response = await get_async_es().mget(index=ELASTIC_INDEX, body={
+        "docs": [{"_id": d["filename"], "_source": ["summary", "relative_path"]} for d in missing]
+    })
+    for doc, found in zip(missing, response["docs"]):
+        src = found.get("_source", {}) if found.get("found") else {}
+        doc["summary"] = src.get("summary", "")
+        doc["relative_path"] = src.get("relative_path", "")
+
+async def run_rag_pipeline(
     query: str,
     top_k: int = 5,
     score_threshold: float = 1.25,
     fallback_to_keyword: bool = True,
-    debug: bool = False
+    debug: bool = False,
+    vector_search: Optional[str] = None,
+    num_candidates: Optional[int] = None,
+    retrieval: Optional[str] = None,
+    vector_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+    rrf_k: Optional[int] = None,
+    context_docs: Optional[int] = None
 ) -> dict:
-    from app.core.elasticsearch import es
-    from app.core.config import ELASTIC_INDEX
+    from app.core.config import (
+        ELASTIC_INDEX,
+        ELASTIC_PASSAGE_INDEX,
+        RAG_PASSAGES_PER_DOC,
+        VECTOR_SEARCH_MODE,
+        VECTOR_SEARCH_BACKEND,
+        KNN_NUM_CANDIDATES,
+        RAG_RETRIEVAL_MODE,
+        RAG_VECTOR_WEIGHT,
+        RAG_KEYWORD_WEIGHT,
+        RAG_RRF_K,
+        RAG_CONTEXT_DOCS,
+    )
     from app.core.ai_models import get_model_loader
 
-    logger.info(f"🔍 Running RAG pipeline for query: '{query}'")
+    mode = "local" if VECTOR_SEARCH_BACKEND == "local" else vector_search or VECTOR_SEARCH_MODE
+    num_candidates = num_candidates or KNN_NUM_CANDIDATES
+    retrieval = retrieval or RAG_RETRIEVAL_MODE
+    context_docs = context_docs or RAG_CONTEXT_DOCS
+    logger.info(f"🔍 Running RAG pipeline for query: '{query}' ({retrieval} retrieval, {mode} vector search)")
     model_loader = get_model_loader()
-    query_vector = model_loader.embed_query(query)
+    query_vector = await _embed_query_cached(model_loader, query)
+    passage_size = top_k * RAG_PASSAGES_PER_DOC
 
     try:
-        # Vector search
-        response = es.search(
-            index=ELASTIC_INDEX,
-            body={
-                "size": top_k,
-                "query": {
-                    "script_score": {
-                        "query": {"match_all": {}},
-                        "script": {
-                            "source": "cosineSimilarity(params.query_vector, 'vector') + 1.0",
-                            "params": {"query_vector": query_vector}
-                        }
-                    }
-                }
-            }
-        )
-
-        hits = response["hits"]["hits"]
-        logger.info(f"✅ Retrieved {len(hits)} vector search hits")
-
-        filtered_docs = [
-            {
-                "filename": hit["_source"]["filename"],
-                "media_type": hit["_source"].get("media_type", "unknown"),
-                "relative_path": hit["_source"].get("relative_path", ""),
-                "summary": hit["_source"].get("summary", ""),
-                "transcript": hit["_source"].get("transcript", ""),
-                "score": hit["_score"]
-            }
-            for hit in hits if hit["_score"] > score_threshold
-        ][:2]
-
-        # Fallback to keyword if needed
-        if not filtered_docs and fallback_to_keyword:
-            logger.info("🔁 Fallback to keyword search")
-            keyword_response = es.search(
-                index=ELASTIC_INDEX,
-                body={
-                    "size": top_k,
-                    "query": {
-                        "multi_match": {
-                            "query": query,
-                            "fields": ["summary", "transcript"]
-                        }
-                    }
-                }
+        if retrieval == "hybrid":
+            media_vector, passage_vector, media_keyword, passage_keyword = await _hybrid_hits(
+                query, query_vector, top_k, passage_size, mode, num_candidates
             )
-            keyword_hits = keyword_response["hits"]["hits"]
-            filtered_docs = [
-                {
-                    "filename": hit["_source"]["filename"],
-                    "media_type": hit["_source"].get("media_type", "unknown"),
-                    "relative_path": hit["_source"].get("relative_path", ""),
-                    "summary": hit["_source"].get("summary", ""),
-                    "transcript": hit["_source"].get("transcript", ""),
-                    "score": hit["_score"]
-                }
-                for hit in keyword_hits
-            ][:2]
+            logger.info(
+                f"✅ Retrieved {len(media_vector)}/{len(passage_vector)} vector and "
+                f"{len(media_keyword)}/{len(passage_keyword)} keyword media/passage hits"
+            )
+            filtered_docs = _fuse_hits([
+                (media_vector, passage_vector, RAG_VECTOR_WEIGHT if vector_weight is None else vector_weight,
+                 score_threshold),
+                (media_keyword, passage_keyword, RAG_KEYWORD_WEIGHT if keyword_weight is None else keyword_weight,
+                 None),
+            ], rrf_k or RAG_RRF_K)[:context_docs]
+        else:
+            # Vector search over summaries and over transcript passages
+            if mode == "local":
+                # In-process memory-mapped index: no round trip to Elasticsearch.
+                from app.core.vector_index import get_vector_index
+
+                media_hits, passage_hits = await asyncio.gather(
+                    asyncio.to_thread(get_vector_index("media").search, query_vector, top_k),
+                    asyncio.to_thread(get_vector_index("passages").search, query_vector, passage_size),
+                )
+            else:
+                media_hits, passage_hits = await asyncio.gather(
+                    _vector_hits("vector", ELASTIC_INDEX, query, top_k, query_vector, top_k, mode, num_candidates),
+                    _vector_hits(
+                        "passage_vector", ELASTIC_PASSAGE_INDEX, query, top_k, query_vector, passage_size, mode,
+                        num_candidates
+                    ),
+                )
+            logger.info(f"✅ Retrieved {len(media_hits)} media and {len(passage_hits)} passage vector hits")
+
+            filtered_docs = _merge_hits(media_hits, passage_hits, score_threshold)[:context_docs]
+
+            # Fallback to keyword if needed
+            if not filtered_docs and fallback_to_keyword:
+                logger.info("🔁 Fallback to keyword search")
+                keyword_media, keyword_passages = await _msearch_cached(
+                    "keyword", query, top_k, _keyword_searches(query, top_k, passage_size)
+                )
+                filtered_docs = _merge_hits(keyword_media or [], keyword_passages or [])[:context_docs]
+
+        await _fill_summaries(filtered_docs)
 
         # Build prompt for Ollama summarization
         combined_text = "\n\n".join(
@@ -128,7 +444,7 @@ def run_rag_pipeline(
         Answer:
         """.strip()
 
-        answer = model_loader.summarize_text(text=full_prompt, prompt=None)
+        answer = await model_loader.summarize_text_async(text=full_prompt, prompt=None)
 
         return {
             "query": query,
@@ -1,5 +1,10 @@
-from app.core.elasticsearch import es
-from app.core.config import ELASTIC_INDEX
+import asyncio
+from elasticsearch.helpers import async_bulk
+from app.core.elasticsearch import get_async_es
+from app.core.config import ELASTIC_INDEX, ELASTIC_PASSAGE_INDEX
+from app.core.embedding_backends import embedding_stamp
+from app.core.query_cache import get_search_cache
+from app.services.vector_index_service import index_stored_result, local_vector_search_enabled
 from app.core.logging.logger import get_logger
 from app.models.media import MediaAnalysis
 from datetime import datetime
@@ -8,6 +13,37 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = get_logger(__name__)
 
+async def _replace_passages(filename: str, media_type: str, passages: list, summary: str = None):
+    es = get_async_es()
+    # Drop the previous version's chunks first; a shorter transcript would otherwise leave orphans.
+    await es.delete_by_query(
+        index=ELASTIC_PASSAGE_INDEX,
+        body={"query": {"term": {"filename": filename}}},
+        conflicts="proceed",
+        refresh=True,
+    )
+    if not passages:
+        return
+    actions = [
+        {
+            "_index": ELASTIC_PASSAGE_INDEX,
+            "_id": f"{filename}#{p['chunk_index']}",
+            "_source": {
+                "filename": filename,
+                "media_type": media_type,
+                "summary": summary,
+                "chunk_index": p["chunk_index"],
+                "text": p["text"],
+                "start": p.get("start"),
+                "end": p.get("end"),
+                "vector": p["vector"],
+                **embedding_stamp(),
+            },
+        }
+        for p in passages
+    ]
+    await async_bulk(es, actions)
+
 async def store_analysis_result(
     db: AsyncSession,  
     filename: str,
@@ -16,7 +52,9 @@ async def store_analysis_result(
     transcript: str,
     metadata: dict,
     vector: list = None,
-    overwrite: bool = True
+    overwrite: bool = True,
+    transcript_segments: list = None,
+    passages: list = None
 ):
     try:
         result = await db.execute(
@@ -57,7 +95,23 @@ async def store_analysis_result(
     }
     if vector is not None:
         es_doc["vector"] = vector
+        es_doc.update(embedding_stamp())
+    if transcript_segments:
+        es_doc["transcript_segments"] = transcript_segments
 
-    es.index(index=ELASTIC_INDEX, id=filename, document=es_doc)
+    await get_async_es().index(index=ELASTIC_INDEX, id=filename, document=es_doc)
     logger.info(f"📦 Indexed in Elasticsearch: {filename}")
 
+    if passages is not None:
+        await _replace_passages(filename, media_type, passages, summary)
+        logger.info(f"📦 Indexed {len(passages)} transcript passage(s) for: {filename}")
+
+    if local_vector_search_enabled():
+        try:
+            await asyncio.to_thread(index_stored_result, filename, es_doc, passages)
+        except Exception as e:
+            # ES already has the document; the background sync copies it over later.
+            logger.warning(f"⚠️ Failed to mirror {filename} into the local vector index: {e}")
+
+    # Cached retrievals may now be missing or ranking a stale copy of this document.
+    get_search_cache().invalidate()
@@ -0,0 +1,143 @@
+# app/services/vector_index_service.py
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from app.core.config import (
+    ELASTIC_INDEX,
+    ELASTIC_PASSAGE_INDEX,
+    VECTOR_SEARCH_BACKEND,
+    VECTOR_INDEX_SYNC_INTERVAL,
+    VECTOR_INDEX_PRUNE_INTERVAL,
+)
+from app.core.elasticsearch import es, scan_pages
+from app.core.vector_index import KIND_FIELDS, LocalVectorIndex, get_vector_index
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+SYNC_PAGE_SIZE = 500
+# Writers stamp `timestamp` with their own clock; re-read a little before the last sync.
+SYNC_MARGIN = timedelta(minutes=5)
+
+
+def local_vector_search_enabled() -> bool:
+    return VECTOR_SEARCH_BACKEND == "local"
+
+
+def _project(kind: str, source: dict) -> dict:
+    # Missing fields are left out so readers' `.get(field, default)` still applies.
+    return {field: source[field] for field in KIND_FIELDS[kind] if source.get(field) is not None}
+
+
+def index_stored_result(filename: str, media_doc: dict, passages: Optional[list] = None):
+    """Mirror one `store_analysis_result` write into the local indices."""
+    get_vector_index("media").upsert([(filename, media_doc.get("vector"), _project("media", media_doc))])
+    if passages is not None:
+        media_type = media_doc.get("media_type")
+        get_vector_index("passages").replace_filename(filename, [
+            (
+                f"{filename}#{p['chunk_index']}",
+                p.get("vector"),
+                _project("passages", {**p, "filename": filename, "media_type": media_type}),
+            )
+            for p in passages
+        ])
+
+
+def _drop_deleted(media: LocalVectorIndex, passages: Optional[LocalVectorIndex], media_index: str) -> int:
+    """Remove local media documents no longer in ES, and passages whose media document is gone."""
+    # Snapshot local ids before scanning ES: a document mirrored meanwhile was indexed in ES
+    # first, so only ids missing from a later scan were actually deleted.
+    local_ids = media.doc_ids()
+    local_files = passages.filenames() if passages is not None else []
+    live_ids, live_files = set(), set()
+    for hits in scan_pages(media_index, ["filename"], SYNC_PAGE_SIZE, source_includes=["filename"]):
+        live_ids.update(hit["_id"] for hit in hits)
+        live_files.update(hit["_source"]["filename"] for hit in hits)
+
+    removed = media.delete(doc_id for doc_id in local_ids if doc_id not in live_ids)
+    for filename in local_files:
+        if filename not in live_files:
+            passages.delete_filename(filename)
+    return removed
+
+
+def sync_from_es(media: Optional[LocalVectorIndex] = None, passages: Optional[LocalVectorIndex] = None,
+                 full: bool = False, include_passages: bool = True, media_index: str = ELASTIC_INDEX,
+                 passage_index: str = ELASTIC_PASSAGE_INDEX, prune: bool = False) -> dict:
+    """
+    Copy media documents (and their passages) indexed in ES since the last sync into the
+    local indices; everything when the media index is empty or `full` is set, which first
+    clears both. `include_passages=False` syncs media only. With `prune`, a catch-up sync
+    also drops documents deleted from ES, which a timestamp range cannot see; that scans
+    every media id, so callers do it far less often than they catch up.
+
+    Returns:
+        dict: {"media": n, "passages": n} documents stored, {"deleted": n} media documents removed
+    """
+    media = media if media is not None else get_vector_index("media")
+    if include_passages and passages is None:
+        passages = get_vector_index("passages")
+    started = datetime.utcnow()
+
+    watermark = media.get_meta("synced_at")
+    if full or len(media) == 0:
+        media.reset()
+        if include_passages:
+            passages.reset()
+        watermark = None
+    query = None
+    if watermark:
+        since = datetime.fromisoformat(watermark) - SYNC_MARGIN
+        query = {"range": {"timestamp": {"gte": since.isoformat()}}}
+
+    counts = {"media": 0, "passages": 0, "deleted": 0}
+    with_passages = include_passages and es.indices.exists(index=passage_index)
+    for hits in scan_pages(media_index, ["filename"], SYNC_PAGE_SIZE, query=query):
+        counts["media"] += media.upsert(
+            (hit["_id"], hit["_source"].get("vector"), _project("media", hit["_source"])) for hit in hits
+        )
+        if not with_passages:
+            continue
+        by_file: dict = {hit["_source"]["filename"]: [] for hit in hits}
+        for passage_hits in scan_pages(passage_index, ["filename", "chunk_index"], SYNC_PAGE_SIZE,
+                                       query={"terms": {"filename": list(by_file)}}):
+            for hit in passage_hits:
+                by_file[hit["_source"]["filename"]].append(
+                    (hit["_id"], hit["_source"].get("vector"), _project("passages", hit["_source"]))
+                )
+        for filename, docs in by_file.items():
+            counts["passages"] += passages.replace_filename(filename, docs)
+
+    if watermark and prune:
+        counts["deleted"] = _drop_deleted(media, passages if with_passages else None, media_index)
+
+    media.flush()
+    if include_passages:
+        passages.flush()
+    media.set_meta("synced_at", started.isoformat())
+    return counts
+
+
+async def vector_index_sync_loop(interval: float = VECTOR_INDEX_SYNC_INTERVAL,
+                                 prune_interval: float = VECTOR_INDEX_PRUNE_INTERVAL):
+    """
+    Initial sync at startup, then catch-up syncs every `interval` seconds (once if 0).
+    Deleted documents are pruned at startup and then every `prune_interval` seconds.
+    """
+    pruned_at = None
+    while True:
+        prune = pruned_at is None or (prune_interval > 0 and time.monotonic() - pruned_at >= prune_interval)
+        try:
+            counts = await asyncio.to_thread(sync_from_es, prune=prune)
+            if prune:
+                pruned_at = time.monotonic()
+            if any(counts.values()):
+                logger.info(f"🔄 Local vector index synced from ES: {counts['media']} media, "
+                            f"{counts['passages']} passages, {counts['deleted']} deleted")
+        except Exception as e:
+            logger.error(f"❌ Local vector index sync failed: {e}")
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
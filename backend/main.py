@@ -1,8 +1,14 @@
 # main.py
+import asyncio
 from fastapi import FastAPI
-from app.api.endpoints import search_media, health, upload_media, rag
+from app.api.endpoints import search_media, health, upload_media, rag, jobs
 from app.core.database import init_db
-from app.core.elasticsearch import init_elasticsearch
+from app.core.elasticsearch import init_elasticsearch, close_elasticsearch
+from app.core.ai_models import get_model_loader, warmup_targets
+from app.core.config import JOB_WORKERS
+from app.core.vector_index import close_vector_indices
+from app.services.job_service import start_job_workers, stop_job_workers
+from app.services.vector_index_service import local_vector_search_enabled, vector_index_sync_loop
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
@@ -10,7 +16,19 @@ async def lifespan(app: FastAPI):
     # Run on startup
     await init_db()
     await init_elasticsearch()
+    job_workers = start_job_workers(JOB_WORKERS)
+    # Models load in the background so /health and search can serve immediately.
+    warmup = asyncio.create_task(asyncio.to_thread(get_model_loader().warm_up, warmup_targets()))
+    vector_sync = asyncio.create_task(vector_index_sync_loop()) if local_vector_search_enabled() else None
     yield
+    # Run on shutdown
+    warmup.cancel()
+    if vector_sync:
+        vector_sync.cancel()
+    await stop_job_workers(job_workers)
+    get_model_loader().close()
+    close_vector_indices()
+    await close_elasticsearch()
 
 app = FastAPI(
     title="Media Analysis API",
@@ -23,6 +41,7 @@ app = FastAPI(
 app.include_router(rag.router, prefix="/rag", tags=["RAG Search"])
 app.include_router(health.router, prefix="/health", tags=["Health"])
 app.include_router(upload_media.router, prefix="/upload", tags=["Media Upload"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 app.include_router(search_media.router, prefix="/search", tags=["Keyword Search"])
 
 @app.get("/")
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+from elasticsearch import helpers
+
+from app.core.config import (
+    ELASTIC_INDEX,
+    ELASTIC_PASSAGE_INDEX,
+    EMBEDDING_MODEL,
+    EMBEDDING_VERSION,
+    VECTOR_DIMS,
+    EMBEDDING_BACKFILL_BATCH_SIZE,
+    EMBEDDING_BACKFILL_STATE_PATH,
+)
+from app.core.elasticsearch import (
+    es,
+    MEDIA_MAPPING,
+    PASSAGE_MAPPING,
+    INDEX_MAPPING_REVISION,
+    alias_targets,
+    mapping_with_dims,
+    scan_pages,
+    swap_aliases,
+    versioned_index_name,
+)
+from app.core.embedding_backends import create_embedding_backend, embedding_stamp
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# kind -> (alias, mapping, field embedded into `vector`, sort key for a resumable scan)
+TARGETS = {
+    "media": (ELASTIC_INDEX, MEDIA_MAPPING, "summary", ["filename"]),
+    "passages": (ELASTIC_PASSAGE_INDEX, PASSAGE_MAPPING, "text", ["filename", "chunk_index"]),
+}
+
+# Writers stamp `timestamp` with their own clock; re-copy a little before the recorded start.
+CATCH_UP_MARGIN = timedelta(minutes=5)
+
+
+# ----------------------------------------
+# Checkpoint
+# ----------------------------------------
+def load_state(path: str) -> dict:
+    fresh = {
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_version": EMBEDDING_VERSION,
+        "mapping_revision": INDEX_MAPPING_REVISION,
+        "started_at": datetime.utcnow().isoformat(),
+        "indices": {},
+        "swapped": False,
+    }
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return fresh
+    identity = ("embedding_model", "embedding_version", "mapping_revision")
+    if any(state.get(key) != fresh[key] for key in identity):
+        logger.warning(
+            f"⚠️ Checkpoint {path} is for a different model/mapping ({[state.get(key) for key in identity]}); "
+            f"starting a new backfill for {[fresh[key] for key in identity]}."
+        )
+        return fresh
+    return state
+
+
+def save_state(path: str, state: dict):
+    # Write-then-rename so a crash never leaves a truncated checkpoint.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ----------------------------------------
+# Copy
+# ----------------------------------------
+def prepare_target(index: str, mapping: dict, dims: int):
+    if es.indices.exists(index=index):
+        return
+    body = mapping_with_dims(mapping, dims)
+    # No refreshes or replicas while bulk loading; restored by finalize_target before the swap.
+    body["settings"] = {"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+    es.indices.create(index=index, body=body)
+    logger.info(f"✅ Created backfill target '{index}' ({dims} dims)")
+
+
+def finalize_target(index: str, source: str):
+    replicas = 1
+    if source and es.indices.exists(index=source):
+        settings = es.indices.get_settings(index=source)
+        replicas = int(settings[source]["settings"]["index"].get("number_of_replicas", 1))
+    es.indices.put_settings(index=index, body={"index": {"refresh_interval": None, "number_of_replicas": replicas}})
+    es.indices.refresh(index=index)
+
+
+def _scan(index: str, sort: list, batch_size: int, after=None, query: dict = None, with_vectors: bool = False):
+    # Stored vectors are only fetched when they are reused.
+    return scan_pages(index, sort, batch_size, after=after, query=query,
+                      source_excludes=None if with_vectors else ["vector"])
+
+
+def copy_page(backend, hits: list, target: str, text_field: str) -> int:
+    """
+    Re-embed one page of documents in a single encode call and bulk-write them to `target`.
+    Without a backend the stored vectors and stamps are copied unchanged.
+    """
+    if backend is None:
+        helpers.bulk(es, [{"_index": target, "_id": hit["_id"], "_source": hit["_source"]} for hit in hits])
+        return len(hits)
+
+    texts = [(hit["_source"].get(text_field) or "").strip() for hit in hits]
+    to_embed = [i for i, text in enumerate(texts) if text]
+    vectors = dict(zip(to_embed, backend.encode([texts[i] for i in to_embed]))) if to_embed else {}
+
+    stamp = embedding_stamp()
+    actions = []
+    for i, hit in enumerate(hits):
+        source = hit["_source"]
+        if i in vectors:
+            source.update(vector=vectors[i], **stamp)
+        else:
+            for key in ("vector", *stamp):
+                source.pop(key, None)
+        actions.append({"_index": target, "_id": hit["_id"], "_source": source})
+    helpers.bulk(es, actions)
+    return len(actions)
+
+
+def copy_index(backend, dims: int, kind: str, state: dict, state_path: str, batch_size: int):
+    alias, mapping, text_field, sort = TARGETS[kind]
+    progress = state["indices"].setdefault(kind, {"after": None, "copied": 0, "done": False})
+    target = progress["target"] = versioned_index_name(alias)
+
+    if alias_targets(alias) == [target]:
+        logger.info(f"✅ '{alias}' already points at '{target}'")
+        progress["done"] = True
+        return
+    prepare_target(target, mapping, dims)
+    if progress["done"]:
+        logger.info(f"⏭️ '{alias}' -> '{target}' already copied ({progress['copied']} docs)")
+        return
+
+    if progress["after"]:
+        logger.info(f"▶️ Resuming '{alias}' after {progress['after']} ({progress['copied']} docs copied)")
+    if es.indices.exists(index=alias):
+        for hits in _scan(alias, sort, batch_size, after=progress["after"], with_vectors=backend is None):
+            progress["copied"] += copy_page(backend, hits, target, text_field)
+            progress["after"] = hits[-1]["sort"]
+            save_state(state_path, state)
+            logger.info(f"📦 {kind}: {progress['copied']} docs re-embedded into '{target}'")
+    progress["done"] = True
+    save_state(state_path, state)
+
+
+def _ids(index: str, sort: list, batch_size: int) -> set:
+    ids = set()
+    for hits in scan_pages(index, sort, batch_size, source_includes=sort):
+        ids.update(hit["_id"] for hit in hits)
+    return ids
+
+
+def drop_deleted(kind: str, target: str, batch_size: int) -> int:
+    """Delete documents from `target` that were deleted from the live index during the copy."""
+    alias, _, _, sort = TARGETS[kind]
+    # Target first: anything it holds was in the live index when copied, so if a later scan
+    # of the live index misses it, it was deleted since.
+    copied = _ids(target, sort, batch_size)
+    gone = copied - _ids(alias, sort, batch_size)
+    if gone:
+        helpers.bulk(es, [{"_op_type": "delete", "_index": target, "_id": doc_id} for doc_id in gone],
+                     raise_on_error=False)
+    return len(gone)
+
+
+def catch_up(backend, state: dict, batch_size: int) -> int:
+    """
+    Re-copy media documents indexed since the backfill started, and all of their passages,
+    so writes that landed behind the scan cursor are not lost at the swap. A re-copied file's
+    passages are first deleted from the target, like storage replaces them, so chunks dropped
+    by a shorter transcript don't survive; documents deleted during the copy are dropped too.
+    """
+    media_alias, _, media_field, media_sort = TARGETS["media"]
+    passage_alias, _, passage_field, passage_sort = TARGETS["passages"]
+    media_target = state["indices"]["media"]["target"]
+    passage_target = state["indices"]["passages"]["target"]
+    with_passages = es.indices.exists(index=passage_alias)
+    # Bulk loading runs without refreshes; make the copied documents searchable to the
+    # delete-by-query and id scans below.
+    es.indices.refresh(index=f"{media_target},{passage_target}")
+
+    since = (datetime.fromisoformat(state["started_at"]) - CATCH_UP_MARGIN).isoformat()
+    copied = 0
+    reuse = backend is None
+    for hits in _scan(media_alias, media_sort, batch_size, query={"range": {"timestamp": {"gte": since}}},
+                           with_vectors=reuse):
+        copied += copy_page(backend, hits, media_target, media_field)
+        filenames = [hit["_source"]["filename"] for hit in hits]
+        if with_passages:
+            es.delete_by_query(index=passage_target, body={"query": {"terms": {"filename": filenames}}},
+                               conflicts="proceed", refresh=True)
+            for passage_hits in _scan(passage_alias, passage_sort, batch_size,
+                                           query={"terms": {"filename": filenames}}, with_vectors=reuse):
+                copied += copy_page(backend, passage_hits, passage_target, passage_field)
+
+    es.indices.refresh(index=f"{media_target},{passage_target}")
+    deleted = drop_deleted("media", media_target, batch_size)
+    if with_passages:
+        deleted += drop_deleted("passages", passage_target, batch_size)
+    if deleted:
+        logger.info(f"🗑️ Catch-up removed {deleted} docs deleted during the backfill")
+    return copied
+
+
+# ----------------------------------------
+# Entry point
+# ----------------------------------------
+def backfill(batch_size: int, state_path: str, swap: bool = True, swap_only: bool = False,
+             restart: bool = False, delete_old: bool = False, reuse_vectors: bool = False) -> bool:
+    if restart and os.path.exists(state_path):
+        os.remove(state_path)
+    state = load_state(state_path)
+    if state["swapped"]:
+        logger.info(f"✅ Backfill to {EMBEDDING_MODEL} v{EMBEDDING_VERSION} (mapping {INDEX_MAPPING_REVISION}) already swapped.")
+        return True
+
+    if reuse_vectors:
+        # Mapping-only migration: same vectors, new index settings.
+        backend, dims = None, VECTOR_DIMS
+        logger.info(f"🔁 Copying stored vectors into mapping revision {INDEX_MAPPING_REVISION} (checkpoint {state_path})")
+    else:
+        backend = create_embedding_backend()
+        dims = backend.dim
+        if dims != VECTOR_DIMS:
+            logger.warning(f"⚠️ {EMBEDDING_MODEL} produces {dims}-dim vectors; deploy the API with VECTOR_DIMS={dims}.")
+        logger.info(f"🔁 Re-embedding into {EMBEDDING_MODEL} v{EMBEDDING_VERSION} (batch {batch_size}, checkpoint {state_path})")
+    save_state(state_path, state)
+
+    for kind in TARGETS:
+        if swap_only:
+            progress = state["indices"].get(kind, {})
+            if not progress.get("done"):
+                logger.error(f"❌ Cannot swap: '{kind}' has not been fully copied yet.")
+                return False
+        else:
+            copy_index(backend, dims, kind, state, state_path, batch_size)
+
+    if not swap:
+        logger.info("⏸️ Copy complete; run again with --swap-only to switch the aliases.")
+        return True
+
+    pending = {
+        kind: state["indices"][kind]["target"] for kind, (alias, *_rest) in TARGETS.items()
+        if alias_targets(alias) != [state["indices"][kind]["target"]]
+    }
+    if pending:
+        copied = catch_up(backend, state, batch_size)
+        logger.info(f"📦 Catch-up re-copied {copied} docs written during the backfill")
+
+    targets, old = {}, []
+    for kind, target in pending.items():
+        alias = TARGETS[kind][0]
+        sources = [index for index in alias_targets(alias) if index != target]
+        finalize_target(target, sources[0] if sources else None)
+        if alias in sources:
+            logger.warning(f"⚠️ '{alias}' is a concrete index; the swap deletes it to free the name for the alias.")
+        old.extend(index for index in sources if index != alias)
+        targets[alias] = target
+    if targets:
+        swap_aliases(targets)
+
+    state["swapped"] = True
+    save_state(state_path, state)
+    if delete_old and old:
+        es.indices.delete(index=",".join(old))
+        logger.info(f"🗑️ Deleted previous indices: {', '.join(old)}")
+    elif old:
+        logger.info(f"↩️ Previous indices kept for rollback: {', '.join(old)}")
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Re-embed indexed summaries and passages with the configured EMBEDDING_MODEL/EMBEDDING_VERSION "
+                    "(or copy their vectors, with --reuse-vectors) into new indices with the current mapping, "
+                    "then swap the index aliases. Safe to interrupt and re-run."
+    )
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--state", default=EMBEDDING_BACKFILL_STATE_PATH, help="Resume checkpoint file")
+    parser.add_argument("--no-swap", action="store_true", help="Copy only; leave the aliases on the old indices")
+    parser.add_argument("--swap-only", action="store_true", help="Catch up and swap a completed copy")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and copy from the beginning")
+    parser.add_argument("--delete-old", action="store_true", help="Delete the previous indices after the swap")
+    parser.add_argument("--reuse-vectors", action="store_true",
+                        help="Copy stored vectors instead of re-embedding; migrates to a new index mapping only")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ok = backfill(
+        batch_size=args.batch_size,
+        state_path=args.state,
+        swap=not args.no_swap,
+        swap_only=args.swap_only,
+        restart=args.restart,
+        delete_old=args.delete_old,
+        reuse_vectors=args.reuse_vectors,
+    )
+    sys.exit(0 if ok else 1)
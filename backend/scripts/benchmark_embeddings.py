@@ -0,0 +1,127 @@
+import sys
+import time
+import random
+import argparse
+import resource
+import multiprocessing
+
+import numpy as np
+
+from app.core.embedding_backends import BACKENDS, build_embedding_backend, cosine_agreement
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+SAMPLE_SENTENCES = [
+    "A man in a red jacket walks his dog along a snowy mountain trail.",
+    "The presenter explains how the quarterly revenue compares with last year.",
+    "Close-up of hands assembling a circuit board on a workbench.",
+    "Two children play soccer in a park while their parents watch from a bench.",
+    "Drone footage of a coastline at sunset with waves breaking on the rocks.",
+    "The interviewer asks about the safety procedures used in the laboratory.",
+    "A chef slices vegetables and adds them to a sizzling pan.",
+    "Traffic moves slowly through a busy downtown intersection during rain.",
+    "The lecturer writes a differential equation on the whiteboard.",
+    "A crowd cheers as the band takes the stage at an outdoor festival.",
+    "Security camera view of a warehouse loading dock at night.",
+    "The narrator describes the migration patterns of humpback whales.",
+]
+
+
+def sample_texts(count: int, seed: int = 0) -> list:
+    """Texts of varied length (1-8 sentences), like summaries and transcript passages."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(SAMPLE_SENTENCES, k=rng.randint(1, 8))) for _ in range(count)]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 ** 2
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(name: str, texts: list, batch_size: int, single_count: int) -> dict:
+    """Runs in a fresh process so import cost and memory are attributable to one backend."""
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    backend = build_embedding_backend(name)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    backend.encode(texts[:batch_size])  # warm-up
+
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(backend.encode(texts[i:i + batch_size]))
+    batched_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in texts[:single_count]:
+        t = time.perf_counter()
+        backend.encode([text])
+        latencies.append(time.perf_counter() - t)
+
+    return {
+        "backend": backend.name,
+        "load_seconds": round(load_seconds, 2),
+        "model_rss_mb": round(rss_loaded - rss_start, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "texts_per_sec": round(len(texts) / batched_seconds, 1),
+        "single_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2) if latencies else None,
+        "vectors": np.asarray(vectors, dtype=np.float32),
+    }
+
+
+def run_benchmark(backends: list, count: int, batch_size: int, single_count: int, min_cosine: float) -> bool:
+    texts = sample_texts(count)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in backends:
+        logger.info(f"⏱️ Benchmarking '{name}' on {count} texts (batch {batch_size})...")
+        try:
+            with context.Pool(1) as pool:
+                results[name] = pool.apply(_measure, (name, texts, batch_size, single_count))
+        except Exception as e:
+            logger.error(f"❌ Backend '{name}' failed: {e}")
+
+    reference = results.get("torch")
+    if reference is None:
+        logger.warning("⚠️ No fp32 torch reference; skipping the parity check.")
+
+    parity_ok = True
+    logger.info(f"{'backend':<28}{'load s':>8}{'model MB':>10}{'peak MB':>9}{'texts/s':>10}{'p50 ms':>9}{'mean cos':>10}{'min cos':>9}")
+    for name, result in results.items():
+        parity = cosine_agreement(reference["vectors"], result["vectors"]) if reference else {}
+        if parity and parity["min_cosine"] < min_cosine:
+            parity_ok = False
+        logger.info(
+            f"{result['backend']:<28}{result['load_seconds']:>8}{result['model_rss_mb']:>10}{result['peak_rss_mb']:>9}"
+            f"{result['texts_per_sec']:>10}{str(result['single_p50_ms']):>9}"
+            f"{str(parity.get('mean_cosine', '-')):>10}{str(parity.get('min_cosine', '-')):>9}"
+        )
+    if reference:
+        logger.info(f"{'✅' if parity_ok else '❌'} Parity threshold: min cosine >= {min_cosine} against fp32 torch")
+    return parity_ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends: throughput, memory and cosine parity with fp32 torch."
+    )
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--count", type=int, default=512, help="Number of texts to embed")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--single", type=int, default=64, help="Texts encoded one at a time for latency")
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Fail if any vector's cosine with the fp32 reference is below this")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    backends = args.backends if "torch" in args.backends else ["torch", *args.backends]
+    ok = run_benchmark(backends, args.count, args.batch_size, args.single, args.min_cosine)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,115 @@
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from app.core.config import ELASTIC_INDEX, KNN_NUM_CANDIDATES
+from app.core.elasticsearch import es, knn_ready
+from app.core.vector_index import LocalVectorIndex
+from app.services.rag_search import _vector_body
+from app.services.vector_index_service import sync_from_es
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def sample_query_vectors(index: str, count: int, seed: int = 0) -> list:
+    """Stored vectors of randomly chosen documents, used as queries; no embedding model needed."""
+    body = {
+        "size": count,
+        "_source": ["vector"],
+        "query": {
+            "function_score": {
+                "query": {"exists": {"field": "vector"}},
+                "random_score": {"seed": seed, "field": "_seq_no"},
+            }
+        },
+    }
+    return [hit["_source"]["vector"] for hit in es.search(index=index, body=body)["hits"]["hits"]]
+
+
+def _run(index: str, body: dict) -> tuple:
+    body = {**body, "_source": False}
+    start = time.perf_counter()
+    hits = es.search(index=index, body=body)["hits"]["hits"]
+    return [hit["_id"] for hit in hits], time.perf_counter() - start
+
+
+def _report(label: str, recalls: list, latency: list):
+    logger.info(
+        f"{label:<22}{np.mean(recalls):>10.3f}"
+        f"{np.percentile(latency, 50) * 1000:>9.2f}{np.percentile(latency, 95) * 1000:>9.2f}"
+    )
+
+
+def _bench_local(index: str, dtype: str, vectors: list, exact_ids: list, k: int):
+    """Build a throwaway local index from ES and time in-process top-k against the exact ES results."""
+    with tempfile.TemporaryDirectory() as path:
+        local = LocalVectorIndex(path, dims=len(vectors[0]), dtype=dtype)
+        start = time.perf_counter()
+        sync_from_es(media=local, full=True, include_passages=False, media_index=index)
+        logger.info(f"   🧱 local {dtype}: {len(local)} vectors loaded in {time.perf_counter() - start:.1f}s, "
+                    f"{local.snapshot()['matrix_mb']} MB matrix")
+        recalls, latency = [], []
+        for vector, expected in zip(vectors, exact_ids):
+            start = time.perf_counter()
+            ids = [hit["_id"] for hit in local.search(vector, k)]
+            latency.append(time.perf_counter() - start)
+            recalls.append(len(expected.intersection(ids)) / max(len(expected), 1))
+        local.close()
+    _report(f"local {dtype}", recalls, latency)
+
+
+def run_benchmark(index: str, queries: int, k: int, candidates: list, local: bool = False) -> bool:
+    vectors = sample_query_vectors(index, queries)
+    if not vectors:
+        logger.error(f"❌ No documents with vectors in '{index}'")
+        return False
+    logger.info(f"⏱️ {len(vectors)} queries, k={k}, against '{index}'")
+
+    exact_ids, exact_latency = [], []
+    for vector in vectors:
+        ids, seconds = _run(index, _vector_body(vector, k, "exact"))
+        exact_ids.append(set(ids))
+        exact_latency.append(seconds)
+
+    logger.info(f"{'mode':<22}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    _report("exact (baseline)", [1.0], exact_latency)
+    if not knn_ready(index):
+        logger.warning(f"⚠️ '{index}' has no HNSW-indexed vectors; skipping kNN. "
+                       "Migrate it with scripts.backfill_embeddings --reuse-vectors")
+        candidates = []
+    for num_candidates in candidates:
+        recalls, latency = [], []
+        for vector, expected in zip(vectors, exact_ids):
+            ids, seconds = _run(index, _vector_body(vector, k, "knn", num_candidates))
+            recalls.append(len(expected.intersection(ids)) / max(len(expected), 1))
+            latency.append(seconds)
+        _report(f"knn ({num_candidates} cand.)", recalls, latency)
+    if local:
+        for dtype in ("float32", "int8"):
+            _bench_local(index, dtype, vectors, exact_ids, k)
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare kNN (HNSW) retrieval, and optionally the local vector index, "
+                    "with exact script_score search: recall@k and latency."
+    )
+    parser.add_argument("--index", default=ELASTIC_INDEX)
+    parser.add_argument("--queries", type=int, default=100, help="Stored vectors sampled as queries")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, nargs="+",
+                        default=sorted({25, 50, KNN_NUM_CANDIDATES, 200, 500}))
+    parser.add_argument("--local", action="store_true",
+                        help="Also build float32 and int8 local vector indices from ES and benchmark them")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ok = run_benchmark(args.index, args.queries, args.k, args.num_candidates, args.local)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,26 @@
+import argparse
+
+from app.core.config import VECTOR_INDEX_DIR, VECTOR_INDEX_DTYPE
+from app.core.vector_index import close_vector_indices
+from app.services.vector_index_service import sync_from_es
+from app.core.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=f"Rebuild the local vector index ({VECTOR_INDEX_DIR}, {VECTOR_INDEX_DTYPE}) from Elasticsearch. "
+                    "API processes using the same directory pick up the result on their next search."
+    )
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only copy documents indexed since the last sync instead of rebuilding")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    counts = sync_from_es(full=not args.incremental, prune=True)
+    close_vector_indices()
+    logger.info(f"✅ Local vector index: {counts['media']} media and {counts['passages']} passage vectors written, "
+                f"{counts['deleted']} deleted")
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep test runs from writing logs into the source tree; must be set before app.core.config loads.
+os.environ.setdefault("LOG_PATH", os.path.join(tempfile.gettempdir(), "media_analysis_api_tests.log"))
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import upload_media
+from app.core import admission
+from app.core.admission import ResourceLimiter
+from app.core.database import get_db
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = ResourceLimiter("analysis", limit=1, max_queue=0)
+    monkeypatch.setattr(admission, "_limiters", {"analysis": limiter})
+    return limiter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def no_db():
+        yield None
+
+    async def store_analysis_result(**kwargs):
+        pass
+
+    monkeypatch.setattr(upload_media, "store_analysis_result", store_analysis_result)
+    app = FastAPI()
+    app.include_router(upload_media.router)
+    app.dependency_overrides[get_db] = no_db
+    return TestClient(app)
+
+
+def test_slot_is_taken_only_after_the_upload_is_spooled(client, limiter, tmp_path, monkeypatch):
+    active = {}
+    spool_request = upload_media.spool_request
+
+    async def spool(request):
+        media = await spool_request(request, dest_dir=str(tmp_path))
+        active["spooling"] = limiter.active
+        return media
+
+    async def analyze_image(media):
+        active["analysis"] = limiter.active
+        return {"filename": media.filename, "media_type": "image", "summary": "s", "transcript": "",
+                "media_metadata": {}, "vector": None}
+
+    monkeypatch.setattr(upload_media, "spool_request", spool)
+    monkeypatch.setattr(upload_media, "analyze_image", analyze_image)
+    response = client.post("/media", files={"file": ("a.jpg", b"jpeg", "image/jpeg")})
+
+    assert response.status_code == 200
+    assert active == {"spooling": 0, "analysis": 1}
+    assert limiter.active == 0
+
+
+def test_full_queue_is_rejected_before_the_body_is_read(client, limiter, monkeypatch):
+    async def spool(request):
+        raise AssertionError("body must not be read")
+
+    monkeypatch.setattr(upload_media, "spool_request", spool)
+    limiter._semaphore._value = 0  # the only slot is busy and no one may wait
+    response = client.post("/media", files={"file": ("a.jpg", b"jpeg", "image/jpeg")})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert limiter.rejected == 1
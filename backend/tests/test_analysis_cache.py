@@ -0,0 +1,167 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import analysis_service
+from app.services.analysis_cache import AnalysisCache
+
+
+def _cache(tmp_path) -> AnalysisCache:
+    return AnalysisCache(cache_dir=str(tmp_path), version="test", enabled=True)
+
+
+def test_result_is_persisted_and_served_from_disk(tmp_path):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"summary": "s"}
+
+    async def scenario():
+        first = await _cache(tmp_path).get_or_compute("k", compute)
+        # A fresh instance has no in-flight state; the hit comes from the JSON entry.
+        second = await _cache(tmp_path).get_or_compute("k", compute)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ({"summary": "s"}, False)
+    assert second == ({"summary": "s"}, True)
+    assert len(calls) == 1
+
+
+def test_concurrent_callers_share_one_computation(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"n": 1}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    # Every caller gets its own copy.
+    results[0][0]["n"] = 2
+    assert results[1][0]["n"] == 1
+
+
+def test_failure_is_shared_and_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(cache.get_or_compute("k", fail), cache.get_or_compute("k", fail),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert cache.get("k") is None
+
+
+def test_waiters_rerun_when_the_leader_is_cancelled(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"run": len(calls)}
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader, results
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    # One waiter re-ran the analysis; the other two joined it.
+    assert len(calls) == 2
+    assert [r for r, _ in results] == [{"run": 2}] * 3
+    assert sorted(shared for _, shared in results) == [False, True, True]
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await leader, waiter
+
+    (result, shared), waiter = asyncio.run(scenario())
+    assert result == {"ok": True} and shared is False
+    assert waiter.cancelled()
+
+
+def test_degraded_result_is_returned_but_not_cached(tmp_path):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"summary": "s", "degraded": len(calls) == 1}
+
+    async def scenario():
+        first = await _cache(tmp_path).get_or_compute("k", compute)
+        second = await _cache(tmp_path).get_or_compute("k", compute)
+        third = await _cache(tmp_path).get_or_compute("k", compute)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == ({"summary": "s", "degraded": True}, False)
+    # The glitch isn't replayed: the next upload of the same bytes recomputes and caches.
+    assert second == ({"summary": "s", "degraded": False}, False)
+    assert third == ({"summary": "s", "degraded": False}, True)
+    assert len(calls) == 2
+
+
+class _FlakyModels:
+    async def vision_infer_async(self, image, prompt):
+        if image == "bad":
+            raise ConnectionError("ollama unreachable")
+        return f"caption {image}"
+
+    async def transcribe_segments_async(self, audio, regions):
+        raise RuntimeError("CUDA out of memory")
+
+
+def test_model_failures_mark_video_parts_degraded(monkeypatch):
+    monkeypatch.setattr(analysis_service, "get_model_loader", lambda: _FlakyModels())
+    frames = [SimpleNamespace(index=i, timestamp=float(i), image=image) for i, image in enumerate(["a", "bad"])]
+
+    captions = asyncio.run(analysis_service._caption_frames(frames, [0, 1]))
+    transcript = asyncio.run(analysis_service._transcribe("audio", None, "v.mp4"))
+
+    assert captions == ["caption a", analysis_service.FAILED_CAPTION]
+    assert transcript == {"text": "", "segments": [], "degraded": True}
+    # No audio or no speech is a real answer, not a failure.
+    assert analysis_service._no_transcript()["degraded"] is False
+
+
+def test_key_changes_with_the_embedding_model_and_version(tmp_path):
+    old = AnalysisCache(cache_dir=str(tmp_path), version="2", embedding="all-MiniLM-L6-v2-e1")
+    bumped = AnalysisCache(cache_dir=str(tmp_path), version="2", embedding="all-MiniLM-L6-v2-e2")
+    other = AnalysisCache(cache_dir=str(tmp_path), version="2", embedding="BAAI/bge-small-en-v1.5-e1")
+
+    keys = {cache.key("video", "ab12") for cache in (old, bumped, other)}
+    assert len(keys) == 3
+    assert other.key("video", "ab12") == "video-v2-BAAI-bge-small-en-v1.5-e1-ab12"
+
+    old.put(old.key("video", "ab12"), {"vector": [0.1]})
+    assert bumped.get(bumped.key("video", "ab12")) is None
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import backfill_embeddings as backfill
+
+MEDIA, PASSAGES = backfill.TARGETS["media"][0], backfill.TARGETS["passages"][0]
+MEDIA_TARGET, PASSAGE_TARGET = "media-new", "passages-new"
+
+
+class FakeES:
+    """Just enough of the sync client and scan/bulk helpers for catch_up, over in-memory dicts."""
+
+    def __init__(self, indices):
+        self.indices_data = indices
+        self.indices = SimpleNamespace(exists=lambda index: index in self.indices_data, refresh=lambda index: None)
+
+    def _matches(self, source, query):
+        if query is None:
+            return True
+        if "range" in query:
+            return source.get("timestamp", "") >= query["range"]["timestamp"]["gte"]
+        return source["filename"] in query["terms"]["filename"]
+
+    def scan_pages(self, index, sort, page_size, after=None, query=None, **kwargs):
+        hits = [{"_id": doc_id, "_source": dict(source)} for doc_id, source in sorted(self.indices_data[index].items())
+                if self._matches(source, query)]
+        if hits:
+            yield hits
+
+    def delete_by_query(self, index, body, **kwargs):
+        docs = self.indices_data[index]
+        for doc_id in [d for d, source in docs.items() if self._matches(source, body["query"])]:
+            del docs[doc_id]
+
+    def bulk(self, client, actions, **kwargs):
+        for action in actions:
+            docs = self.indices_data[action["_index"]]
+            if action.get("_op_type") == "delete":
+                docs.pop(action["_id"], None)
+            else:
+                docs[action["_id"]] = action["_source"]
+
+
+def _media(filename, timestamp):
+    return {"filename": filename, "summary": f"about {filename}", "timestamp": timestamp, "vector": [1.0]}
+
+
+def _passage(filename, index):
+    return {"filename": filename, "chunk_index": index, "text": f"{filename} {index}", "vector": [1.0]}
+
+
+@pytest.fixture
+def fake_es(monkeypatch):
+    # State as the copy left it: "old" and "long" copied; then, during the copy, "long" was
+    # re-analyzed with a shorter transcript, "gone" was deleted and "new" was added.
+    fake = FakeES({
+        MEDIA: {
+            "long": _media("long", "2026-05-01T12:00:00"),
+            "old": _media("old", "2026-04-01T00:00:00"),
+            "new": _media("new", "2026-05-01T12:30:00"),
+        },
+        PASSAGES: {"long#0": _passage("long", 0), "new#0": _passage("new", 0)},
+        MEDIA_TARGET: {name: _media(name, "2026-04-01T00:00:00") for name in ("long", "old", "gone")},
+        PASSAGE_TARGET: {"long#0": _passage("long", 0), "long#1": _passage("long", 1), "gone#0": _passage("gone", 0)},
+    })
+    monkeypatch.setattr(backfill, "es", fake)
+    monkeypatch.setattr(backfill, "scan_pages", fake.scan_pages)
+    monkeypatch.setattr(backfill, "helpers", SimpleNamespace(bulk=fake.bulk))
+    return fake
+
+
+def test_catch_up_replaces_passages_and_carries_deletions(fake_es):
+    state = {
+        "started_at": "2026-05-01T11:00:00",
+        "indices": {"media": {"target": MEDIA_TARGET}, "passages": {"target": PASSAGE_TARGET}},
+    }
+    copied = backfill.catch_up(None, state, batch_size=100)
+
+    assert copied == 4  # long and new, with one passage each
+    assert sorted(fake_es.indices_data[MEDIA_TARGET]) == ["long", "new", "old"]
+    # long#1 came from the longer transcript and must not outlive the re-analysis
+    assert sorted(fake_es.indices_data[PASSAGE_TARGET]) == ["long#0", "new#0"]
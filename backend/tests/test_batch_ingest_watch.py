@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from scripts import batch_ingest_media as ingest
+
+
+@pytest.fixture(autouse=True)
+def settle(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_SETTLE_SECONDS", 5)
+
+
+def _age(path, seconds):
+    old = time.time_ns() - int(seconds * 1e9)
+    os.utime(path, ns=(old, old))
+
+
+def _poll(deferred):
+    # What one watch iteration does with the files it deferred last time.
+    candidates = ingest._restat(deferred)
+    return ingest.select_pending(candidates, lambda path: None, previous=deferred)
+
+
+def test_growing_file_stays_deferred_until_it_settles(tmp_path):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"x" * 100)
+    ready, deferred = ingest.select_pending(ingest._restat([str(clip)]), lambda path: None)
+    assert not ready and str(clip) in deferred
+
+    # Still being copied; the first scan's mtime ages past the settle time, the file's doesn't.
+    deferred = {str(clip): deferred[str(clip)]._replace(mtime_ns=time.time_ns() - 10 * 10 ** 9)}
+    with open(clip, "ab") as f:
+        f.write(b"x" * 100)
+    ready, deferred = _poll(deferred)
+    assert not ready
+    assert deferred[str(clip)].size == 200
+
+    # A copy that preserves mtimes: old mtime, but the size still moved since the last poll.
+    with open(clip, "ab") as f:
+        f.write(b"x" * 100)
+    _age(clip, 60)
+    ready, deferred = _poll(deferred)
+    assert not ready and deferred[str(clip)].size == 300
+
+    # Unchanged across a poll and older than the settle time: ready, with its final stat.
+    ready, deferred = _poll(deferred)
+    assert not deferred
+    assert ready[str(clip)].size == 300
+
+
+def test_deferred_file_that_vanished_is_dropped(tmp_path):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"x")
+    deferred = ingest._restat([str(clip)])
+    clip.unlink()
+    assert _poll(deferred) == ({}, {})
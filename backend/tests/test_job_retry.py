@@ -0,0 +1,133 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.api.endpoints import jobs
+from app.models.job import JOB_FAILED, JOB_QUEUED, AnalysisJob
+from app.services import job_service
+
+
+@pytest.fixture(autouse=True)
+def backoff(monkeypatch):
+    monkeypatch.setattr(job_service, "JOB_RETRY_BACKOFF_SECONDS", 30)
+    monkeypatch.setattr(job_service, "JOB_RETRY_BACKOFF_MAX_SECONDS", 100)
+    monkeypatch.setattr(job_service, "JOB_MAX_ATTEMPTS", 3)
+
+
+def test_retry_delay_doubles_per_attempt_up_to_the_cap():
+    assert [job_service.retry_delay(n) for n in range(1, 5)] == [30, 60, 100, 100]
+
+
+def _failing_job(tmp_path, monkeypatch, attempts):
+    path = tmp_path / "upload.jpg"
+    path.write_bytes(b"x")
+    updates = []
+
+    async def update_job(job_id, **fields):
+        updates.append(fields)
+
+    async def analyze_image(media, on_progress=None):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(job_service, "_update_job", update_job)
+    monkeypatch.setattr(job_service, "analyze_image", analyze_image)
+    job = SimpleNamespace(id="j1", file_path=str(path), filename="upload.jpg", content_hash="h",
+                          file_size=1, content_type="image/jpeg", media_type="image", attempts=attempts)
+    return job, path, updates
+
+
+def test_failed_job_is_requeued_after_a_backoff(tmp_path, monkeypatch):
+    job, path, updates = _failing_job(tmp_path, monkeypatch, attempts=2)
+    before = job_service._now()
+    asyncio.run(job_service.run_job(job))
+
+    final = updates[-1]
+    assert final["status"] == JOB_QUEUED
+    assert final["error"] == "LLM unavailable"
+    assert before + timedelta(seconds=60) <= final["available_at"] <= job_service._now() + timedelta(seconds=60)
+    assert path.exists()  # kept for the retry
+
+
+def test_last_attempt_fails_the_job(tmp_path, monkeypatch):
+    job, path, updates = _failing_job(tmp_path, monkeypatch, attempts=3)
+    asyncio.run(job_service.run_job(job))
+
+    assert updates[-1]["status"] == JOB_FAILED
+    assert updates[-1]["available_at"] is None
+    assert not path.exists()
+
+
+def test_failure_that_cannot_be_recorded_leaves_the_job_to_recovery(tmp_path, monkeypatch):
+    job, path, _ = _failing_job(tmp_path, monkeypatch, attempts=3)
+
+    async def update_job(job_id, **fields):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(job_service, "_update_job", update_job)
+    asyncio.run(job_service.run_job(job))  # does not raise
+    assert path.exists()  # still needed when recovery requeues the job
+
+
+def test_worker_survives_a_job_that_raises(monkeypatch):
+    claims, runs = [], []
+
+    async def claim_next_job():
+        if len(claims) == 2:
+            raise asyncio.CancelledError  # stop the worker loop
+        claims.append(SimpleNamespace(id=f"j{len(claims)}"))
+        return claims[-1]
+
+    async def run_job(job):
+        runs.append(job.id)
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(job_service, "claim_next_job", claim_next_job)
+    monkeypatch.setattr(job_service, "run_job", run_job)
+    monkeypatch.setattr(job_service, "JOB_POLL_SECONDS", 0)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(job_service.job_worker(0))
+    assert runs == ["j0", "j1"]
+
+
+def test_job_status_response_shows_when_a_requeued_job_retries(monkeypatch):
+    retry_at = job_service._now() + timedelta(seconds=60)
+    job = AnalysisJob(id="j1", filename="a.jpg", media_type="image", status=JOB_QUEUED,
+                      attempts=1, error="LLM unavailable", available_at=retry_at)
+
+    async def get_job(job_id):
+        return job
+
+    monkeypatch.setattr(jobs, "get_job", get_job)
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/jobs")
+    body = TestClient(app).get("/jobs/j1").json()
+
+    assert body["status"] == JOB_QUEUED
+    assert body["retry_at"] == retry_at.isoformat().replace("+00:00", "Z")
+
+
+def test_claim_skips_jobs_still_backing_off(monkeypatch):
+    statements = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement):
+            statements.append(statement)
+            return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+    monkeypatch.setattr(job_service, "AsyncSessionLocal", Session)
+    assert asyncio.run(job_service.claim_next_job()) is None
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "analysis_jobs.available_at IS NULL OR analysis_jobs.available_at <=" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
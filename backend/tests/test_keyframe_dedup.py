@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+from app.core.utils import Keyframe, dedupe_keyframes, dhash, group_near_duplicates
+
+
+def _jpeg(image) -> bytes:
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _gradient(flip: bool = False):
+    image = np.tile(np.linspace(0, 255, 320, dtype=np.uint8), (180, 1))
+    return np.ascontiguousarray(image[:, ::-1]) if flip else image
+
+
+def _bands():
+    # Nine alternating vertical bands: every other bit set in the dHash grid.
+    return np.tile(np.repeat(np.array([40, 220] * 5, dtype=np.uint8)[:9], 40), (180, 1))
+
+
+def test_group_near_duplicates_assigns_first_representative_within_distance():
+    hashes = [0b0000, 0b0001, 0b1111_0000, 0b0011, 0b1111_0001]
+    # 1 and 3 are within 2 bits of 0; 4 is within 1 bit of 2.
+    assert group_near_duplicates(hashes, max_distance=2) == [0, 0, 2, 0, 2]
+
+
+def test_group_near_duplicates_compares_with_representatives_only():
+    # 2 is 1 bit from 1 but 2 bits from representative 0, so with distance 1 it starts a group.
+    assert group_near_duplicates([0b00, 0b01, 0b11], max_distance=1) == [0, 0, 2]
+
+
+def test_negative_distance_disables_grouping():
+    assert group_near_duplicates([5, 5, 5], max_distance=-1) == [0, 1, 2]
+
+
+def test_unhashable_images_are_never_grouped():
+    assert group_near_duplicates([None, 0, None, 0], max_distance=0) == [0, 1, 2, 1]
+
+
+def test_dhash_is_stable_under_rescaling_and_distinguishes_direction():
+    image = _gradient()
+    small = cv2.resize(image, (160, 90), interpolation=cv2.INTER_AREA)
+    assert dhash(image) == dhash(small)
+    assert dhash(image) != dhash(_gradient(flip=True))
+
+
+def test_dedupe_keyframes_groups_repeats_and_isolates_undecodable_frames():
+    frame = cv2.cvtColor(_gradient(), cv2.COLOR_GRAY2BGR)
+    other = cv2.cvtColor(_bands(), cv2.COLOR_GRAY2BGR)
+    black = np.zeros_like(frame)
+    keyframes = [
+        Keyframe(0, 0.0, _jpeg(frame)),
+        Keyframe(1, 1.0, b"not a jpeg"),
+        Keyframe(2, 2.0, _jpeg(other)),
+        Keyframe(3, 3.0, _jpeg(frame)),
+        Keyframe(4, 4.0, b"also broken"),
+        Keyframe(5, 5.0, _jpeg(black)),
+    ]
+    assert dedupe_keyframes(keyframes, max_distance=6) == [0, 1, 2, 0, 4, 5]
@@ -0,0 +1,48 @@
+import time
+
+from app.core.query_cache import TTLCache, normalize_query
+
+
+def test_normalize_query_ignores_case_and_whitespace():
+    assert normalize_query("  What IS\tthe\n plan ") == "what is the plan"
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = TTLCache("t", max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache("t", max_size=10, ttl=5)
+    cache.put("a", 1)
+    now[0] += 4.9
+    assert cache.get("a") == 1
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.snapshot()["size"] == 0
+
+
+def test_put_from_an_older_generation_is_dropped():
+    cache = TTLCache("t", max_size=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate()  # a write landed while the value was being fetched
+    cache.put("a", 1, generation=generation)
+    assert cache.get("a") is None
+    cache.put("a", 2, generation=cache.generation)
+    assert cache.get("a") == 2
+
+
+def test_zero_size_disables_caching_and_counts_lookups():
+    cache = TTLCache("t", max_size=0, ttl=60)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    snapshot = cache.snapshot()
+    assert (snapshot["hits"], snapshot["misses"], snapshot["hit_rate"]) == (0, 1, 0.0)
@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+
+from app.core import elasticsearch, query_cache
+from app.core.config import ELASTIC_INDEX, ELASTIC_PASSAGE_INDEX
+from app.services import rag_search
+from app.services.rag_search import _fill_summaries, _fuse_hits, _hybrid_hits, _msearch_cached
+
+
+def _media(filename, score, summary=None):
+    return {"_id": filename, "_score": score, "_source": {"filename": filename, "summary": summary or f"about {filename}"}}
+
+
+def _passage(filename, index, score, start=None, summary=None):
+    source = {"filename": filename, "text": f"{filename} part {index}", "start": start, "end": None}
+    if summary is not None:
+        source["summary"] = summary
+    return {"_id": f"{filename}#{index}", "_score": score, "_source": source}
+
+
+def _files(docs):
+    return [doc["filename"] for doc in docs]
+
+
+def test_rrf_scores_each_file_by_rank_across_retrievers():
+    vector = ([_media("a", 1.9), _media("b", 1.5), _media("c", 1.2)], [], 1.0, 1.25)  # c is below the threshold
+    keyword = ([_media("b", 8.0), _media("c", 5.0)], [], 1.0, None)
+    docs = _fuse_hits([vector, keyword], rrf_k=60)
+
+    # a: 1/61, b: 1/62 + 1/61, c: 1/62 only (a threshold-dropped hit doesn't count as a rank)
+    assert _files(docs) == ["b", "a", "c"]
+    assert [doc["score"] for doc in docs] == pytest.approx([1 / 62 + 1 / 61, 1 / 61, 1 / 62])
+
+
+def test_rrf_weights_scale_each_retriever():
+    vector = ([_media("a", 1.9), _media("b", 1.5)], [], 1.0, None)
+    keyword = ([_media("b", 8.0), _media("c", 5.0)], [], 2.0, None)
+    # a: 1/61 = .0164, b: 1/62 + 2/61 = .0489, c: 2/62 = .0323
+    assert _files(_fuse_hits([vector, keyword], rrf_k=60)) == ["b", "c", "a"]
+    # A zero weight leaves the retriever out entirely.
+    assert _files(_fuse_hits([vector, (keyword[0], [], 0.0, None)], rrf_k=60)) == ["a", "b"]
+
+
+def test_rrf_constant_trades_top_rank_against_agreement():
+    vector = ([_media("a", 1.9), _media("x", 1.8), _media("c", 1.7)], [], 1.0, None)
+    keyword = ([_media("y", 9.0), _media("z", 8.0), _media("w", 7.0), _media("c", 6.0)], [], 1.0, None)
+    # k=1: a = 1/2 = .5 beats c = 1/4 + 1/5 = .45; k=60: c = 1/63 + 1/64 = .0315 beats a = 1/61 = .0164
+    assert _files(_fuse_hits([vector, keyword], rrf_k=1))[0] == "a"
+    assert _files(_fuse_hits([vector, keyword], rrf_k=60))[0] == "c"
+
+
+def test_rrf_dedups_files_and_passages_across_lists():
+    # b is only a passage hit for the vector retriever, so its summary comes from the keyword one.
+    vector = ([_media("a", 1.9)], [_passage("b", 0, 1.8, start=5.0), _passage("a", 0, 1.6)], 1.0, None)
+    keyword = ([_media("b", 8.0, summary="keyword summary")], [_passage("b", 0, 6.0, start=5.0)], 1.0, None)
+    docs = {doc["filename"]: doc for doc in _fuse_hits([vector, keyword], rrf_k=60)}
+
+    assert sorted(docs) == ["a", "b"]
+    assert docs["b"]["summary"] == "keyword summary"
+    # b: rank 2 in the vector file list (a 1.9, b 1.8) and rank 1 in the keyword one
+    assert docs["b"]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    # b#0 appears in both passage lists but is kept once, with both contributions
+    assert docs["b"]["passages"] == [{"text": "b part 0", "start": 5.0, "end": None, "score": pytest.approx(2 / 61)}]
+    assert docs["b"]["transcript"] == "b part 0"
+
+
+def test_rrf_keeps_the_best_fused_passages_per_file_in_time_order(monkeypatch):
+    monkeypatch.setattr("app.core.config.RAG_PASSAGES_PER_DOC", 2)
+    passages = [_passage("a", i, 2.0 - i / 10, start=10.0 - i) for i in range(3)]
+    docs = _fuse_hits([([], passages, 1.0, None)], rrf_k=60)
+    # a#0 and a#1 rank highest; they are then ordered by start time
+    assert [p["text"] for p in docs[0]["passages"]] == ["a part 1", "a part 0"]
+
+
+class FakeES:
+    def __init__(self, responses, search_hits=()):
+        self.responses = responses
+        self.search_hits = list(search_hits)
+        self.msearch_bodies = []
+        self.search_bodies = []
+        self.mget_bodies = []
+
+    async def mget(self, index, body):
+        self.mget_bodies.append(body)
+        return {"docs": [{"found": True, "_source": {"summary": f"fetched {doc['_id']}"}} for doc in body["docs"]]}
+
+    async def msearch(self, body):
+        self.msearch_bodies.append(body)
+        return {"responses": self.responses}
+
+    async def search(self, index, body):
+        self.search_bodies.append((index, body))
+        return {"hits": {"hits": self.search_hits}}
+
+
+def _ok(*hits):
+    return {"hits": {"hits": list(hits)}}
+
+
+@pytest.fixture
+def fake_es(monkeypatch):
+    monkeypatch.setattr(query_cache, "_search_cache", query_cache.TTLCache("search_results", 100, 60))
+    monkeypatch.setattr(rag_search, "_knn_failed_at", {})
+
+    def install(fake):
+        monkeypatch.setattr(elasticsearch, "_async_es", fake)
+        return fake
+
+    return install
+
+
+def test_msearch_results_are_cached_per_normalized_query(fake_es):
+    es = fake_es(FakeES([_ok(_media("a", 1.0)), _ok()]))
+    searches = [("i1", {"q": 1}), ("i2", {"q": 2})]
+
+    first = asyncio.run(_msearch_cached("kind", "What  now", 5, searches))
+    second = asyncio.run(_msearch_cached("kind", "what now", 5, searches))
+    assert first == second == [[_media("a", 1.0)], []]
+    assert len(es.msearch_bodies) == 1
+    assert es.msearch_bodies[0] == [{"index": "i1"}, {"q": 1}, {"index": "i2"}, {"q": 2}]
+
+    query_cache.get_search_cache().invalidate()
+    asyncio.run(_msearch_cached("kind", "what now", 5, searches))
+    assert len(es.msearch_bodies) == 2
+
+
+def test_msearch_failures_yield_none_and_are_not_cached(fake_es):
+    es = fake_es(FakeES([_ok(), {"error": {"type": "boom"}}]))
+    searches = [("i1", {}), ("i2", {})]
+    assert asyncio.run(_msearch_cached("kind", "q", 5, searches)) == [[], None]
+    asyncio.run(_msearch_cached("kind", "q", 5, searches))
+    assert len(es.msearch_bodies) == 2
+
+
+def test_hybrid_knn_scores_are_doubled_onto_the_exact_scale(fake_es):
+    fake_es(FakeES([
+        _ok(_media("a", 0.9)),
+        _ok(_passage("a", 0, 0.8)),
+        _ok(_media("a", 7.0)),
+        _ok(_passage("a", 0, 3.0)),
+    ]))
+    media_vector, passage_vector, media_keyword, passage_keyword = asyncio.run(
+        _hybrid_hits("q", [0.1, 0.2], 5, 10, "knn", 100)
+    )
+    assert media_vector[0]["_score"] == pytest.approx(1.8)
+    assert passage_vector[0]["_score"] == pytest.approx(1.6)
+    # BM25 scores are left alone
+    assert (media_keyword[0]["_score"], passage_keyword[0]["_score"]) == (7.0, 3.0)
+
+
+def test_hybrid_falls_back_to_exact_search_for_a_failed_knn_search(fake_es):
+    es = fake_es(FakeES(
+        [{"error": {"type": "not_hnsw"}}, _ok(_passage("a", 0, 0.8)), _ok(), _ok()],
+        search_hits=[_media("a", 1.7)],
+    ))
+    media_vector, passage_vector, _, _ = asyncio.run(_hybrid_hits("q", [0.1, 0.2], 5, 10, "knn", 100))
+
+    assert media_vector == [_media("a", 1.7)]  # exact scores are already cosine + 1
+    assert passage_vector[0]["_score"] == pytest.approx(1.6)
+    (index, body), = es.search_bodies
+    assert index == ELASTIC_INDEX and "script_score" in body["query"]
+    assert es.msearch_bodies[0][6] == {"index": ELASTIC_PASSAGE_INDEX}
+
+
+def test_hybrid_uses_exact_search_in_the_msearch_after_a_knn_failure(fake_es, monkeypatch):
+    es = fake_es(FakeES(
+        [{"error": {"type": "not_hnsw"}}, _ok(_passage("a", 0, 0.8)), _ok(), _ok()],
+        search_hits=[_media("a", 1.7)],
+    ))
+    asyncio.run(_hybrid_hits("q", [0.1, 0.2], 5, 10, "knn", 100))
+
+    es.responses = [_ok(_media("b", 1.6)), _ok(_passage("a", 0, 0.8)), _ok(), _ok()]
+    media_vector, passage_vector, _, _ = asyncio.run(_hybrid_hits("other q", [0.1, 0.2], 5, 10, "knn", 100))
+    assert len(es.search_bodies) == 1  # only the first failure re-queried
+    second = es.msearch_bodies[1]
+    assert "script_score" in second[1]["query"] and "knn" in second[3]
+    # Exact scores stay as they are; kNN ones are still doubled.
+    assert media_vector[0]["_score"] == 1.6
+    assert passage_vector[0]["_score"] == pytest.approx(1.6)
+
+    # After KNN_RETRY_SECONDS the index gets kNN again.
+    monkeypatch.setattr(rag_search, "KNN_RETRY_SECONDS", 0)
+    asyncio.run(_hybrid_hits("third q", [0.1, 0.2], 5, 10, "knn", 100))
+    assert "knn" in es.msearch_bodies[2][1]
+
+
+def test_passage_only_files_get_their_summary_without_another_round_trip(fake_es):
+    es = fake_es(FakeES([]))
+    passages = [_passage("a", 0, 1.8, summary="about a"), _passage("old", 0, 1.7)]
+    docs = _fuse_hits([([], passages, 1.0, None)], rrf_k=60)
+    asyncio.run(_fill_summaries(docs))
+
+    assert {doc["filename"]: doc["summary"] for doc in docs} == {"a": "about a", "old": "fetched old"}
+    # Only the passage indexed before summaries were stored on passages needs the mget.
+    assert es.mget_bodies == [{"docs": [{"_id": "old", "_source": ["summary", "relative_path"]}]}]
+
+
+def test_hybrid_exact_mode_keeps_scores(fake_es):
+    fake_es(FakeES([_ok(_media("a", 1.8)), _ok(), _ok(), _ok()]))
+    media_vector, *_ = asyncio.run(_hybrid_hits("q", [0.1], 5, 10, "exact", 100))
+    assert media_vector[0]["_score"] == 1.8
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+from app.core.utils import BLACK_FRAME_LUMA, extract_scene_keyframes
+
+
+def _video(path, levels, fps=10, size=(64, 48)):
+    """One frame per entry of `levels`, each a flat gray frame of that luma plus light noise."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    rng = np.random.default_rng(0)
+    for level in levels:
+        noise = rng.integers(0, 3, (size[1], size[0], 3))
+        writer.write(np.clip(level + noise, 0, 255).astype(np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_dark_video_still_gets_evenly_spread_keyframes(tmp_path):
+    path = _video(tmp_path / "night.avi", [BLACK_FRAME_LUMA // 2] * 60)
+    keyframes = extract_scene_keyframes(path, max_frames=3)
+
+    assert len(keyframes) == 3
+    assert keyframes[0].timestamp == 0.0
+    assert keyframes[-1].timestamp >= 4.0  # spread over the clip, not bunched at the start
+
+
+def test_black_frames_are_skipped_when_brighter_ones_exist(tmp_path):
+    path = _video(tmp_path / "fade_in.avi", [0] * 30 + [128] * 30)
+    keyframes = extract_scene_keyframes(path, max_frames=3)
+
+    assert keyframes
+    assert all(keyframe.timestamp >= 3.0 for keyframe in keyframes)
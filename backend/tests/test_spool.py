@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.core.spool import InvalidUploadError, UploadTooLargeError, spool_request
+
+
+def _client(tmp_path, max_bytes=1024) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            media = await spool_request(request, max_bytes=max_bytes, dest_dir=str(tmp_path))
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except InvalidUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        with open(media.path, "rb") as f:
+            content = f.read()
+        return {"filename": media.filename, "content_type": media.content_type, "size": media.size,
+                "hash": media.content_hash, "content": content.decode()}
+
+    return TestClient(app)
+
+
+def test_file_field_is_streamed_and_hashed(tmp_path):
+    body = "frame data " * 50
+    response = _client(tmp_path).post(
+        "/upload",
+        data={"note": "ignored"},
+        files={"file": ("clip.mp4", body.encode(), "video/mp4")},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["filename"] == "clip.mp4"
+    assert result["content_type"] == "video/mp4"
+    assert result["size"] == len(body)
+    assert result["hash"] == hashlib.sha256(body.encode()).hexdigest()
+    assert result["content"] == body
+
+
+def test_oversized_file_is_rejected_and_removed(tmp_path):
+    response = _client(tmp_path, max_bytes=100).post(
+        "/upload", files={"file": ("big.mp4", b"x" * 101, "video/mp4")}
+    )
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_length_over_limit_is_rejected_before_reading(tmp_path):
+    def body():
+        raise AssertionError("body must not be read")
+        yield b""
+
+    response = _client(tmp_path, max_bytes=100).post(
+        "/upload",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=x", "content-length": str(10 ** 9)},
+    )
+    assert response.status_code == 413
+
+
+def test_missing_file_field_is_rejected(tmp_path):
+    client = _client(tmp_path)
+    assert client.post("/upload", data={"file": "not a file"}).status_code == 400
+    assert client.post("/upload", files={"other": ("a.mp4", b"x", "video/mp4")}).status_code == 400
+    assert client.post("/upload", json={"file": "x"}).status_code == 400
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from app.core.transcription import plan_chunks, remap_segments, segments_from_result
+
+SR = 16000
+
+
+def _loud(seconds: float, quiet=()) -> np.ndarray:
+    """Constant loud signal with silent (start, end) spans."""
+    samples = np.full(int(seconds * SR), 0.5, dtype=np.float32)
+    for start, end in quiet:
+        samples[int(start * SR):int(end * SR)] = 0.0
+    return samples
+
+
+def test_whole_track_fits_one_chunk():
+    assert plan_chunks(_loud(30), None, SR, max_chunk_seconds=120) == [[(0.0, 30.0)]]
+
+
+def test_regions_are_packed_up_to_the_limit():
+    regions = [(0.0, 4.0), (5.0, 9.0), (10.0, 13.0)]
+    # 4 + 4 fits in 10 s; adding 3 more would not.
+    assert plan_chunks(_loud(13), regions, SR, max_chunk_seconds=10) == [
+        [(0.0, 4.0), (5.0, 9.0)],
+        [(10.0, 13.0)],
+    ]
+
+
+def test_long_region_is_cut_at_the_quietest_point_before_the_limit():
+    chunks = plan_chunks(_loud(25, quiet=[(7.0, 7.2), (15.0, 15.2)]), [(0.0, 25.0)], SR,
+                         max_chunk_seconds=10)
+    assert len(chunks) == 3
+    (first,), (second,), (third,) = chunks
+    assert first[0] == 0.0 and 7.0 <= first[1] <= 7.2
+    assert second[0] == first[1] and 15.0 <= second[1] <= 15.2
+    assert third == (second[1], 25.0)
+    assert all(end - start <= 10 for chunk in chunks for start, end in chunk)
+
+
+def test_remap_segments_translates_trimmed_times_to_source():
+    # Regions (1.0, 2.0) and (3.0, 3.5) joined with a 0.3 s gap (see speech_only_audio).
+    segment_map = [(0.0, 1.0, 1.0), (1.3, 3.0, 0.5)]
+    segments = [
+        {"start": 0.5, "end": 0.9, "text": "a"},
+        {"start": 1.4, "end": 1.6, "text": "b"},
+        {"start": 0.9, "end": 1.2, "text": "c"},  # runs into the gap: clamped to its region
+    ]
+    assert remap_segments(segments, segment_map) == [
+        {"start": 1.5, "end": 1.9, "text": "a"},
+        {"start": 3.1, "end": 3.3, "text": "b"},
+        {"start": 1.9, "end": 2.0, "text": "c"},
+    ]
+
+
+def test_remap_segments_without_map_is_identity():
+    segments = [{"start": 1.0, "end": 2.0, "text": "x"}]
+    assert remap_segments(segments, []) == segments
+
+
+def test_segments_from_result_drops_blank_text():
+    result = {"segments": [{"start": 0, "end": 1.5, "text": " hi "}, {"start": 1.5, "end": 2, "text": "  "}]}
+    assert segments_from_result(result) == [{"start": 0.0, "end": 1.5, "text": "hi"}]
+    assert segments_from_result({}) == []
+
+
+@pytest.mark.parametrize("max_chunk", [5, 7.5, 30])
+def test_chunks_cover_regions_without_overlap(max_chunk):
+    regions = [(0.5, 12.0), (13.0, 14.0), (20.0, 41.0)]
+    chunks = plan_chunks(_loud(45, quiet=[(6.0, 6.1), (30.0, 30.1)]), regions, SR, max_chunk_seconds=max_chunk)
+    pieces = [piece for chunk in chunks for piece in chunk]
+    assert sum(end - start for start, end in pieces) == pytest.approx(sum(e - s for s, e in regions))
+    assert all(a[1] <= b[0] for a, b in zip(pieces, pieces[1:]))
+    assert all(sum(e - s for s, e in chunk) <= max_chunk + 1e-9 for chunk in chunks)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from app.core.vad import detect_speech, speech_only_audio
+
+SR = 16000
+
+
+def _audio(seconds: float, bursts=(), freq: float = 1000.0, seed: int = 0) -> np.ndarray:
+    """Quiet white noise (about -60 dBFS) with loud tones over the given (start, end) spans."""
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(0, 0.001, int(seconds * SR)).astype(np.float32)
+    t = np.arange(len(samples)) / SR
+    for start, end in bursts:
+        span = (t >= start) & (t < end)
+        samples[span] += 0.3 * np.sin(2 * np.pi * freq * t[span]).astype(np.float32)
+    return samples
+
+
+def _assert_regions(actual, expected, tolerance=0.06):
+    assert len(actual) == len(expected), actual
+    for (start, end), (want_start, want_end) in zip(actual, expected):
+        assert start == pytest.approx(want_start, abs=tolerance)
+        assert end == pytest.approx(want_end, abs=tolerance)
+
+
+def test_silence_has_no_speech():
+    result = detect_speech(_audio(5))
+    assert result["regions"] == []
+    assert result["speech_ratio"] == 0.0
+    assert result["audio_seconds"] == 5.0
+
+
+def test_speech_band_bursts_become_padded_regions():
+    result = detect_speech(_audio(10, bursts=[(2.0, 4.0), (6.0, 7.0)]))
+    # VAD_PAD_MS = 200 on each side
+    _assert_regions(result["regions"], [(1.8, 4.2), (5.8, 7.2)])
+    assert result["speech_seconds"] == pytest.approx(4.0, abs=0.15)
+    assert result["speech_ratio"] == pytest.approx(0.4, abs=0.015)
+
+
+def test_short_pauses_are_merged_and_blips_dropped():
+    # 300 ms pause < VAD_MERGE_GAP_MS; the 100 ms blip < VAD_MIN_SPEECH_MS.
+    result = detect_speech(_audio(8, bursts=[(1.0, 2.0), (2.3, 3.0), (6.0, 6.1)]))
+    _assert_regions(result["regions"], [(0.8, 3.2)])
+
+
+def test_loud_low_frequency_hum_is_not_speech():
+    assert detect_speech(_audio(5, bursts=[(1.0, 4.0)], freq=100.0))["regions"] == []
+
+
+def test_continuous_speech_is_not_mistaken_for_silence():
+    # No quiet stretch to estimate the noise floor from; regions are clamped to the audio.
+    result = detect_speech(_audio(3, bursts=[(0.0, 3.0)]))
+    _assert_regions(result["regions"], [(0.0, 3.0)])
+    assert result["speech_ratio"] == 1.0
+
+
+def test_continuous_hum_is_still_not_speech():
+    assert detect_speech(_audio(3, bursts=[(0.0, 3.0)], freq=100.0))["regions"] == []
+
+
+def test_speech_only_audio_concatenates_regions_with_gaps():
+    samples = np.arange(5 * SR, dtype=np.float32)
+    trimmed, segment_map = speech_only_audio(samples, [(1.0, 2.0), (3.0, 3.5)], SR, gap_seconds=0.3)
+    assert len(trimmed) == int(1.8 * SR)
+    assert segment_map == [(0.0, 1.0, 1.0), (1.3, 3.0, 0.5)]
+    assert trimmed[0] == SR and trimmed[int(1.3 * SR)] == 3 * SR
+    assert not trimmed[SR:int(1.3 * SR)].any()
+
+
+def test_speech_only_audio_without_regions_is_empty():
+    trimmed, segment_map = speech_only_audio(np.ones(SR, dtype=np.float32), [], SR)
+    assert trimmed.size == 0 and segment_map == []
@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.vector_index import MIN_CAPACITY, LocalVectorIndex
+from app.services import vector_index_service
+
+DIMS = 4
+
+
+def _doc(doc_id, vector, filename=None):
+    return doc_id, vector, {"filename": filename or doc_id}
+
+
+def _ids(hits):
+    return [hit["_id"] for hit in hits]
+
+
+@pytest.fixture(params=["float32", "int8"])
+def index(request, tmp_path):
+    idx = LocalVectorIndex(str(tmp_path), dims=DIMS, dtype=request.param)
+    yield idx
+    idx.close()
+
+
+def test_search_ranks_by_cosine_and_reports_es_scores(index):
+    index.upsert([_doc("x", [1, 0, 0, 0]), _doc("xy", [1, 1, 0, 0]), _doc("y", [0, 1, 0, 0])])
+    hits = index.search([1, 0.1, 0, 0], k=2)
+    assert _ids(hits) == ["x", "xy"]
+    # cos(x, q) = 1 / |q|, shifted by +1 like the script_score query
+    assert hits[0]["_score"] == pytest.approx(1 + 1 / np.sqrt(1.01), abs=1e-2)
+    assert hits[0]["_source"] == {"filename": "x"}
+
+
+def test_upsert_replaces_and_skips_unusable_vectors(index):
+    assert index.upsert([_doc("a", [1, 0, 0, 0]), _doc("b", None), _doc("c", [0, 0, 0, 0]), _doc("d", [1, 0])]) == 1
+    index.upsert([_doc("a", [0, 1, 0, 0])])
+    assert len(index) == 1
+    assert _ids(index.search([0, 1, 0, 0], k=5)) == ["a"]
+    assert index.search([0, 1, 0, 0], k=5)[0]["_score"] == pytest.approx(2.0, abs=1e-2)
+
+
+def test_deleted_rows_are_reused(index):
+    index.upsert([_doc("a", [1, 0, 0, 0]), _doc("b", [0, 1, 0, 0]), _doc("c", [0, 0, 1, 0])])
+    assert index.delete(["b", "missing"]) == 1
+    assert "b" not in _ids(index.search([0, 1, 0, 0], k=5))
+    index.upsert([_doc("d", [0, 0, 0, 1])])
+    assert index._rows == 3  # took b's row instead of growing
+    assert index.get_source("d") == {"filename": "d"}
+
+
+def test_replace_and_delete_by_filename(index):
+    index.upsert([_doc("v#0", [1, 0, 0, 0], "v"), _doc("v#1", [0, 1, 0, 0], "v"), _doc("w#0", [0, 0, 1, 0], "w")])
+    assert index.replace_filename("v", [_doc("v#0", [0, 0, 0, 1], "v")]) == 1
+    assert sorted(index.doc_ids()) == ["v#0", "w#0"]
+    index.delete_filename("v")
+    assert index.doc_ids() == ["w#0"]
+    assert index.filenames() == ["w"]
+
+
+def test_reopens_from_disk_and_grows(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path), dims=DIMS, dtype="int8")
+    n = MIN_CAPACITY + 10
+    idx.upsert(_doc(f"d{i}", [1, 0, 0, 0] if i < n - 1 else [0, 1, 0, 0]) for i in range(n))
+    idx.delete(["d0"])
+    idx.close()
+
+    reopened = LocalVectorIndex(str(tmp_path), dims=DIMS, dtype="int8")
+    assert len(reopened) == n - 1
+    assert reopened.snapshot()["capacity"] == 2 * MIN_CAPACITY
+    assert _ids(reopened.search([0, 1, 0, 0], k=1)) == [f"d{n - 1}"]
+    reopened.upsert([_doc("new", [0, 0, 1, 0])])
+    assert reopened._rows == n  # reused d0's row
+    reopened.close()
+
+
+def test_layout_change_resets_the_index(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path), dims=DIMS)
+    idx.upsert([_doc("a", [1, 0, 0, 0])])
+    idx.close()
+    resized = LocalVectorIndex(str(tmp_path), dims=DIMS + 1)
+    assert len(resized) == 0
+    resized.close()
+
+
+def test_two_writers_on_one_directory_stay_consistent(tmp_path):
+    # E.g. the API mirroring a write while batch ingestion or a rebuild writes the same directory.
+    first = LocalVectorIndex(str(tmp_path), dims=DIMS)
+    second = LocalVectorIndex(str(tmp_path), dims=DIMS)
+    first.upsert([_doc("a", [1, 0, 0, 0])])
+    second.upsert([_doc("b", [0, 1, 0, 0])])  # would reuse row 0 without reloading
+    second.upsert([_doc("a", [0, 0, 1, 0])])  # would hit doc_id UNIQUE without reloading
+    first.delete(["b"])
+
+    for idx in (first, second):
+        assert idx.doc_ids() == ["a"]
+        assert _ids(idx.search([0, 0, 1, 0], k=5)) == ["a"]
+        assert idx.search([0, 0, 1, 0], k=1)[0]["_score"] == pytest.approx(2.0)
+
+    second.reset()
+    assert first.search([0, 0, 1, 0], k=5) == []
+    first.upsert([_doc("c", [0, 0, 0, 1])])
+    assert _ids(second.search([0, 0, 0, 1], k=5)) == ["c"]
+    first.close()
+    second.close()
+
+
+def test_pruning_sync_drops_documents_deleted_from_es(tmp_path, monkeypatch):
+    media = LocalVectorIndex(str(tmp_path / "media"), dims=DIMS)
+    passages = LocalVectorIndex(str(tmp_path / "passages"), dims=DIMS)
+    media.upsert([_doc("kept", [1, 0, 0, 0]), _doc("gone", [0, 1, 0, 0])])
+    passages.upsert([_doc("kept#0", [1, 0, 0, 0], "kept"), _doc("gone#0", [0, 1, 0, 0], "gone")])
+    media.set_meta("synced_at", "2026-01-01T00:00:00")
+
+    id_scans = []
+
+    def scan_pages(index, sort, page_size, query=None, **kwargs):
+        if index == "media" and query is None:  # the id scan
+            id_scans.append(index)
+            yield [{"_id": "kept", "_source": {"filename": "kept"}}]
+
+    monkeypatch.setattr(vector_index_service, "scan_pages", scan_pages)
+    monkeypatch.setattr(vector_index_service, "es",
+                        SimpleNamespace(indices=SimpleNamespace(exists=lambda index: True)))
+    sync = dict(media=media, passages=passages, media_index="media", passage_index="passages")
+
+    # Plain catch-up syncs never scan every id.
+    assert vector_index_service.sync_from_es(**sync) == {"media": 0, "passages": 0, "deleted": 0}
+    assert not id_scans and len(media) == 2
+
+    counts = vector_index_service.sync_from_es(**sync, prune=True)
+    assert counts == {"media": 0, "passages": 0, "deleted": 1}
+    assert media.doc_ids() == ["kept"]
+    assert passages.doc_ids() == ["kept#0"]
+    media.close()
+    passages.close()
+
+
+def test_sync_loop_prunes_at_startup_then_on_its_own_interval(monkeypatch):
+    calls, now = [], [0.0]
+
+    def sync_from_es(prune=False):
+        calls.append(prune)
+        return {"media": 0, "passages": 0, "deleted": 0}
+
+    async def sleep(seconds):
+        now[0] += seconds
+        if len(calls) == 5:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(vector_index_service, "sync_from_es", sync_from_es)
+    monkeypatch.setattr(vector_index_service.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(vector_index_service.asyncio, "sleep", sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(vector_index_service.vector_index_sync_loop(interval=60, prune_interval=150))
+    assert calls == [True, False, False, True, False]
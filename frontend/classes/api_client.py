@@ -1,4 +1,5 @@
 import requests
+from urllib.parse import quote
 
 API_BASE = "http://backend:8000"
 
@@ -21,3 +22,8 @@ def keyword_search(payload):
     response = requests.get(f"{API_BASE}/search/media", params=payload)
     return response.json()
 
+
+def fetch_transcript(filename):
+    response = requests.get(f"{API_BASE}/search/media/{quote(filename)}/transcript")
+    response.raise_for_status()
+    return response.json()
@@ -1,49 +1,94 @@
 import streamlit as st
-from classes.api_client import keyword_search
+from classes.api_client import keyword_search, fetch_transcript
+
+PAGE_SIZE = 10
+
+
+def _search(query, cursor=None):
+    params = {"query": query, "page_size": PAGE_SIZE}
+    if st.session_state.get("kw_show_metadata"):
+        params["include"] = ["filename", "media_type", "summary", "media_metadata"]
+    if cursor:
+        params["search_after"] = cursor
+    return keyword_search(params)
+
 
 def run():
     st.title("🔤 Keyword Search")
     st.markdown("Search across AI-generated summaries and transcripts for your media files.")
 
     keyword_query = st.text_input("Enter keywords to search:")
-    show_metadata = st.checkbox("Show metadata for each result", value=False)
+    show_metadata = st.checkbox("Show metadata for each result", value=False, key="kw_show_metadata")
     show_debug = st.checkbox("Show raw debug info", value=False)
 
     if st.button("Search") and keyword_query:
         with st.spinner("Searching..."):
-            response = keyword_search({"query": keyword_query})
-
-        if response and response.get("results"):
-            st.success(f"✅ Found {len(response['results'])} matching result(s).")
-
-            for idx, result in enumerate(response["results"]):
-                with st.expander(f"{idx+1}. {result['filename']} — {result['media_type']}"):
-                    # --- Summary ---
-                    st.markdown("**📝 Summary:**")
-                    st.markdown(result.get("summary", "_No summary available._"))
-
-                    # --- Transcript ---
-                    transcript = result.get("transcript", "")
-                    if transcript:
-                        st.markdown("**📄 Transcript:**")
-                        st.text_area("Transcript", transcript, height=150)
-                        st.download_button("⬇️ Download Transcript", transcript, f"{result['filename']}_transcript.txt")
-                    else:
-                        st.info("🧾 No transcript available for this media.")
-
-                    # --- Metadata ---
-                    metadata = result.get("media_metadata")
-                    if show_metadata:
-                        st.markdown("🔍 **Metadata:**")
-                        if metadata and isinstance(metadata, dict):
-                            st.json(metadata)
-                        else:
-                            st.warning("ℹ️ No metadata available for this media.")
-
-                    # --- Raw API Data (Debugging) ---
-                    if show_debug:
-                        st.markdown("🛠️ **Raw API Response:**")
-                        st.code(result)
-
-        else:
-            st.warning("No matches found.")
+            response = _search(keyword_query)
+        st.session_state.kw_query = keyword_query
+        st.session_state.kw_results = response.get("results", []) if response else []
+        st.session_state.kw_total = response.get("total", 0) if response else 0
+        st.session_state.kw_cursor = response.get("next_search_after") if response else None
+        st.session_state.kw_transcripts = {}
+
+    results = st.session_state.get("kw_results")
+    if results is None:
+        return
+    if not results:
+        st.warning("No matches found.")
+        return
+
+    st.success(f"✅ Showing {len(results)} of {st.session_state.kw_total} matching result(s).")
+
+    for idx, result in enumerate(results):
+        with st.expander(f"{idx+1}. {result['filename']} — {result.get('media_type', '')}"):
+            highlights = result.get("highlights", {})
+
+            # --- Summary (matches in bold) ---
+            st.markdown("**📝 Summary:**")
+            summary = (highlights.get("summary") or [result.get("summary")])[0]
+            st.markdown(summary or "_No summary available._")
+
+            # --- Matching transcript fragments ---
+            fragments = highlights.get("transcript", [])
+            if fragments:
+                st.markdown("**📄 Transcript matches:**")
+                for fragment in fragments:
+                    st.markdown(f"> …{fragment}…")
+
+            # --- Full transcript, fetched on demand ---
+            filename = result["filename"]
+            transcript = st.session_state.kw_transcripts.get(filename)
+            if transcript is None:
+                if st.button("📄 Load full transcript", key=f"kw_transcript_{idx}"):
+                    with st.spinner("Loading transcript..."):
+                        transcript = fetch_transcript(filename).get("transcript", "")
+                    st.session_state.kw_transcripts[filename] = transcript
+            if transcript is not None:
+                if transcript:
+                    st.text_area("Transcript", transcript, height=150, key=f"kw_transcript_text_{idx}")
+                    st.download_button("⬇️ Download Transcript", transcript, f"{filename}_transcript.txt",
+                                       key=f"kw_download_{idx}")
+                else:
+                    st.info("🧾 No transcript available for this media.")
+
+            # --- Metadata ---
+            if show_metadata:
+                metadata = result.get("media_metadata")
+                st.markdown("🔍 **Metadata:**")
+                if metadata and isinstance(metadata, dict):
+                    st.json(metadata)
+                else:
+                    st.warning("ℹ️ No metadata available for this media. Search again to load it.")
+
+            # --- Raw API Data (Debugging) ---
+            if show_debug:
+                st.markdown("🛠️ **Raw API Response:**")
+                st.code(result)
+
+    # --- Next page ---
+    if st.session_state.get("kw_cursor") and st.button("⬇️ Load more results"):
+        with st.spinner("Loading more..."):
+            response = _search(st.session_state.kw_query, st.session_state.kw_cursor)
+        st.session_state.kw_results.extend(response.get("results", []))
+        st.session_state.kw_cursor = response.get("next_search_after")
+        st.rerun()
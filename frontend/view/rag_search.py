@@ -53,6 +53,12 @@ def run():
                     if doc.get("summary"):
                         st.markdown(f"**Summary:** {doc['summary']}")
 
+                    # Best-matching transcript passages, with timestamps when known
+                    for passage in doc.get("passages", []):
+                        start = passage.get("start")
+                        stamp = f"`{int(start // 60):02d}:{int(start % 60):02d}` " if start is not None else ""
+                        st.markdown(f"> {stamp}{passage['text']}")
+
                     # Transcript download
                     transcript_text = doc.get("transcript", "").strip()
 